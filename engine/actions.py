@@ -0,0 +1,227 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import ast
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple
+
+from .laws import Action
+from .safeexpr import CompiledExpr, eval_expr
+
+# Call actions available to laws. Each handler is bound onto its Action when
+# the program is compiled, with constant arguments folded and defaults filled
+# in, so the kernel never dispatches on the call name at runtime.
+#
+# Handlers take (kernel, env, entity, args). A default of None means the value
+# depends on the entity or kernel and is resolved by the handler.
+
+@dataclass(frozen=True)
+class ActionSpec:
+    name: str
+    fn: Callable[[Any, Dict[str, Any], Any, Tuple[Any, ...]], None]
+    defaults: Tuple[Any, ...]
+    arity: FrozenSet[int]
+    raw: Tuple[int, ...] = ()  # arg positions passed as CompiledExpr (neighbor selectors)
+
+
+ACTIONS: Dict[str, ActionSpec] = {}
+
+
+def _register(name: str, fn, defaults: Tuple[Any, ...], arity, raw: Tuple[int, ...] = ()) -> None:
+    ACTIONS[name] = ActionSpec(name=name, fn=fn, defaults=defaults, arity=frozenset(arity), raw=raw)
+
+
+def _emit(field: str, sound: bool = False):
+    def run(k, env, e, args):
+        amt = args[0]
+        if k.field_batch is not None:
+            k.field_batch.deposit(field, *k._cell(e.x, e.y), amt)
+        else:
+            k._deposit_field(getattr(k.world, field), e.x, e.y, amt)
+        if sound:
+            env["sound"] = env.get("sound", 0.0) + amt
+    return run
+
+
+def _consume(field: str):
+    # With a FieldBatch the draw is queued and the energy gain lands when the
+    # batch is applied at the end of the substep.
+    def run(k, env, e, args):
+        if k.field_batch is not None:
+            k.field_batch.consume(field, e.index, *k._cell(e.x, e.y), args[0], args[1])
+            return
+        taken = k._consume_field(getattr(k.world, field), e.x, e.y, args[0])
+        env["energy"] = env.get("energy", 1.0) + taken * args[1]
+    return run
+
+
+def _field_seek(field: str):
+    def run(k, env, e, args):
+        if k.flow is not None:
+            k._flow_seek(env, e, field, args[0])
+        else:
+            k._field_seek(env, e, getattr(k.world, field), args[0])
+    return run
+
+
+def _metabolize(k, env, e, args):
+    env["energy"] = env.get("energy", 1.0) - args[0]
+    if env["energy"] <= 0.0:
+        env["alive"] = False
+
+
+def _trade(k, env, e, args):
+    rate = args[0]
+    market = k._sample_field(k.world.market_field, e.x, e.y)
+    env["wealth"] = env.get("wealth", 0.0) + market * rate
+    env["energy"] = env.get("energy", 1.0) - rate * 0.02
+
+
+def _wind(k, env, e, args):
+    strength = args[0]
+    env["vx"] = env.get("vx", e.vx) + k.world.wind_x * strength
+    env["vy"] = env.get("vy", e.vy) + k.world.wind_y * strength
+
+
+def _gust(k, env, e, args):
+    strength = args[0]
+    jx = (k._rand01(e.id, 11) - 0.5) * strength
+    jy = (k._rand01(e.id, 17) - 0.5) * strength
+    env["vx"] = env.get("vx", e.vx) + jx + k.world.wind_x
+    env["vy"] = env.get("vy", e.vy) + jy + k.world.wind_y
+
+
+def _decay_seen(k, env, e, args):
+    env["seen"] = max(0.0, env.get("seen", e.seen) - args[0])
+
+
+def _clamp_speed(k, env, e, args):
+    limit = k.cfg.max_speed if args[0] is None else args[0]
+    k._clamp_speed(env, limit)
+
+
+def _drag(k, env, e, args):
+    damp = max(0.0, 1.0 - args[0])
+    env["vx"] = env.get("vx", e.vx) * damp
+    env["vy"] = env.get("vy", e.vy) * damp
+    env["vz"] = env.get("vz", e.vz) * damp
+
+
+def _bounce(k, env, e, args):
+    k._bounce(env, e, args[0], args[1])
+
+
+def _collide(k, env, e, args):
+    k._collide(env, e, args[0], args[1], args[2])
+
+
+def _wander(k, env, e, args):
+    k._wander(env, e, args[0])
+
+
+def _seek(k, env, e, args):
+    tx = e.x if args[0] is None else args[0]
+    ty = e.y if args[1] is None else args[1]
+    k._seek(env, e, tx, ty, args[2])
+
+
+def _avoid(k, env, e, args):
+    tx = e.x if args[0] is None else args[0]
+    ty = e.y if args[1] is None else args[1]
+    k._avoid(env, e, tx, ty, args[2])
+
+
+def _wrap(k, env, e, args):
+    k._wrap(env, e, args[0])
+
+
+def _boids(mode: str):
+    def run(k, env, e, args):
+        radius, strength, selector = args[0], args[1], args[2]
+        neighbors = k._neighbors_of(e, radius)
+        if mode in ("attract", "repel"):
+            k._field_pull(env, e, neighbors, radius, strength, selector, mode=mode)
+        else:
+            k._boid_logic(env, e, neighbors, radius, strength, selector, mode=mode)
+    return run
+
+
+_register("emit_sound", _emit("sound_field", sound=True), (0.1,), {0, 1})
+_register("emit_food", _emit("food_field"), (0.1,), {0, 1})
+_register("consume_food", _consume("food_field"), (0.05, 1.0), {0, 1, 2})
+_register("metabolize", _metabolize, (0.01,), {0, 1})
+_register("emit_water", _emit("water_field"), (0.08,), {0, 1})
+_register("consume_water", _consume("water_field"), (0.05, 0.6), {0, 1, 2})
+_register("emit_road", _emit("road_field"), (0.1,), {0, 1})
+_register("emit_settlement", _emit("settlement_field"), (0.1,), {0, 1})
+_register("emit_home", _emit("home_field"), (0.1,), {0, 1})
+_register("emit_farm", _emit("farm_field"), (0.1,), {0, 1})
+_register("emit_market", _emit("market_field"), (0.1,), {0, 1})
+_register("follow_road", _field_seek("road_field"), (0.04,), {0, 1})
+_register("seek_home", _field_seek("home_field"), (0.03,), {0, 1})
+_register("seek_farm", _field_seek("farm_field"), (0.03,), {0, 1})
+_register("seek_market", _field_seek("market_field"), (0.03,), {0, 1})
+_register("trade", _trade, (0.02,), {0, 1})
+_register("wind", _wind, (1.0,), {0, 1})
+_register("gust", _gust, (1.0,), {0, 1})
+_register("decay_unseen", _decay_seen, (0.02,), {0, 1})
+_register("fade_color", _decay_seen, (0.02,), {0, 1})
+_register("clamp_speed", _clamp_speed, (None,), {0, 1})
+_register("drag", _drag, (0.02,), {0, 1})
+_register("bounce", _bounce, (0.0, 0.8), {0, 1, 2, 3})
+_register("collide", _collide, (3.0, 0.8, 0.06), {0, 1, 2, 3})
+_register("wander", _wander, (0.05,), {0, 1})
+_register("seek", _seek, (None, None, 0.05), {3})
+_register("avoid", _avoid, (None, None, 0.05), {3})
+_register("wrap", _wrap, (0.0,), {0, 2})
+for _mode in ("cohere", "align", "separate"):
+    _register(_mode, _boids(_mode), (12.0, 0.05, None), {0, 1, 2, 3}, raw=(2,))
+for _mode in ("attract", "repel"):
+    _register(_mode, _boids(_mode), (12.0, 0.05, None), {2, 3}, raw=(2,))
+del _mode
+
+
+_DYNAMIC = object()
+
+
+def fold_constant(expr: CompiledExpr) -> Any:
+    """Value of an expression that reads no variables and draws no randomness."""
+    if expr.names or expr.tree is None:
+        return _DYNAMIC
+    for node in ast.walk(expr.tree):
+        if isinstance(node, ast.Call) and node.func.id in ("rand", "randint"):
+            return _DYNAMIC
+    try:
+        return eval_expr(expr, {})
+    except Exception:
+        return _DYNAMIC
+
+
+def bind_action(action: Action) -> Action:
+    """Resolve a call Action to its handler and pre-parse its arguments.
+
+    Raises ValueError for calls that have no handler or are given more
+    arguments than the call takes.
+    """
+    spec = ACTIONS.get(action.name)
+    if spec is None:
+        raise ValueError(f"Unknown action '{action.name}()'")
+    args: List[CompiledExpr] = list(action.args or [])
+    if len(args) > max(spec.arity):
+        raise ValueError(f"Action '{action.name}()' takes at most {max(spec.arity)} args, got {len(args)}")
+    argv: List[Any] = list(spec.defaults)
+    dynamic: List[int] = []
+    for pos, arg in enumerate(args):
+        if pos >= len(argv):
+            argv.append(None)
+        if pos in spec.raw:
+            argv[pos] = arg
+            continue
+        value = fold_constant(arg)
+        try:
+            argv[pos] = float(value)
+        except (TypeError, ValueError):
+            argv[pos] = arg
+            dynamic.append(pos)
+    action.handler = spec.fn
+    action.argv = tuple(argv)
+    action.dynamic = tuple(dynamic)
+    return action
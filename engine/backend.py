@@ -22,9 +22,18 @@ class Backend:
     def clip(self, arr, lo, hi):
         return self.xp.clip(arr, lo, hi)
 
+    def add_at(self, arr, index, values):
+        """Unbuffered ``arr[index] += values`` (repeated indices accumulate)."""
+        if self.xp is np:
+            np.add.at(arr, index, values)
+            return
+        import cupyx
+
+        cupyx.scatter_add(arr, tuple(self.xp.asarray(i) for i in index), values)
+
     def asnumpy(self, arr):
         if self.xp is np:
-            return arr
+            return np.asarray(arr)
         return cp.asnumpy(arr)
 
 
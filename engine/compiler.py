@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from typing import Dict, List, Any
 import ast
 from lark import Lark, Transformer
+from lark.exceptions import VisitError
+from .actions import bind_action
 from .laws import Law, Action
 from .safeexpr import compile_expr, compile_ast_node
 
@@ -107,13 +109,13 @@ class _AST(Transformer):
         except SyntaxError as exc:
             raise ValueError(f"Invalid action syntax '{raw}': {exc}")
 
-        if isinstance(tree.body, ast.Call):
+        if isinstance(tree.body, ast.Call) and isinstance(tree.body.func, ast.Name):
             call_node = tree.body
             func_name = call_node.func.id
             compiled_args = []
             for arg in call_node.args:
-                compiled_args.append(compile_ast_node(arg))
-            return Action(kind="call", name=func_name, args=compiled_args)
+                compiled_args.append(compile_ast_node(arg, ast.unparse(arg)))
+            return bind_action(Action(kind="call", name=func_name, args=compiled_args))
 
         raise ValueError(f"Action must be assignment or function call: {raw}")
 
@@ -126,5 +128,9 @@ class CompiledProgram:
 
 def compile_program(src: str) -> CompiledProgram:
     tree = _PARSER.parse(src + "\n")
-    ast_res = _AST().transform(tree)
+    try:
+        ast_res = _AST().transform(tree)
+    except VisitError as exc:
+        # Surface compile errors (bad actions, unknown calls) as raised.
+        raise exc.orig_exc from None
     return CompiledProgram(consts=ast_res["consts"], laws=ast_res["laws"])
@@ -42,6 +42,8 @@ def seed_world(
             depth_min, depth_max = _range_or(profile.get("depth_range"), (0.0, 1.0))
             static = bool(profile.get("static", False))
             aquatic = bool(profile.get("aquatic", False))
+            if profile.get("kind"):
+                world.species.register(color, str(profile["kind"]))
             for _ in range(max(0, count)):
                 x = rng.uniform(0, w - 1)
                 y = rng.uniform(0, h - 1)
@@ -72,6 +74,7 @@ def seed_world(
                         energy=energy,
                         wealth=wealth,
                         aquatic=aquatic,
+                        static=static,
                     )
                 )
                 idx += 1
@@ -146,6 +149,7 @@ def seed_world(
     sea_idx = int(max(0, min(d - 1, round(sea_level * (d - 1)))))
     water = (z > height_idx[None, ...]) & (z <= sea_idx)
     world.voxel_field[water] = xp.uint8(2)
+    world.refresh_surface()
     # --------------------------
 
     return world
@@ -0,0 +1,484 @@
+"""Per-step updates of the world's scalar fields.
+
+``World.step_integrate`` used to diffuse each field with four ``roll`` calls,
+allocating a full-size temporary per call. Here the diffusing fields share one
+``(k, h, w)`` stack (the World attributes are views into it), and one pass of
+slice additions into a preallocated scratch buffer applies the 5-point
+average and the per-field decay to all of them at once.
+
+Boundary modes for the cells beyond the edge:
+
+* ``wrap``: toroidal, the previous ``roll`` behaviour;
+* ``clamp``: the edge cell stands in for its missing neighbor (no flux out);
+* ``zero``: missing neighbors are empty, so values leak out at the edges.
+
+Fields that only decay (roads, settlements, trails, ...) are driven by a
+FieldScheduler. Each one can update every ``interval`` steps with the decay
+compounded over the interval, trading a coarser decay curve for fewer
+full-array passes.
+
+The emission fields (roads, settlements, homes, farms, markets) can instead be
+stored as a TiledField: square tiles allocated on the first non-zero write and
+dropped once decay brings them below an epsilon, so memory and decay cost
+follow the occupied part of the map rather than its size.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .backend import Backend
+
+BOUNDARIES = ("wrap", "clamp", "zero")
+CONSUME_POLICIES = ("proportional", "ordered")
+
+# (World attribute, decay per step), diffused in this order.
+DIFFUSING_FIELDS: Tuple[Tuple[str, float], ...] = (
+    ("sound_field", 0.92),
+    ("food_field", 0.95),
+    ("water_field", 0.985),
+)
+
+# (World attribute, decay per step) of fields that decay without diffusing.
+DECAYING_FIELDS: Tuple[Tuple[str, float], ...] = (
+    ("road_field", 0.995),
+    ("settlement_field", 0.997),
+    ("home_field", 0.996),
+    ("farm_field", 0.996),
+    ("market_field", 0.996),
+    ("paradox_heat", 0.96),
+    ("trail_field", 0.92),
+)
+
+# Fields that World.set_sparse_fields stores as TiledFields.
+SPARSE_FIELDS: Tuple[str, ...] = ("road_field", "settlement_field", "home_field", "farm_field", "market_field")
+
+
+def choose_mode(value: Any, options: Sequence[str], label: str) -> str:
+    """Normalize a mode given by name or by index into ``options``."""
+    if isinstance(value, str):
+        mode = value.strip().lower()
+        if mode in options:
+            return mode
+    else:
+        try:
+            index = int(float(value))
+        except (TypeError, ValueError):
+            index = -1
+        if 0 <= index < len(options):
+            return options[index]
+    raise ValueError(f"Unknown {label}: {value!r} (expected one of {', '.join(options)})")
+
+
+def boundary_mode(value: Any) -> str:
+    """Normalize a boundary given by name or by index into BOUNDARIES."""
+    return choose_mode(value, BOUNDARIES, "field boundary")
+
+
+def consume_policy(value: Any) -> str:
+    """Normalize a consume policy given by name or by index into CONSUME_POLICIES."""
+    return choose_mode(value, CONSUME_POLICIES, "consume policy")
+
+
+def stencil_sum(f, out, boundary: str = "wrap") -> None:
+    """``out = f + its four axis neighbors`` over the last two axes of ``f``."""
+    out[...] = f
+    out[..., 1:, :] += f[..., :-1, :]
+    out[..., :-1, :] += f[..., 1:, :]
+    out[..., :, 1:] += f[..., :, :-1]
+    out[..., :, :-1] += f[..., :, 1:]
+    if boundary == "wrap":
+        out[..., 0, :] += f[..., -1, :]
+        out[..., -1, :] += f[..., 0, :]
+        out[..., :, 0] += f[..., :, -1]
+        out[..., :, -1] += f[..., :, 0]
+    elif boundary == "clamp":
+        out[..., 0, :] += f[..., 0, :]
+        out[..., -1, :] += f[..., -1, :]
+        out[..., :, 0] += f[..., :, 0]
+        out[..., :, -1] += f[..., :, -1]
+
+
+class FieldStack:
+    """Diffusing fields stored as one ``(k, h, w)`` array with scratch space.
+
+    ``bind(world)`` points the World attributes at slices of the stack. Code
+    that later rebinds an attribute to another array (the parallel engine's
+    shared buffers, for one) still gets it diffused, just on its own.
+    """
+
+    def __init__(self, backend: Backend, h: int, w: int, fields: Sequence[Tuple[str, float]] = DIFFUSING_FIELDS):
+        xp = backend.xp
+        self.backend = backend
+        self.names: List[str] = [name for name, _ in fields]
+        self.data = xp.zeros((len(self.names), h, w), dtype=xp.float32)
+        self.scratch = xp.zeros_like(self.data)
+        # Decay and the 1/5 of the average folded into one factor per field.
+        self.coef = xp.asarray([decay / 5.0 for _, decay in fields], dtype=xp.float32)[:, None, None]
+        self.views: Dict[str, Any] = {name: self.data[k] for k, name in enumerate(self.names)}
+
+    def bind(self, world) -> None:
+        for name, view in self.views.items():
+            current = getattr(world, name, None)
+            if current is not None and current is not view:
+                view[...] = current
+            setattr(world, name, view)
+
+    def step(self, world, boundary: str = "wrap") -> None:
+        xp = self.backend.xp
+        if all(getattr(world, name) is view for name, view in self.views.items()):
+            stencil_sum(self.data, self.scratch, boundary)
+            xp.multiply(self.scratch, self.coef, out=self.data)
+            return
+        for k, name in enumerate(self.names):
+            f = getattr(world, name)
+            stencil_sum(f, self.scratch[k], boundary)
+            xp.multiply(self.scratch[k], self.coef[k], out=f)
+
+
+@dataclass
+class FieldRate:
+    name: str
+    decay: float
+    diffuse: bool = False
+    interval: int = 1  # update every `interval` steps
+
+    @property
+    def const_name(self) -> str:
+        """Const that sets the interval, e.g. FIELD_INTERVAL_ROAD for road_field."""
+        key = self.name[: -len("_field")] if self.name.endswith("_field") else self.name
+        return f"FIELD_INTERVAL_{key.upper()}"
+
+
+class FieldScheduler:
+    """Decay and diffusion of the world's fields, each at its own cadence.
+
+    Diffusing fields go through the FieldStack every step; decay-only fields
+    are multiplied by ``decay ** interval`` on every ``interval``-th step.
+    Time spent per field (diffusion as one entry) accumulates in ``timings``.
+    """
+
+    def __init__(self, stack: FieldStack, decaying: Sequence[Tuple[str, float]] = DECAYING_FIELDS):
+        self.stack = stack
+        self.rates: Dict[str, FieldRate] = {}
+        for name, decay in DIFFUSING_FIELDS:
+            if name in stack.views:
+                self.rates[name] = FieldRate(name, decay, diffuse=True)
+        for name, decay in decaying:
+            self.rates[name] = FieldRate(name, decay)
+        self.ticks = 0
+        self.timings: Dict[str, float] = {"diffusion": 0.0}
+        self.timings.update({name: 0.0 for name, _ in decaying})
+
+    def set_interval(self, name: str, interval: int) -> None:
+        rate = self.rates[name]
+        interval = max(1, int(interval))
+        if rate.diffuse and interval != 1:
+            raise ValueError(f"{name} diffuses and must update every step")
+        rate.interval = interval
+
+    def step(self, world, boundary: str = "wrap") -> None:
+        self.ticks += 1
+        clock = time.perf_counter
+        t0 = clock()
+        self.stack.step(world, boundary)
+        self.timings["diffusion"] += clock() - t0
+        for rate in self.rates.values():
+            if rate.diffuse or self.ticks % rate.interval:
+                continue
+            t0 = clock()
+            field = getattr(world, rate.name)
+            field *= rate.decay ** rate.interval
+            self.timings[rate.name] += clock() - t0
+
+    def report(self) -> Dict[str, float]:
+        """Milliseconds spent per field since the world was created."""
+        return {name: seconds * 1000.0 for name, seconds in self.timings.items()}
+
+
+def _index_arrays(key) -> bool:
+    return isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, np.ndarray) for k in key)
+
+
+class TiledField:
+    """Sparse ``(h, w)`` float32 field kept as ``tile x tile`` blocks.
+
+    Reads of unallocated cells return 0. A tile is allocated when a non-zero
+    value is written into it and freed when ``*=`` (decay) leaves every cell
+    of it below ``eps`` in magnitude. Integer ``field[y, x]`` reads and writes
+    and integer-array gathers are served from the tiles; any other indexing,
+    and ``np.asarray(field)``, goes through a dense copy. Tiles always live
+    on the host.
+    """
+
+    ndim = 2
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, h: int, w: int, tile: int = 32, eps: float = 1e-4):
+        self.shape = (int(h), int(w))
+        self.tile = max(1, int(tile))
+        self.eps = float(eps)
+        self.tiles: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_dense(cls, arr, tile: int = 32, eps: float = 1e-4) -> "TiledField":
+        arr = np.asarray(arr, dtype=np.float32)
+        field = cls(arr.shape[0], arr.shape[1], tile, eps)
+        field.load(arr)
+        return field
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(t.nbytes) for t in self.tiles.values())
+
+    def load(self, arr) -> None:
+        """Replace the contents with a dense array, keeping non-zero tiles only."""
+        arr = np.asarray(arr, dtype=np.float32)
+        if arr.shape != self.shape:
+            raise ValueError(f"expected shape {self.shape}, got {arr.shape}")
+        size = self.tile
+        self.tiles = {}
+        for y0 in range(0, self.shape[0], size):
+            for x0 in range(0, self.shape[1], size):
+                block = arr[y0:y0 + size, x0:x0 + size]
+                if block.any():
+                    tile = np.zeros((size, size), dtype=np.float32)
+                    tile[: block.shape[0], : block.shape[1]] = block
+                    self.tiles[(y0 // size, x0 // size)] = tile
+
+    def to_dense(self) -> np.ndarray:
+        h, w = self.shape
+        size = self.tile
+        out = np.zeros(self.shape, dtype=np.float32)
+        for (ty, tx), tile in self.tiles.items():
+            y0, x0 = ty * size, tx * size
+            out[y0:y0 + size, x0:x0 + size] = tile[: min(size, h - y0), : min(size, w - x0)]
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.to_dense()
+        return out if dtype is None else out.astype(dtype)
+
+    def _cell(self, key):
+        """(y, x) of a key made of two integers, else None."""
+        if not isinstance(key, tuple) or len(key) != 2:
+            return None
+        iy, ix = key
+        if not isinstance(iy, (int, np.integer)) or not isinstance(ix, (int, np.integer)):
+            return None
+        h, w = self.shape
+        iy = int(iy) + h if iy < 0 else int(iy)
+        ix = int(ix) + w if ix < 0 else int(ix)
+        if not (0 <= iy < h and 0 <= ix < w):
+            raise IndexError(f"index {key} is out of bounds for field of shape {self.shape}")
+        return iy, ix
+
+    def __getitem__(self, key):
+        cell = self._cell(key)
+        if cell is not None:
+            tile = self.tiles.get((cell[0] // self.tile, cell[1] // self.tile))
+            if tile is None:
+                return np.float32(0.0)
+            return tile[cell[0] % self.tile, cell[1] % self.tile]
+        if _index_arrays(key):
+            return self.gather(key[0], key[1])
+        return self.to_dense()[key]
+
+    def __setitem__(self, key, value) -> None:
+        cell = self._cell(key)
+        if cell is None and _index_arrays(key):
+            self.put(key[0], key[1], value)
+            return
+        if cell is None:
+            dense = self.to_dense()
+            dense[key] = value
+            self.load(dense)
+            return
+        index = (cell[0] // self.tile, cell[1] // self.tile)
+        tile = self.tiles.get(index)
+        if tile is None:
+            if value == 0:
+                return
+            tile = self.tiles[index] = np.zeros((self.tile, self.tile), dtype=np.float32)
+        tile[cell[0] % self.tile, cell[1] % self.tile] = value
+
+    def _groups(self, iy, ix, allocate: bool = False):
+        """Yield ``(tile, positions, oy, ox)`` per tile touched by the cells.
+
+        Missing tiles are skipped, or created when ``allocate`` is set.
+        """
+        iy = np.asarray(iy, dtype=np.int64).ravel()
+        ix = np.asarray(ix, dtype=np.int64).ravel()
+        if iy.size == 0:
+            return
+        oy, ox = iy % self.tile, ix % self.tile
+        stride = self.shape[1] // self.tile + 1
+        keys = (iy // self.tile) * stride + ix // self.tile
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], keys.size]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            key = int(sorted_keys[start])
+            index = (key // stride, key % stride)
+            tile = self.tiles.get(index)
+            if tile is None:
+                if not allocate:
+                    continue
+                tile = self.tiles[index] = np.zeros((self.tile, self.tile), dtype=np.float32)
+            hit = order[start:end]
+            yield tile, hit, oy[hit], ox[hit]
+
+    def gather(self, iy, ix) -> np.ndarray:
+        """``field[iy, ix]`` for integer index arrays, as float32."""
+        out = np.zeros(np.shape(iy), dtype=np.float32)
+        flat = out.reshape(-1)
+        for tile, hit, oy, ox in self._groups(iy, ix):
+            flat[hit] = tile[oy, ox]
+        return out
+
+    def add_at(self, iy, ix, values) -> None:
+        """Unbuffered ``field[iy, ix] += values``, allocating tiles as needed."""
+        values = np.broadcast_to(np.asarray(values, dtype=np.float32), np.shape(iy)).reshape(-1)
+        keep = values != 0
+        if not keep.all():
+            iy, ix, values = np.ravel(iy)[keep], np.ravel(ix)[keep], values[keep]
+        for tile, hit, oy, ox in self._groups(iy, ix, allocate=True):
+            np.add.at(tile, (oy, ox), values[hit])
+
+    def put(self, iy, ix, values) -> None:
+        """``field[iy, ix] = values`` for integer index arrays."""
+        values = np.broadcast_to(np.asarray(values, dtype=np.float32), np.shape(iy)).reshape(-1)
+        for tile, hit, oy, ox in self._groups(iy, ix, allocate=bool(values.any())):
+            tile[oy, ox] = values[hit]
+
+    def __imul__(self, factor):
+        factor = np.float32(factor)
+        for index, tile in list(self.tiles.items()):
+            tile *= factor
+            if float(np.abs(tile).max()) < self.eps:
+                del self.tiles[index]
+        return self
+
+
+def gather_cells(backend: Backend, field, iy: np.ndarray, ix: np.ndarray) -> np.ndarray:
+    """Host copy of ``field[iy, ix]`` for dense (any backend) or tiled fields."""
+    if backend.xp is np or isinstance(field, TiledField):
+        return np.asarray(field[iy, ix])
+    xp = backend.xp
+    return backend.asnumpy(field[xp.asarray(iy), xp.asarray(ix)])
+
+
+def add_cells(backend: Backend, field, iy: np.ndarray, ix: np.ndarray, values) -> None:
+    """Unbuffered ``field[iy, ix] += values`` (repeated cells accumulate)."""
+    if isinstance(field, TiledField):
+        field.add_at(iy, ix, values)
+        return
+    values = backend.xp.asarray(np.broadcast_to(values, np.shape(iy)), dtype=field.dtype)
+    backend.add_at(field, (iy, ix), values)
+
+
+def put_cells(backend: Backend, field, iy: np.ndarray, ix: np.ndarray, values) -> None:
+    if isinstance(field, TiledField):
+        field.put(iy, ix, values)
+        return
+    xp = backend.xp
+    field[xp.asarray(iy), xp.asarray(ix)] = xp.asarray(values, dtype=field.dtype)
+
+
+class _Requests:
+    """Columns of queued requests: scalars from the scalar engine, arrays from the vector one."""
+
+    def __init__(self, dtypes: Sequence[Any]):
+        self.dtypes = tuple(dtypes)
+        self.rows: List[List[Any]] = [[] for _ in self.dtypes]
+        self.chunks: List[Tuple[np.ndarray, ...]] = []
+
+    def add(self, *values) -> None:
+        shape = np.shape(values[0])
+        if shape:
+            self.chunks.append(tuple(np.broadcast_to(np.asarray(v, dtype=t), shape).ravel() for v, t in zip(values, self.dtypes)))
+        else:
+            for col, v in zip(self.rows, values):
+                col.append(v)
+
+    def columns(self) -> Tuple[np.ndarray, ...]:
+        parts = [tuple(np.asarray(col, dtype=t) for col, t in zip(self.rows, self.dtypes))] + self.chunks
+        return tuple(np.concatenate(cols) for cols in zip(*parts))
+
+
+class FieldBatch:
+    """Field deposits and draws collected over one substep and applied at once.
+
+    Call handlers queue requests instead of touching the fields; ``apply``
+    then adds all deposits with an unbuffered add and resolves the draws on
+    each cell against what it holds after them:
+
+    * ``proportional``: every draw on a cell is scaled by
+      ``min(1, available / demand)``, so the result does not depend on entity
+      order;
+    * ``ordered``: draws are served in entity index order, the order of the
+      scalar engine's loop.
+
+    The energy gains (``taken * gain``) go into the entity table in one pass.
+    """
+
+    def __init__(self, policy: str = "proportional"):
+        self.policy = consume_policy(policy)
+        self._deposits: Dict[str, _Requests] = {}
+        self._draws: Dict[str, _Requests] = {}
+
+    def deposit(self, name: str, iy, ix, amount) -> None:
+        req = self._deposits.get(name)
+        if req is None:
+            req = self._deposits[name] = _Requests((np.int64, np.int64, np.float64))
+        req.add(iy, ix, amount)
+
+    def consume(self, name: str, entity, iy, ix, amount, gain) -> None:
+        req = self._draws.get(name)
+        if req is None:
+            req = self._draws[name] = _Requests((np.int64, np.int64, np.int64, np.float64, np.float64))
+        req.add(entity, iy, ix, amount, gain)
+
+    def apply(self, world, table=None) -> None:
+        """Write queued requests into ``world``'s fields and ``table``'s energy."""
+        table = world.entities if table is None else table
+        backend = world.backend
+        deposits, draws = self._deposits, self._draws
+        self._deposits, self._draws = {}, {}
+        for name, req in deposits.items():
+            iy, ix, amount = req.columns()
+            add_cells(backend, getattr(world, name), iy, ix, amount)
+        energy = table.column("energy")
+        for name, req in draws.items():
+            entity, iy, ix, amount, gain = req.columns()
+            if not entity.size:
+                continue
+            field = getattr(world, name)
+            cells = iy * world.w + ix
+            uniq, first, inverse = np.unique(cells, return_index=True, return_inverse=True)
+            available = gather_cells(backend, field, iy[first], ix[first]).astype(np.float64)
+            taken = self._resolve(available, inverse, entity, np.maximum(amount, 0.0))
+            left = available - np.bincount(inverse, weights=taken, minlength=uniq.size)
+            put_cells(backend, field, iy[first], ix[first], np.maximum(left, 0.0))
+            np.add.at(energy, entity, taken * gain)
+
+    def _resolve(self, available: np.ndarray, cell: np.ndarray, entity: np.ndarray, amount: np.ndarray) -> np.ndarray:
+        """Amount each draw gets from ``available[cell]`` under the policy."""
+        supply = np.maximum(available, 0.0)
+        if self.policy == "proportional":
+            demand = np.bincount(cell, weights=amount, minlength=supply.size)
+            scale = np.where(demand > supply, supply / np.where(demand > 0, demand, 1.0), 1.0)
+            return amount * scale[cell]
+        order = np.lexsort((entity, cell))
+        a = amount[order]
+        c = cell[order]
+        served = np.cumsum(a) - a  # drawn before this one, across all cells
+        start = np.r_[True, c[1:] != c[:-1]]
+        served -= np.maximum.accumulate(np.where(start, served, 0.0))
+        taken = np.empty_like(a)
+        taken[order] = np.clip(supply[c] - served, 0.0, a)
+        return taken
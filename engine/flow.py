@@ -0,0 +1,199 @@
+"""Direction maps for the field-seeking calls.
+
+``follow_road``, ``seek_home``, ``seek_farm`` and ``seek_market`` steer an
+entity toward the best cell around it. Instead of scanning the 3x3
+neighborhood per entity and call, a FlowField stores one step ``(dx, dy)`` per
+cell for the whole grid, rebuilt every ``interval`` substeps, and the calls
+become a lookup (a gather in the vector engine).
+
+Methods:
+
+* ``gradient``: the step toward the highest of the 3x3 neighbors (edges
+  clamped, first maximum in row-major order wins), exactly what the per-entity
+  scan did;
+* ``distance``: cells whose value is below ``threshold`` step along a
+  breadth-first distance transform toward the nearest cell at or above it,
+  over land only and up to ``radius`` steps away. Diagonal steps need both
+  cells beside them to be land, so routes do not cut between two water
+  cells. Entities on a plateau then still head somewhere. Source cells, water
+  and cells out of reach fall back to the gradient step.
+
+Maps live on the host as int8 arrays, whatever the backend.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Tuple
+
+import numpy as np
+
+from .fields import choose_mode
+
+FLOW_METHODS = ("gradient", "distance")
+
+# Calls that seek a field, and the World attribute each follows.
+FLOW_CALLS: Dict[str, str] = {
+    "follow_road": "road_field",
+    "seek_home": "home_field",
+    "seek_farm": "farm_field",
+    "seek_market": "market_field",
+}
+
+# 3x3 scan order of the gradient step (matches the old per-entity loop).
+_SCAN = tuple((dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+# Expansion order of the distance transform: edges before corners.
+_RING = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def flow_method(value: Any) -> str:
+    """Normalize a flow method given by name or by index into FLOW_METHODS."""
+    return choose_mode(value, FLOW_METHODS, "flow method")
+
+
+def gradient_steps(f: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-cell step toward the highest 3x3 neighbor, or (0, 0) on a local max."""
+    h, w = f.shape
+    padded = np.pad(f, 1, mode="edge")
+    best = f.copy()
+    dx = np.zeros((h, w), dtype=np.int8)
+    dy = np.zeros((h, w), dtype=np.int8)
+    for oy, ox in _SCAN:
+        val = padded[1 + oy:1 + oy + h, 1 + ox:1 + ox + w]
+        better = val > best
+        best = np.where(better, val, best)
+        dx[better] = ox
+        dy[better] = oy
+    # A clamped neighbor past the edge is the edge cell itself.
+    ys, xs = np.indices((h, w))
+    dx[...] = np.clip(xs + dx, 0, w - 1) - xs
+    dy[...] = np.clip(ys + dy, 0, h - 1) - ys
+    return dx, dy
+
+
+def _shifted(mask: np.ndarray, oy: int, ox: int) -> np.ndarray:
+    """``out[y, x] = mask[y + oy, x + ox]``, False past the edges."""
+    h, w = mask.shape
+    out = np.zeros_like(mask)
+    out[max(0, -oy):h - max(0, oy), max(0, -ox):w - max(0, ox)] = mask[
+        max(0, oy):h - max(0, -oy), max(0, ox):w - max(0, -ox)
+    ]
+    return out
+
+
+def distance_steps(
+    f: np.ndarray, passable: np.ndarray, threshold: float, radius: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Steps toward the nearest source (``f >= threshold``) over passable cells.
+
+    Returns ``(dx, dy, routed)``; ``routed`` marks the cells that got a step.
+    """
+    dx = np.zeros(f.shape, dtype=np.int8)
+    dy = np.zeros(f.shape, dtype=np.int8)
+    reached = (f >= threshold) & passable
+    routed = np.zeros(f.shape, dtype=bool)
+    frontier = reached
+    # A diagonal step is open only if both orthogonal cells beside it are.
+    open_to = {
+        (oy, ox): passable & _shifted(passable, oy, 0) & _shifted(passable, 0, ox) if oy and ox else passable
+        for oy, ox in _RING
+    }
+    for _ in range(max(0, int(radius))):
+        fresh = np.zeros(f.shape, dtype=bool)
+        for oy, ox in _RING:
+            take = _shifted(frontier, oy, ox) & open_to[oy, ox] & ~reached & ~fresh
+            dx[take] = ox
+            dy[take] = oy
+            fresh |= take
+        if not fresh.any():
+            break
+        reached |= fresh
+        routed |= fresh
+        frontier = fresh
+    return dx, dy, routed
+
+
+@dataclass
+class FlowField:
+    name: str
+    interval: int = 1  # rebuild every `interval` substeps
+    dx: Any = field(default=None, repr=False)
+    dy: Any = field(default=None, repr=False)
+
+    @property
+    def const_name(self) -> str:
+        """Const that sets the interval, e.g. FLOW_INTERVAL_ROAD for road_field."""
+        key = self.name[: -len("_field")] if self.name.endswith("_field") else self.name
+        return f"FLOW_INTERVAL_{key.upper()}"
+
+
+class FlowFields:
+    """Direction maps of the fields some law seeks, rebuilt at their cadence."""
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        method: str = "gradient",
+        interval: int = 1,
+        threshold: float = 0.05,
+        radius: int = 32,
+    ):
+        self.method = flow_method(method)
+        self.threshold = float(threshold)
+        self.radius = int(radius)
+        self.fields: Dict[str, FlowField] = {
+            name: FlowField(name, max(1, int(interval))) for name in dict.fromkeys(names)
+        }
+        self.ticks = 0
+        self.rebuilds = 0
+
+    @property
+    def halo_rows(self) -> int:
+        """Rows around a band that ``update(rows=...)`` needs to be exact."""
+        return max(1, self.radius + 1) if self.method == "distance" else 1
+
+    def set_interval(self, name: str, interval: int) -> None:
+        self.fields[name].interval = max(1, int(interval))
+
+    def update(self, world, rows: Tuple[int, int] | None = None) -> None:
+        """Advance one substep, rebuilding the maps that are due.
+
+        ``rows`` limits the rebuild to a band of rows (a parallel worker's
+        strip plus halo); steps are then computed from that band alone, so
+        they match the whole-grid maps only ``halo_rows`` or more rows away
+        from the band's edges.
+        """
+        due = [flow for flow in self.fields.values() if flow.dx is None or self.ticks % flow.interval == 0]
+        self.ticks += 1
+        if not due:
+            return
+        r0, r1 = rows if rows is not None else (0, world.h)
+        passable = None
+        for flow in due:
+            if flow.dx is None:
+                flow.dx = np.zeros((world.h, world.w), dtype=np.int8)
+                flow.dy = np.zeros((world.h, world.w), dtype=np.int8)
+            f = np.asarray(world.backend.asnumpy(getattr(world, flow.name)))[r0:r1]
+            dx, dy = gradient_steps(f)
+            if self.method == "distance":
+                if passable is None:
+                    passable = self._land(world)[r0:r1]
+                rdx, rdy, routed = distance_steps(f, passable, self.threshold, self.radius)
+                dx = np.where(routed, rdx, dx)
+                dy = np.where(routed, rdy, dy)
+            flow.dx[r0:r1] = dx
+            flow.dy[r0:r1] = dy
+            self.rebuilds += 1
+
+    @staticmethod
+    def _land(world) -> np.ndarray:
+        """Cells above sea level; everything when the world has no land at all."""
+        terrain = np.asarray(world.backend.asnumpy(world.terrain_field))
+        land = terrain / max(world.terrain_scale, 0.001) >= world.sea_level
+        if not land.any():
+            land[...] = True
+        return land
+
+    def step_at(self, name: str, iy, ix):
+        """``(dx, dy)`` steps of the named field's map at the given cells."""
+        flow = self.fields[name]
+        return flow.dx[iy, ix], flow.dy[iy, ix]
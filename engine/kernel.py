@@ -2,29 +2,81 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, Any, List, Tuple
 import math
+import os
 import random
+import numpy as np
 from .model import World, Entity
-from .laws import Law
+from .laws import Law, Action
+from .actions import bind_action
+from .fields import FieldBatch, boundary_mode
+from .flow import FLOW_CALLS, FlowFields
 from .safeexpr import eval_expr
+from .optimize import OptimizeReport, dump_program, optimize_laws
 from .paradox import dynamic_instability_flags
+from .spatial import DEFAULT_CELL_SIZE, CellList, VerletList, auto_cell_size
+from .selectors import compile_selectors
+from .vector import VectorEngine
 
 @dataclass
 class RuntimeConfig:
     max_speed: float = 4.0
     substeps: int = 1
+    engine: str = "scalar"  # "scalar" (per entity), "vector" (per law, over columns) or "parallel"
+    neighbor_skin: float = 0.0  # > 0 caches neighbor pairs in a Verlet list
+    workers: int = 0  # worker processes for the "parallel" engine (0 = one per core)
 
 class Kernel:
-    def __init__(self, world: World, consts: Dict[str, Any], laws: List[Law]):
+    def __init__(
+        self,
+        world: World,
+        consts: Dict[str, Any],
+        laws: List[Law],
+        engine: str | None = None,
+        workers: int | None = None,
+    ):
         self.world = world
         self.consts_expr = consts
         self.laws = sorted(laws, key=lambda l: l.priority, reverse=True)
         self.consts: Dict[str, Any] = {}
         self.cfg = RuntimeConfig()
-        # Optimization: Spatial Grid
-        self.grid: Dict[Tuple[int, int], List[Entity]] = {}
-        self.grid_cell_size = 32
         self._rng = random.Random(0)
+        for law in self.laws:
+            for a in law.actions:
+                if a.kind == "call" and a.handler is None:
+                    bind_action(a)
         self._compile_consts()
+        self.optimized: OptimizeReport | None = None
+        if float(self.consts.get("OPTIMIZE", 1)):
+            self.laws, self.optimized = optimize_laws(self.laws, self.consts)
+        # Spatial index, only rebuilt when some law queries neighbors.
+        cell = auto_cell_size(self.laws)
+        self._spatial = cell is not None
+        cutoff = cell if cell is not None else DEFAULT_CELL_SIZE
+        skin = self.cfg.neighbor_skin if self._spatial else 0.0
+        self.grid_cell_size = cutoff + skin
+        self.grid = CellList(self.world.w, self.world.h, self.grid_cell_size)
+        self._verlet = VerletList(self.grid, cutoff, skin) if skin > 0 else None
+        self._grid_stamp = 0
+        self._grid_builds = 0
+        self._selectors = compile_selectors(self.laws, self.world.entities.color_code)
+        if engine is not None:
+            self.cfg.engine = engine
+        if workers is not None:
+            self.cfg.workers = int(workers)
+        if self.cfg.engine not in ("scalar", "vector", "parallel"):
+            raise ValueError(f"Unknown engine mode: {self.cfg.engine}")
+        self._vector = VectorEngine(self) if self.cfg.engine == "vector" else None
+        self._parallel = None
+        if self.cfg.engine == "parallel":
+            from .parallel import ParallelEngine
+            self._parallel = ParallelEngine(self, self.cfg.workers or os.cpu_count() or 1)
+
+    def close(self) -> None:
+        """Stop worker processes, if any. The kernel stays usable in scalar mode."""
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
+            self.cfg.engine = "scalar"
 
     def _compile_consts(self):
         env = {"true": True, "false": False}
@@ -34,6 +86,12 @@ class Kernel:
         
         self.cfg.max_speed = float(self.consts.get("MAX_SPEED", 4.0))
         self.cfg.substeps = max(1, int(float(self.consts.get("SUBSTEPS", 1))))
+        self.cfg.neighbor_skin = max(0.0, float(self.consts.get("NEIGHBOR_SKIN", 0.0)))
+        if "VECTORIZE" in self.consts:
+            self.cfg.engine = "vector" if float(self.consts["VECTORIZE"]) else "scalar"
+        if "PARALLEL" in self.consts and int(float(self.consts["PARALLEL"])) > 0:
+            self.cfg.engine = "parallel"
+            self.cfg.workers = int(float(self.consts["PARALLEL"]))
         
         for k in ["W", "H"]:
             if k in self.consts:
@@ -54,6 +112,36 @@ class Kernel:
         if "WIND_Y" in self.consts: self.world.wind_y = float(self.consts["WIND_Y"])
         if "GRAVITY_Z" in self.consts: self.world.gravity_z = float(self.consts["GRAVITY_Z"])
         if "GZ" in self.consts: self.world.gravity_z = float(self.consts["GZ"])
+        if "DEFER_VOXELS" in self.consts: self.world.defer_voxels = bool(float(self.consts["DEFER_VOXELS"]))
+        for rate in self.world.schedule.rates.values():
+            if rate.const_name in self.consts:
+                self.world.schedule.set_interval(rate.name, int(float(self.consts[rate.const_name])))
+        if "FIELD_BOUNDARY" in self.consts: self.world.field_boundary = boundary_mode(self.consts["FIELD_BOUNDARY"])
+        if "WATER_FLOW" in self.consts: self.world.hydrology.set_mode(self.consts["WATER_FLOW"])
+        if "WATER_FLOW_RATE" in self.consts: self.world.hydrology.rate = float(self.consts["WATER_FLOW_RATE"])
+        self.field_batch = None
+        if float(self.consts.get("FIELD_BATCH", 0)):
+            self.field_batch = FieldBatch(self.consts.get("FIELD_CONSUME", "proportional"))
+        self.flow = None
+        if float(self.consts.get("FLOW_FIELDS", 0)):
+            seeking = [FLOW_CALLS[a.name] for law in self.laws for a in law.actions if a.kind == "call" and a.name in FLOW_CALLS]
+            if seeking:
+                self.flow = FlowFields(
+                    seeking,
+                    method=self.consts.get("FLOW_METHOD", "gradient"),
+                    interval=int(float(self.consts.get("FLOW_INTERVAL", 1))),
+                    threshold=float(self.consts.get("FLOW_THRESHOLD", 0.05)),
+                    radius=int(float(self.consts.get("FLOW_RADIUS", 32))),
+                )
+                for flow in self.flow.fields.values():
+                    if flow.const_name in self.consts:
+                        self.flow.set_interval(flow.name, int(float(self.consts[flow.const_name])))
+        if "SPARSE_FIELDS" in self.consts:
+            self.world.set_sparse_fields(
+                bool(float(self.consts["SPARSE_FIELDS"])),
+                tile=int(float(self.consts.get("SPARSE_TILE", 32))),
+                eps=float(self.consts.get("SPARSE_EPSILON", 1e-4)),
+            )
 
         # Ensure voxel field matches world depth after const updates.
         if self.world.voxel_field is not None:
@@ -71,6 +159,10 @@ class Kernel:
         # Using existing field logic...
         self._init_terrain()
 
+    def dump_program(self) -> str:
+        """Listing of the laws as the kernel runs them, after const folding."""
+        return dump_program(self.laws, self.optimized)
+
     def _init_terrain(self):
         if "TERRAIN_SEED" not in self.consts: return
         # ... (Legacy terrain gen code preserved implicitly or short-circuited if simple)
@@ -79,24 +171,56 @@ class Kernel:
         pass
 
     def _build_grid(self):
-        self.grid.clear()
-        cs = self.grid_cell_size
-        for e in self.world.entities:
-            if not e.alive: continue
-            k = (int(e.x // cs), int(e.y // cs))
-            if k not in self.grid: self.grid[k] = []
-            self.grid[k].append(e)
+        t = self.world.entities
+        x, y, alive = t.column("x"), t.column("y"), t.column("alive")
+        self._grid_stamp += 1
+        if self._verlet is not None:
+            self._verlet.update(x, y, alive)
+        else:
+            self.grid.build(x, y, alive)
+            self._grid_builds += 1
+
+    def _neighbors_of(self, e: Entity, radius: float) -> np.ndarray:
+        """Candidate neighbor indices of e; filter by distance."""
+        if self._verlet is not None:
+            return self._verlet.query(e.index, e.x, e.y, radius)
+        return self.grid.query(e.x, e.y, radius)
+
+    def _pairs(self, x: np.ndarray, y: np.ndarray, idx: np.ndarray, radius: float):
+        """Neighbor pairs within radius for idx (see CellList.pairs)."""
+        if self._verlet is not None:
+            return self._verlet.pairs(x, y, idx, radius)
+        return self.grid.pairs(x, y, idx, radius)
+
+    def metrics(self) -> Dict[str, float]:
+        """Spatial index counters since the kernel was built."""
+        if self._verlet is not None:
+            checks, builds = self._verlet.checks, self._verlet.builds
+        else:
+            checks = builds = self._grid_builds
+        return {
+            "neighbor_checks": float(checks),
+            "neighbor_rebuilds": float(builds),
+            "neighbor_rebuild_rate": builds / checks if checks else 0.0,
+            "flow_rebuilds": float(self.flow.rebuilds) if self.flow is not None else 0.0,
+        }
+
+    def _in_radius(self, e: Entity, neighbors: np.ndarray, radius: float):
+        """Live neighbors other than e within radius, with offsets from e."""
+        t = self.world.entities
+        nb = neighbors[(neighbors != e.index) & t.column("alive")[neighbors]]
+        dx = t.column("x")[nb] - e.x
+        dy = t.column("y")[nb] - e.y
+        d2 = dx * dx + dy * dy
+        keep = d2 <= radius * radius
+        return nb[keep], dx[keep], dy[keep], d2[keep]
 
-    def _get_neighbors(self, x: float, y: float, radius: float) -> List[Entity]:
-        cs = self.grid_cell_size
-        cx, cy = int(x // cs), int(y // cs)
-        r_cells = int(math.ceil(radius / cs))
-        neighbors = []
-        for dy in range(-r_cells, r_cells + 1):
-            for dx in range(-r_cells, r_cells + 1):
-                cell = self.grid.get((cx + dx, cy + dy))
-                if cell: neighbors.extend(cell)
-        return neighbors
+    def _select_neighbors(self, selector, env: Dict[str, Any], nb: np.ndarray) -> np.ndarray:
+        t = self.world.entities
+        compiled = self._selectors.get(id(selector))
+        if compiled is not None:
+            return compiled.pair_mask(t, nb, env, self._grid_stamp)
+        return np.fromiter((self._selector_ok(selector, env, t[j]) for j in nb.tolist()), dtype=bool, count=len(nb))
 
     def tick(self, observer_xy: Tuple[int,int] | None = None, observer_radius: int = 55):
         # 1. Update visibility
@@ -118,269 +242,105 @@ class Kernel:
         })
 
         for _ in range(substeps):
-            self._build_grid() # O(N)
             season = 0.5 + 0.5 * math.sin((self.world.time / self.world.season_cycle) * 2.0 * math.pi) if self.world.season_cycle else 0.7
             rain = 0.5 + 0.5 * math.sin((self.world.time / self.world.weather_cycle) * 2.0 * math.pi) if self.world.weather_cycle else 0.2
-            
-            for e in self.world.entities:
-                if not e.alive: continue
-                
-                # Shallow copy is faster than update for every entity
-                env = base_env.copy()
-                # Inject entity props
-                env.update(e.as_env())
-                env.update(self._sample_env_fields(e, season, rain))
-                
-                for law in self.laws:
-                    if not e.alive: break
-                    if not eval_expr(law.when, env): continue
-                    
-                    for a in law.actions:
-                        if a.kind == "assign":
-                            val = eval_expr(a.expr, env)
-                            curr = env.get(a.name, 0.0)
-                            if a.op == "=": env[a.name] = val
-                            elif a.op == "+=": env[a.name] = curr + val
-                            elif a.op == "-=": env[a.name] = curr - val
-                            elif a.op == "*=": env[a.name] = curr * val
-                            elif a.op == "/=": env[a.name] = curr / val if val != 0 else curr
-                        else:
-                            self._call(a.name, a.args, env, e)
-                    
-                    e.apply_env(env)
-            
+
+            if self._parallel is not None:
+                self._parallel.run(base_env, season, rain)
+                self.world.step_integrate(dt=step_dt)
+                continue
+
+            if self._spatial:
+                self._build_grid()
+            if self.flow is not None:
+                self.flow.update(self.world)
+
+            if self._vector is not None:
+                self._vector.run(self._vector.build_env(base_env, season, rain))
+            else:
+                for e in self.world.entities:
+                    if not e.alive: continue
+                    self._apply_laws(e, base_env, season, rain)
+
+            if self.field_batch is not None:
+                self.field_batch.apply(self.world)
             self.world.step_integrate(dt=step_dt)
             
         # Paradox/Heat update (simplified)
         pass
 
-    def _call(self, name: str, args, env: Dict[str, Any], e: Entity):
-        # Eval args
-        avals = [eval_expr(x, env) for x in args]
+    def _apply_laws(self, e: Entity, base_env: Dict[str, Any], season: float, rain: float) -> None:
+        """Run every law for one entity, writing back after each law that fires."""
+        # Shallow copy is faster than update for every entity
+        env = base_env.copy()
+        # Inject entity props
+        env.update(e.as_env())
+        env.update(self._sample_env_fields(e, season, rain))
         
-        # ... (Most handlers same as before)
-        if name == "emit_sound":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.sound_field, e.x, e.y, amt)
-            env["sound"] = env.get("sound", 0.0) + amt
-            return
-        if name == "emit_food":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.food_field, e.x, e.y, amt)
-            return
-        if name == "consume_food":
-            amt = float(avals[0]) if avals else 0.05
-            gain = float(avals[1]) if len(avals) > 1 else 1.0
-            taken = self._consume_field(self.world.food_field, e.x, e.y, amt)
-            env["energy"] = env.get("energy", 1.0) + taken * gain
-            return
-        if name == "metabolize":
-            rate = float(avals[0]) if avals else 0.01
-            env["energy"] = env.get("energy", 1.0) - rate
-            if env["energy"] <= 0.0:
-                env["alive"] = False
-            return
-        if name == "emit_water":
-            amt = float(avals[0]) if avals else 0.08
-            self._deposit_field(self.world.water_field, e.x, e.y, amt)
-            return
-        if name == "consume_water":
-            amt = float(avals[0]) if avals else 0.05
-            gain = float(avals[1]) if len(avals) > 1 else 0.6
-            taken = self._consume_field(self.world.water_field, e.x, e.y, amt)
-            env["energy"] = env.get("energy", 1.0) + taken * gain
-            return
-        if name == "emit_road":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.road_field, e.x, e.y, amt)
-            return
-        if name == "emit_settlement":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.settlement_field, e.x, e.y, amt)
-            return
-        if name == "emit_home":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.home_field, e.x, e.y, amt)
-            return
-        if name == "emit_farm":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.farm_field, e.x, e.y, amt)
-            return
-        if name == "emit_market":
-            amt = float(avals[0]) if avals else 0.1
-            self._deposit_field(self.world.market_field, e.x, e.y, amt)
-            return
-        if name == "follow_road":
-            strength = float(avals[0]) if avals else 0.04
-            self._field_seek(env, e, self.world.road_field, strength)
-            return
-        if name == "seek_home":
-            strength = float(avals[0]) if avals else 0.03
-            self._field_seek(env, e, self.world.home_field, strength)
-            return
-        if name == "seek_farm":
-            strength = float(avals[0]) if avals else 0.03
-            self._field_seek(env, e, self.world.farm_field, strength)
-            return
-        if name == "seek_market":
-            strength = float(avals[0]) if avals else 0.03
-            self._field_seek(env, e, self.world.market_field, strength)
-            return
-        if name == "trade":
-            rate = float(avals[0]) if avals else 0.02
-            market = self._sample_field(self.world.market_field, e.x, e.y)
-            env["wealth"] = env.get("wealth", 0.0) + market * rate
-            env["energy"] = env.get("energy", 1.0) - rate * 0.02
-            return
-        if name == "wind":
-            strength = float(avals[0]) if avals else 1.0
-            env["vx"] = env.get("vx", e.vx) + self.world.wind_x * strength
-            env["vy"] = env.get("vy", e.vy) + self.world.wind_y * strength
-            return
-        if name == "gust":
-            strength = float(avals[0]) if avals else 1.0
-            jx = (self._rand01(e.id, 11) - 0.5) * strength
-            jy = (self._rand01(e.id, 17) - 0.5) * strength
-            env["vx"] = env.get("vx", e.vx) + jx + self.world.wind_x
-            env["vy"] = env.get("vy", e.vy) + jy + self.world.wind_y
-            return
-        if name == "decay_unseen":
-            rate = float(avals[0]) if avals else 0.02
-            env["seen"] = max(0.0, env.get("seen", e.seen) - rate)
-            return
-        if name == "fade_color":
-            rate = float(avals[0]) if avals else 0.02
-            env["seen"] = max(0.0, env.get("seen", e.seen) - rate)
-            return
-        if name == "clamp_speed":
-            limit = float(avals[0]) if avals else self.cfg.max_speed
-            self._clamp_speed(env, limit)
-            return
-        if name == "drag":
-            amt = float(avals[0]) if avals else 0.02
-            damp = max(0.0, 1.0 - amt)
-            env["vx"] = env.get("vx", e.vx) * damp
-            env["vy"] = env.get("vy", e.vy) * damp
-            env["vz"] = env.get("vz", e.vz) * damp
-            return
-        if name == "bounce":
-            margin = float(avals[0]) if avals else 0.0
-            elasticity = float(avals[1]) if len(avals) > 1 else 0.8
-            self._bounce(env, e, margin, elasticity)
-            return
-        if name == "collide":
-            radius = float(avals[0]) if avals else 3.0
-            bounce = float(avals[1]) if len(avals) > 1 else 0.8
-            push = float(avals[2]) if len(avals) > 2 else 0.06
-            self._collide(env, e, radius, bounce, push)
-            return
-        if name == "wander":
-            strength = float(avals[0]) if avals else 0.05
-            self._wander(env, e, strength)
-            return
-        if name == "seek":
-            tx = float(avals[0]) if len(avals) > 0 else e.x
-            ty = float(avals[1]) if len(avals) > 1 else e.y
-            strength = float(avals[2]) if len(avals) > 2 else 0.05
-            self._seek(env, e, tx, ty, strength)
-            return
-        if name == "avoid":
-            tx = float(avals[0]) if len(avals) > 0 else e.x
-            ty = float(avals[1]) if len(avals) > 1 else e.y
-            strength = float(avals[2]) if len(avals) > 2 else 0.05
-            self._avoid(env, e, tx, ty, strength)
-            return
-        if name == "wrap":
-            margin = float(avals[0]) if avals else 0.0
-            self._wrap(env, e, margin)
-            return
-        
-        # Optimizing spatial calls:
-        if name in ("cohere", "align", "separate", "attract", "repel"):
-            radius = float(avals[0]) if len(avals) > 0 else 12.0
-            strength = float(avals[1]) if len(avals) > 1 else 0.05
-            selector = args[2] if len(args) > 2 else None # Note: pass AST, not val
-            
-            # Using Grid
-            neighbors = self._get_neighbors(e.x, e.y, radius)
-            
-            if name == "cohere":
-                self._boid_logic(env, e, neighbors, radius, strength, selector, mode="cohere")
-            elif name == "align":
-                self._boid_logic(env, e, neighbors, radius, strength, selector, mode="align")
-            elif name == "separate":
-                self._boid_logic(env, e, neighbors, radius, strength, selector, mode="separate")
-            elif name == "attract":
-                self._field_pull(env, e, neighbors, radius, strength, selector, mode="attract")
-            elif name == "repel":
-                self._field_pull(env, e, neighbors, radius, strength, selector, mode="repel")
-                
+        for law in self.laws:
+            if not e.alive: break
+            if not law.always and not eval_expr(law.when, env): continue
+            
+            for a in law.actions:
+                if a.kind == "assign":
+                    val = eval_expr(a.expr, env)
+                    curr = env.get(a.name, 0.0)
+                    if a.op == "=": env[a.name] = val
+                    elif a.op == "+=": env[a.name] = curr + val
+                    elif a.op == "-=": env[a.name] = curr - val
+                    elif a.op == "*=": env[a.name] = curr * val
+                    elif a.op == "/=": env[a.name] = curr / val if val != 0 else curr
+                else:
+                    self._invoke(a, env, e)
+            
+            e.apply_env(env)
+
+    def _invoke(self, a: Action, env: Dict[str, Any], e: Entity):
+        argv = a.argv
+        if a.dynamic:
+            argv = list(argv)
+            for k in a.dynamic:
+                argv[k] = float(eval_expr(argv[k], env))
+        a.handler(self, env, e, argv)
+
     def _boid_logic(self, env, e, neighbors, radius, strength, selector, mode):
-        r2 = radius*radius
-        ex, ey = e.x, e.y
-        count = 0
-        sx, sy = 0.0, 0.0
-        
-        for other in neighbors:
-            if other.id == e.id or not other.alive: continue
-            if selector is not None and not self._selector_ok(selector, env, other):
-                continue
-            dx = other.x - ex
-            dy = other.y - ey
-            d2 = dx*dx + dy*dy
-            if d2 > r2: continue
-            
-            # Selector check? (Requires passing AST and evaling per neighbor - slow but supported)
-            
-            if mode == "cohere":
-                sx += other.x
-                sy += other.y
-                count += 1
-            elif mode == "align":
-                sx += other.vx
-                sy += other.vy
-                count += 1
-            elif mode == "separate":
-                if d2 < 0.001: d2 = 0.001
-                inv = 1.0 / math.sqrt(d2)
-                sx += -dx * inv
-                sy += -dy * inv
-                count += 1
+        t = self.world.entities
+        nb, dx, dy, d2 = self._in_radius(e, neighbors, radius)
+        if selector is not None and len(nb):
+            keep = self._select_neighbors(selector, env, nb)
+            nb, dx, dy, d2 = nb[keep], dx[keep], dy[keep], d2[keep]
+        count = len(nb)
+        if count == 0:
+            return
 
-        if count > 0:
-            if mode == "cohere":
-                self._seek(env, e, sx/count, sy/count, strength)
-            elif mode == "align":
-                vx, vy = env.get("vx", e.vx), env.get("vy", e.vy)
-                env["vx"] = vx + ((sx/count) - e.vx) * strength
-                env["vy"] = vy + ((sy/count) - e.vy) * strength
-            elif mode == "separate":
-                env["vx"] = env.get("vx", e.vx) + sx * strength
-                env["vy"] = env.get("vy", e.vy) + sy * strength
+        if mode == "cohere":
+            self._seek(env, e, float(t.column("x")[nb].sum()) / count, float(t.column("y")[nb].sum()) / count, strength)
+        elif mode == "align":
+            vx, vy = env.get("vx", e.vx), env.get("vy", e.vy)
+            env["vx"] = vx + (float(t.column("vx")[nb].sum()) / count - e.vx) * strength
+            env["vy"] = vy + (float(t.column("vy")[nb].sum()) / count - e.vy) * strength
+        elif mode == "separate":
+            inv = 1.0 / np.sqrt(np.maximum(d2, 0.001))
+            env["vx"] = env.get("vx", e.vx) + float((-dx * inv).sum()) * strength
+            env["vy"] = env.get("vy", e.vy) + float((-dy * inv).sum()) * strength
 
     def _field_pull(self, env, e, neighbors, radius, strength, selector, mode):
-        r2 = radius*radius
-        ex, ey = e.x, e.y
         vx, vy = env.get("vx", e.vx), env.get("vy", e.vy)
         mass = env.get("mass", e.mass)
-        
-        for other in neighbors:
-            if other.id == e.id or not other.alive: continue
-            if selector is not None and not self._selector_ok(selector, env, other):
-                continue
-            dx = other.x - ex
-            dy = other.y - ey
-            d2 = dx*dx + dy*dy
-            if d2 > r2 or d2 < 0.001: continue
-            
+        nb, dx, dy, d2 = self._in_radius(e, neighbors, radius)
+        near = d2 >= 0.001
+        nb, dx, dy, d2 = nb[near], dx[near], dy[near], d2[near]
+        if selector is not None and len(nb):
+            keep = self._select_neighbors(selector, env, nb)
+            dx, dy, d2 = dx[keep], dy[keep], d2[keep]
+
+        if len(dx):
             inv = 1.0 / (d2 + 8.0)
-            fx = dx * inv * strength
-            fy = dy * inv * strength
-            if mode == "repel": fx, fy = -fx, -fy
-            
-            vx += fx / max(0.1, mass)
-            vy += fy / max(0.1, mass)
-            
+            sign = -1.0 if mode == "repel" else 1.0
+            m = max(0.1, mass)
+            vx += float((dx * inv * strength).sum()) * sign / m
+            vy += float((dy * inv * strength).sum()) * sign / m
+
         env["vx"] = vx
         env["vy"] = vy
 
@@ -436,25 +396,18 @@ class Kernel:
         env["vy"] = vy
 
     def _collide(self, env, e, radius: float, bounce: float, push: float):
-        neighbors = self._get_neighbors(e.x, e.y, radius)
-        ex, ey = e.x, e.y
         vx = env.get("vx", e.vx)
         vy = env.get("vy", e.vy)
-        for other in neighbors:
-            if other.id == e.id or not other.alive:
-                continue
-            dx = ex - other.x
-            dy = ey - other.y
-            d2 = dx*dx + dy*dy
-            if d2 <= 0.0001 or d2 > radius * radius:
-                continue
-            dist = math.sqrt(d2)
-            nx = dx / dist
-            ny = dy / dist
-            vx += nx * push
-            vy += ny * push
-            vx += nx * bounce * 0.02
-            vy += ny * bounce * 0.02
+        nb, dx, dy, d2 = self._in_radius(e, self._neighbors_of(e, radius), radius)
+        near = d2 > 0.0001
+        if near.any():
+            dist = np.sqrt(d2[near])
+            # Offsets point from e to the neighbor; collisions push away from it.
+            nx = -dx[near] / dist
+            ny = -dy[near] / dist
+            gain = push + bounce * 0.02
+            vx += float(nx.sum()) * gain
+            vy += float(ny.sum()) * gain
         env["vx"] = vx
         env["vy"] = vy
 
@@ -479,7 +432,14 @@ class Kernel:
         if best != (cx, cy):
             self._seek(env, e, float(best[0]), float(best[1]), strength)
 
-    def _sample_env_fields(self, e: Entity, season: float, rain: float) -> Dict[str, Any]:
+    def _flow_seek(self, env, e, name: str, strength: float):
+        """_field_seek through the precomputed direction map of a field."""
+        iy, ix = self._cell(e.x, e.y)
+        dx, dy = (int(v) for v in self.flow.step_at(name, iy, ix))
+        if dx or dy:
+            self._seek(env, e, float(ix + dx), float(iy + dy), strength)
+
+    def _clock_env(self, season: float, rain: float) -> Dict[str, Any]:
         day_cycle = float(self.world.day_cycle) if self.world.day_cycle else 0.0
         if day_cycle > 0:
             day_phase = (self.world.time % day_cycle) / day_cycle
@@ -489,6 +449,17 @@ class Kernel:
         day_sin = math.sin(day_angle)
         day_cos = math.cos(day_angle)
         return {
+            "season": season,
+            "rain": rain,
+            "time": float(self.world.time),
+            "day_phase": day_phase,
+            "day_sin": day_sin,
+            "day_cos": day_cos,
+            "daylight": 0.5 + 0.5 * day_sin,
+        }
+
+    def _sample_env_fields(self, e: Entity, season: float, rain: float) -> Dict[str, Any]:
+        env = {
             "terrain": self._sample_field(self.world.terrain_field, e.x, e.y),
             "water": self._sample_field(self.world.water_field, e.x, e.y),
             "fertility": self._sample_field(self.world.fertility_field, e.x, e.y),
@@ -498,29 +469,27 @@ class Kernel:
             "home": self._sample_field(self.world.home_field, e.x, e.y),
             "farm": self._sample_field(self.world.farm_field, e.x, e.y),
             "market": self._sample_field(self.world.market_field, e.x, e.y),
-            "season": season,
-            "rain": rain,
             "latitude": self._latitude(e.y),
-            "time": float(self.world.time),
-            "day_phase": day_phase,
-            "day_sin": day_sin,
-            "day_cos": day_cos,
-            "daylight": 0.5 + 0.5 * day_sin,
         }
+        env.update(self._clock_env(season, rain))
+        return env
 
-    def _sample_field(self, field, x: float, y: float) -> float:
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        """(iy, ix) of the field cell nearest to (x, y), clamped to the world."""
         ix = int(max(0, min(self.world.w - 1, round(x))))
         iy = int(max(0, min(self.world.h - 1, round(y))))
+        return iy, ix
+
+    def _sample_field(self, field, x: float, y: float) -> float:
+        iy, ix = self._cell(x, y)
         return float(field[iy, ix])
 
     def _deposit_field(self, field, x: float, y: float, amount: float) -> None:
-        ix = int(max(0, min(self.world.w - 1, round(x))))
-        iy = int(max(0, min(self.world.h - 1, round(y))))
+        iy, ix = self._cell(x, y)
         field[iy, ix] += amount
 
     def _consume_field(self, field, x: float, y: float, amount: float) -> float:
-        ix = int(max(0, min(self.world.w - 1, round(x))))
-        iy = int(max(0, min(self.world.h - 1, round(y))))
+        iy, ix = self._cell(x, y)
         available = float(field[iy, ix])
         taken = min(available, amount)
         field[iy, ix] = available - taken
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Callable, List, Tuple
 from .safeexpr import CompiledExpr
 
 @dataclass
@@ -10,6 +10,12 @@ class Action:
     op: str = ""
     expr: CompiledExpr | None = None
     args: List[CompiledExpr] | None = None
+    # Filled by actions.bind_action for calls: handler(kernel, env, entity, argv).
+    # argv holds folded constants/defaults; positions in `dynamic` are
+    # CompiledExpr evaluated per call.
+    handler: Callable[..., None] | None = None
+    argv: Tuple[Any, ...] = ()
+    dynamic: Tuple[int, ...] = ()
 
 @dataclass
 class Law:
@@ -17,3 +23,5 @@ class Law:
     priority: int
     when: CompiledExpr
     actions: List[Action]
+    # Set by optimize.optimize_laws when `when` folds to a true constant.
+    always: bool = False
@@ -1,8 +1,13 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Any, List
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, Iterator, List
+
+import numpy as np
 
 from .backend import Backend, get_backend
+from .fields import SPARSE_FIELDS, FieldScheduler, FieldStack, TiledField, boundary_mode
+from .hydrology import Hydrology
+from .species import SpeciesRegistry
 import math
 
 @dataclass
@@ -24,6 +29,7 @@ class Entity:
     energy: float = 1.0
     wealth: float = 0.0
     aquatic: bool = False
+    static: bool = False  # spawned from a static profile; never assigned by laws
 
     def as_env(self) -> Dict[str, Any]:
         return {
@@ -32,7 +38,7 @@ class Entity:
             "mass": self.mass, "hardness": self.hardness, "color": self.color,
             "age": self.age, "seen": self.seen, "alive": self.alive, "sound": self.sound,
             "energy": self.energy, "wealth": self.wealth, "aquatic": self.aquatic,
-            "true": True, "false": False,
+            "static": self.static, "true": True, "false": False,
         }
 
     def apply_env(self, env: Dict[str, Any]) -> None:
@@ -53,6 +59,274 @@ class Entity:
         if "color" in env:
             self.color = str(env["color"])
 
+# Columns backing EntityTable. Floats stay float64 so views round-trip the
+# same values the old dataclass held; color is interned into a small code.
+ENTITY_COLUMNS: Dict[str, Any] = {
+    "id": np.int64,
+    "x": np.float64,
+    "y": np.float64,
+    "z": np.float64,
+    "vx": np.float64,
+    "vy": np.float64,
+    "vz": np.float64,
+    "mass": np.float64,
+    "hardness": np.float64,
+    "age": np.float64,
+    "seen": np.float64,
+    "sound": np.float64,
+    "energy": np.float64,
+    "wealth": np.float64,
+    "alive": np.bool_,
+    "aquatic": np.bool_,
+    "static": np.bool_,
+    "color": np.int16,
+}
+
+_ENTITY_DEFAULTS: Dict[str, Any] = {
+    "age": 0.0,
+    "seen": 1.0,
+    "alive": True,
+    "sound": 0.0,
+    "energy": 1.0,
+    "wealth": 0.0,
+    "aquatic": False,
+    "static": False,
+}
+
+# Fields written back by apply_env (matches Entity.apply_env).
+_APPLY_FLOATS = ("x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "seen", "sound", "energy", "wealth")
+_APPLY_BOOLS = ("alive", "aquatic")
+
+
+class EntityTable:
+    """Structure-of-arrays entity store.
+
+    Every attribute lives in a contiguous NumPy column (see ENTITY_COLUMNS).
+    Iterating or indexing yields lightweight EntityView objects that read and
+    write through to the columns, so code written against Entity keeps working
+    while vectorized paths use column() directly.
+    """
+
+    def __init__(self, entities: Iterable[Any] | None = None, capacity: int = 64):
+        self._n = 0
+        self._cap = max(1, int(capacity))
+        self._cols: Dict[str, np.ndarray] = {
+            name: np.zeros(self._cap, dtype=dtype) for name, dtype in ENTITY_COLUMNS.items()
+        }
+        self.colors: List[str] = []
+        self._color_codes: Dict[str, int] = {}
+        # Bumped whenever a color, aquatic or static value changes; caches of
+        # masks over those columns (engine.selectors) key on it.
+        self.static_version = 0
+        if entities is not None:
+            self.extend(entities)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __iter__(self) -> Iterator["EntityView"]:
+        for i in range(self._n):
+            yield EntityView(self, i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [EntityView(self, i) for i in range(*key.indices(self._n))]
+        i = int(key)
+        if i < 0:
+            i += self._n
+        if i < 0 or i >= self._n:
+            raise IndexError("entity index out of range")
+        return EntityView(self, i)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(col[: self._n].nbytes) for col in self._cols.values())
+
+    def column(self, name: str) -> np.ndarray:
+        """Live view of one column for the current entity count."""
+        return self._cols[name][: self._n]
+
+    def adopt(self, columns: Dict[str, np.ndarray]) -> None:
+        """Move storage into caller-provided arrays (e.g. shared memory).
+
+        Every column in ENTITY_COLUMNS must be given, with matching dtype and
+        at least len(self) rows; capacity becomes the shortest array.
+        """
+        cap = min(len(columns[name]) for name in ENTITY_COLUMNS)
+        if cap < self._n:
+            raise ValueError(f"adopted columns hold {cap} rows, table has {self._n}")
+        for name in ENTITY_COLUMNS:
+            col = columns[name]
+            col[: self._n] = self._cols[name][: self._n]
+            self._cols[name] = col
+        self._cap = cap
+
+    @classmethod
+    def attach(cls, columns: Dict[str, np.ndarray], n: int, colors: List[str]) -> "EntityTable":
+        """Table viewing existing column arrays without copying them."""
+        table = cls()
+        table._cols = dict(columns)
+        table._cap = min(len(columns[name]) for name in ENTITY_COLUMNS)
+        table._n = int(n)
+        table.set_colors(colors)
+        return table
+
+    def set_colors(self, colors: List[str]) -> None:
+        """Replace the color code table (codes must stay stable)."""
+        self.colors = list(colors)
+        self._color_codes = {c: i for i, c in enumerate(self.colors)}
+
+    def color_code(self, color: str) -> int:
+        code = self._color_codes.get(color)
+        if code is None:
+            code = len(self.colors)
+            self.colors.append(color)
+            self._color_codes[color] = code
+        return code
+
+    def color_name(self, code: int) -> str:
+        return self.colors[int(code)]
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._cap:
+            return
+        cap = self._cap
+        while cap < size:
+            cap *= 2
+        for name, col in self._cols.items():
+            grown = np.zeros(cap, dtype=col.dtype)
+            grown[: self._n] = col[: self._n]
+            self._cols[name] = grown
+        self._cap = cap
+
+    def append(self, entity: Any) -> "EntityView":
+        self._reserve(self._n + 1)
+        i = self._n
+        cols = self._cols
+        for name in ENTITY_COLUMNS:
+            if name == "color":
+                cols["color"][i] = self.color_code(str(getattr(entity, "color", "gray")))
+            else:
+                cols[name][i] = getattr(entity, name, _ENTITY_DEFAULTS.get(name, 0))
+        self._n += 1
+        return EntityView(self, i)
+
+    def extend(self, entities: Iterable[Any]) -> None:
+        for e in entities:
+            self.append(e)
+
+    def alive_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.column("alive"))
+
+    def index_of(self, entity_id: int) -> int:
+        hits = np.flatnonzero(self.column("id") == int(entity_id))
+        return int(hits[0]) if hits.size else -1
+
+    def by_id(self, entity_id: int) -> "EntityView | None":
+        i = self.index_of(entity_id)
+        return EntityView(self, i) if i >= 0 else None
+
+    def to_entity(self, i: int) -> Entity:
+        return EntityView(self, i).to_entity()
+
+
+def _column_property(name: str, cast):
+    def getter(self):
+        return cast(self._t._cols[name][self._i])
+
+    def setter(self, value):
+        self._t._cols[name][self._i] = value
+        if name in ("aquatic", "static"):
+            self._t.static_version += 1
+
+    return property(getter, setter)
+
+
+class EntityView:
+    """Row handle into an EntityTable; quacks like Entity."""
+
+    __slots__ = ("_t", "_i")
+
+    def __init__(self, table: EntityTable, index: int):
+        self._t = table
+        self._i = index
+
+    @property
+    def index(self) -> int:
+        return self._i
+
+    @property
+    def color(self) -> str:
+        return self._t.colors[self._t._cols["color"][self._i]]
+
+    @color.setter
+    def color(self, value: str) -> None:
+        code = self._t.color_code(str(value))
+        if self._t._cols["color"][self._i] != code:
+            self._t._cols["color"][self._i] = code
+            self._t.static_version += 1
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, EntityView):
+            return other._t is self._t and other._i == self._i
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._t), self._i))
+
+    def __repr__(self) -> str:
+        return f"EntityView(id={self.id}, x={self.x:.3f}, y={self.y:.3f}, color={self.color!r}, alive={self.alive})"
+
+    def to_entity(self) -> Entity:
+        return Entity(**{name: getattr(self, name) for name in ENTITY_COLUMNS})
+
+    def as_env(self) -> Dict[str, Any]:
+        cols = self._t._cols
+        i = self._i
+        env = {name: float(cols[name][i]) for name in _APPLY_FLOATS}
+        env["age"] = float(cols["age"][i])
+        env["alive"] = bool(cols["alive"][i])
+        env["aquatic"] = bool(cols["aquatic"][i])
+        env["static"] = bool(cols["static"][i])
+        env["color"] = self._t.colors[cols["color"][i]]
+        env["true"] = True
+        env["false"] = False
+        return env
+
+    def apply_env(self, env: Dict[str, Any]) -> None:
+        cols = self._t._cols
+        i = self._i
+        before = (cols["color"][i], cols["aquatic"][i])
+        for name in _APPLY_FLOATS:
+            if name in env:
+                cols[name][i] = float(env[name])
+        for name in _APPLY_BOOLS:
+            if name in env:
+                cols[name][i] = bool(env[name])
+        if "color" in env:
+            cols["color"][i] = self._t.color_code(str(env["color"]))
+        if (cols["color"][i], cols["aquatic"][i]) != before:
+            self._t.static_version += 1
+
+
+for _name, _dtype in ENTITY_COLUMNS.items():
+    if _name == "color":
+        continue
+    if _dtype is np.bool_:
+        _cast = bool
+    elif _dtype is np.int64:
+        _cast = int
+    else:
+        _cast = float
+    setattr(EntityView, _name, _column_property(_name, _cast))
+del _name, _dtype, _cast
+
+
+def _grid_index(v: np.ndarray, limit: int) -> np.ndarray:
+    """Nearest cell index along one axis, clamped to [0, limit - 1]."""
+    return np.clip(np.rint(np.nan_to_num(v)), 0, max(0, limit - 1)).astype(np.int64)
+
+
 @dataclass
 class World:
     w: int
@@ -60,7 +334,7 @@ class World:
     dt: float
     d: int = 16
     time: float = 0.0
-    entities: List[Entity] = None
+    entities: EntityTable = None
     sound_field: Any = None
     paradox_heat: Any = None
     backend: Backend | None = None
@@ -84,14 +358,27 @@ class World:
     season_cycle: float = 0.0
     wind_x: float = 0.0
     wind_y: float = 0.0
+    field_boundary: str = "wrap"  # edge handling of field diffusion: wrap, clamp or zero
+    diffusion: FieldStack | None = field(default=None, init=False, repr=False, compare=False)
+    schedule: FieldScheduler | None = field(default=None, init=False, repr=False, compare=False)
+    hydrology: Hydrology | None = field(default=None, init=False, repr=False, compare=False)
+    species: SpeciesRegistry = field(default_factory=SpeciesRegistry, repr=False, compare=False)
+    defer_voxels: bool = False  # sync voxel_field only when voxels() is called
+    sparse_fields: bool = False  # store SPARSE_FIELDS as TiledFields (see set_sparse_fields)
+    # (h, w) int32 maps of the voxel columns: top solid layer and top water
+    # layer (equal to surface_height where dry). Host arrays on every backend.
+    surface_height: Any = field(default=None, init=False, repr=False, compare=False)
+    water_top: Any = field(default=None, init=False, repr=False, compare=False)
+    _surface: Any = field(default=None, init=False, repr=False, compare=False)
+    _voxel_synced: Any = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.backend is None:
             self.backend = get_backend(False)
         if self.d < 1:
             self.d = 1
-        if self.entities is None:
-            self.entities = []
+        if not isinstance(self.entities, EntityTable):
+            self.entities = EntityTable(self.entities or [])
         if self.sound_field is None:
             self.sound_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
         if self.paradox_heat is None:
@@ -120,30 +407,39 @@ class World:
             self.market_field = self.backend.zeros((self.h, self.w), dtype=self.backend.xp.float32)
         if self.voxel_field is None:
             self.voxel_field = self.backend.zeros((self.d, self.h, self.w), dtype=self.backend.xp.uint8)
+        self.field_boundary = boundary_mode(self.field_boundary)
+        self.diffusion = FieldStack(self.backend, self.h, self.w)
+        self.diffusion.bind(self)
+        self.schedule = FieldScheduler(self.diffusion)
+        self.hydrology = Hydrology(self.backend)
+        if self.sparse_fields:
+            self.set_sparse_fields(True)
+
+    def set_sparse_fields(self, enabled: bool = True, tile: int = 32, eps: float = 1e-4) -> None:
+        """Switch the emission fields (SPARSE_FIELDS) between dense and tiled storage.
+
+        Tiled fields drop a tile once decay leaves all of it below ``eps``,
+        so values that small read as 0 instead of fading further.
+        """
+        for name in SPARSE_FIELDS:
+            current = getattr(self, name)
+            if enabled:
+                if isinstance(current, TiledField) and current.tile == int(tile):
+                    current.eps = float(eps)
+                    continue
+                setattr(self, name, TiledField.from_dense(self.backend.asnumpy(current), tile, eps))
+            elif isinstance(current, TiledField):
+                setattr(self, name, self.backend.xp.asarray(current.to_dense()))
+        self.sparse_fields = bool(enabled)
 
     def step_integrate(self, dt: float | None = None):
         step_dt = self.dt if dt is None else float(dt)
         self.time += step_dt
 
-        self.sound_field *= 0.92
-        sf = self.sound_field
-        sf[:] = (
-            sf
-            + self.backend.roll(sf, 1, 0)
-            + self.backend.roll(sf, -1, 0)
-            + self.backend.roll(sf, 1, 1)
-            + self.backend.roll(sf, -1, 1)
-        ) / 5.0
-
-        self.food_field *= 0.95
-        ff = self.food_field
-        ff[:] = (
-            ff
-            + self.backend.roll(ff, 1, 0)
-            + self.backend.roll(ff, -1, 0)
-            + self.backend.roll(ff, 1, 1)
-            + self.backend.roll(ff, -1, 1)
-        ) / 5.0
+        # Decay + diffusion of sound, food and water, and decay of the slow
+        # fields (roads, settlements, trails, ...) at their own cadence.
+        self.schedule.step(self, self.field_boundary)
+
         if self.season_cycle and self.season_cycle > 0:
             season = 0.5 + 0.5 * math.sin((self.time / self.season_cycle) * 2.0 * math.pi)
         else:
@@ -151,187 +447,192 @@ class World:
         self.food_field += self.fertility_field * (0.012 + 0.02 * season)
         self.food_field[:] = self.backend.clip(self.food_field, 0.0, 2.0)
 
-        self.water_field *= 0.985
-        wf = self.water_field
-        wf[:] = (
-            wf
-            + self.backend.roll(wf, 1, 0)
-            + self.backend.roll(wf, -1, 0)
-            + self.backend.roll(wf, 1, 1)
-            + self.backend.roll(wf, -1, 1)
-        ) / 5.0
         if self.weather_cycle and self.weather_cycle > 0:
             rain = 0.5 + 0.5 * math.sin((self.time / self.weather_cycle) * 2.0 * math.pi)
         else:
             rain = 0.2
         self.water_field += self.climate_field * (0.004 + 0.012 * rain)
-        self._flow_water()
+        self.hydrology.step(self)
         self.water_field[:] = self.backend.clip(self.water_field, 0.0, 2.0)
         self.fertility_field += (self.water_field * 0.01) - (self.fertility_field * 0.004)
         self.fertility_field[:] = self.backend.clip(self.fertility_field, 0.0, 1.5)
-        self.road_field *= 0.995
-        self.settlement_field *= 0.997
-        self.home_field *= 0.996
-        self.farm_field *= 0.996
-        self.market_field *= 0.996
 
-        # Keep voxel field in sync with terrain + water for 3D rendering/collision.
-        self._sync_voxel_field()
-
-        self.paradox_heat *= 0.96
-        self.trail_field *= 0.92
-
-        for e in self.entities:
-            if not e.alive:
-                continue
-            
-            # Apply gravity on Z axis (true 3D)
-            e.vz += float(self.gravity_z) * step_dt
+        # Collision reads the per-column voxel maps; the volume itself is
+        # only rebuilt where they changed, and only on demand when deferred.
+        self.refresh_surface()
+        if not self.defer_voxels:
+            self._sync_voxel_field(self._surface)
+
+        self._integrate_entities(step_dt)
+
+    def _integrate_entities(self, step_dt: float) -> None:
+        """Move live entities one step: gravity, water rules, bounds, voxel collision.
+
+        Entities do not interact here, so the stage runs as array operations
+        over the entity columns; field lookups are one gather each.
+        """
+        table = self.entities
+        idx = table.alive_indices()
+        if not idx.size:
+            return
+        cols = {name: table.column(name) for name in ENTITY_COLUMNS}
+        x, y, z = cols["x"][idx], cols["y"][idx], cols["z"][idx]
+        vx, vy = cols["vx"][idx], cols["vy"][idx]
+
+        # Apply gravity on Z axis (true 3D)
+        vz = cols["vz"][idx] + float(self.gravity_z) * step_dt
+        new_x = x + vx * step_dt
+        new_y = y + vy * step_dt
+        new_z = z + vz * step_dt
 
-            # Calculate new position
-            new_x = e.x + e.vx * step_dt
-            new_y = e.y + e.vy * step_dt
-            new_z = e.z + e.vz * step_dt
-            
-            # WATER TRAVERSAL CHECK
-            # Determine if entity is aquatic or land-based
-            color = getattr(e, 'color', '').lower()
-            is_aquatic = bool(getattr(e, "aquatic", False)) or any(
-                term in color for term in ['fish', 'aqua', 'water', 'shark', 'jellyfish', 'diver', 'swimmer', 'ocean', 'sea', 'coral']
-            )
-            
-            # Check water level at new position
-            nx = int(max(0, min(self.w - 1, round(new_x))))
-            ny = int(max(0, min(self.h - 1, round(new_y))))
-            nz = int(max(0, min(self.d - 1, round(new_z))))
-            water_level = float(self.backend.asnumpy(self.water_field[ny, nx]))
-            voxel_here = self._voxel_at(nx, ny, nz)
-            in_water = voxel_here == 2
+        # WATER TRAVERSAL CHECK
+        # Aquatic by flag or by a water-themed color name.
+        by_color = self.species.aquatic_codes(table.colors)
+        is_aquatic = cols["aquatic"][idx] | by_color[cols["color"][idx]]
+        nx = _grid_index(new_x, self.w)
+        ny = _grid_index(new_y, self.h)
+        nz = _grid_index(new_z, self.d)
+        water_level = self._gather(self.water_field, ny, nx).astype(np.float64)
+        in_water = self._voxels_at(nx, ny, nz) == 2
 
-            if is_aquatic:
-                # Aquatic entities: can only stay in water, slow down on land
-                if water_level < 0.3 and not in_water:
-                    # Slow down significantly on land
-                    e.vx *= 0.5
-                    e.vy *= 0.5
-                    # Don't update position fully - resist leaving water
-                    new_x = e.x + e.vx * step_dt * 0.2
-                    new_y = e.y + e.vy * step_dt * 0.2
-            else:
-                # Land entities: cannot enter deep water (>0.5)
-                if water_level > 0.5 or in_water:
-                    # Push back from water - don't enter
-                    e.vx = -e.vx * 0.8
-                    e.vy = -e.vy * 0.8
-                    # Keep old position
-                    new_x = e.x
-                    new_y = e.y
-                elif water_level > 0.3:
-                    # Shallow water - slow down significantly
-                    e.vx *= 0.6
-                    e.vy *= 0.6
-            
-            # Apply new position
-            e.x = new_x
-            e.y = new_y
-            e.z = new_z
-            e.age += step_dt
-            e.seen = max(0.0, e.seen - 0.01)
-            
-            # BOUNDARY CLAMPING - Keep entities within world bounds without wrapping
-            bounce = 0.6
-            if e.x < 0:
-                e.x = 0.0
-                e.vx = abs(e.vx) * bounce
-            elif e.x >= self.w:
-                e.x = self.w - 1.0
-                e.vx = -abs(e.vx) * bounce
-            if e.y < 0:
-                e.y = 0.0
-                e.vy = abs(e.vy) * bounce
-            elif e.y >= self.h:
-                e.y = self.h - 1.0
-                e.vy = -abs(e.vy) * bounce
-            # Keep z within reasonable bounds
-            max_z = max(1.0, float(self.d - 1))
-            e.z = max(0.0, min(max_z, e.z))
+        # Aquatic entities: can only stay in water, slow down on land
+        stranded = is_aquatic & (water_level < 0.3) & ~in_water
+        vx = np.where(stranded, vx * 0.5, vx)
+        vy = np.where(stranded, vy * 0.5, vy)
+        # Don't update position fully - resist leaving water
+        new_x = np.where(stranded, x + vx * step_dt * 0.2, new_x)
+        new_y = np.where(stranded, y + vy * step_dt * 0.2, new_y)
+        # Land entities: cannot enter deep water (>0.5); shallow water slows them
+        blocked = ~is_aquatic & ((water_level > 0.5) | in_water)
+        wading = ~is_aquatic & ~blocked & (water_level > 0.3)
+        vx = np.where(blocked, -vx * 0.8, np.where(wading, vx * 0.6, vx))
+        vy = np.where(blocked, -vy * 0.8, np.where(wading, vy * 0.6, vy))
+        x = np.where(blocked, x, new_x)
+        y = np.where(blocked, y, new_y)
+        z = new_z
 
-            # Voxel collision: prevent entering solid blocks
-            cx = int(max(0, min(self.w - 1, round(e.x))))
-            cy = int(max(0, min(self.h - 1, round(e.y))))
-            cz = int(max(0, min(self.d - 1, round(e.z))))
-            if self._voxel_at(cx, cy, cz) == 1:
-                ground = self._column_height(cx, cy)
-                e.z = max(e.z, ground + 0.1)
-                e.vz = 0.0
-                # If still inside solid, roll back horizontal move
-                if self._voxel_at(cx, cy, int(max(0, min(self.d - 1, round(e.z))))) == 1:
-                    e.x = max(0.0, min(self.w - 1, e.x - e.vx * step_dt))
-                    e.y = max(0.0, min(self.h - 1, e.y - e.vy * step_dt))
-                    e.vx *= 0.2
-                    e.vy *= 0.2
-
-            ix = int(max(0, min(self.w-1, round(e.x))))
-            iy = int(max(0, min(self.h-1, round(e.y))))
-            e.sound = float(self.backend.asnumpy(self.sound_field[iy, ix]))
-            self.trail_field[iy, ix] += 0.35
-
-    def _flow_water(self):
-        t = self.terrain_field
-        w = self.water_field
+        # BOUNDARY CLAMPING - Keep entities within world bounds without wrapping
+        bounce = 0.6
+        vx = np.where(x < 0, np.abs(vx) * bounce, np.where(x >= self.w, -np.abs(vx) * bounce, vx))
+        x = np.where(x < 0, 0.0, np.where(x >= self.w, self.w - 1.0, x))
+        vy = np.where(y < 0, np.abs(vy) * bounce, np.where(y >= self.h, -np.abs(vy) * bounce, vy))
+        y = np.where(y < 0, 0.0, np.where(y >= self.h, self.h - 1.0, y))
+        max_z = max(1.0, float(self.d - 1))
+        z = np.clip(z, 0.0, max_z)
+
+        # Voxel collision: prevent entering solid blocks
+        cx = _grid_index(x, self.w)
+        cy = _grid_index(y, self.h)
+        solid = self._voxels_at(cx, cy, _grid_index(z, self.d)) == 1
+        if solid.any():
+            z = np.where(solid, np.maximum(z, self._column_heights(cx, cy) + 0.1), z)
+            vz = np.where(solid, 0.0, vz)
+            # If still inside solid, roll back horizontal move
+            stuck = solid & (self._voxels_at(cx, cy, _grid_index(z, self.d)) == 1)
+            x = np.where(stuck, np.clip(x - vx * step_dt, 0.0, self.w - 1), x)
+            y = np.where(stuck, np.clip(y - vy * step_dt, 0.0, self.h - 1), y)
+            vx = np.where(stuck, vx * 0.2, vx)
+            vy = np.where(stuck, vy * 0.2, vy)
+
+        cols["x"][idx], cols["y"][idx], cols["z"][idx] = x, y, z
+        cols["vx"][idx], cols["vy"][idx], cols["vz"][idx] = vx, vy, vz
+        cols["age"][idx] += step_dt
+        cols["seen"][idx] = np.maximum(0.0, cols["seen"][idx] - 0.01)
+
+        ix = _grid_index(x, self.w)
+        iy = _grid_index(y, self.h)
+        cols["sound"][idx] = self._gather(self.sound_field, iy, ix)
+        self.backend.add_at(self.trail_field, (iy, ix), self.trail_field.dtype.type(0.35))
+
+    def _gather(self, field, iy: np.ndarray, ix: np.ndarray) -> np.ndarray:
         xp = self.backend.xp
-        t_up = self.backend.roll(t, 1, 0)
-        t_down = self.backend.roll(t, -1, 0)
-        t_left = self.backend.roll(t, 1, 1)
-        t_right = self.backend.roll(t, -1, 1)
-        neighbors = xp.stack([t_up, t_down, t_left, t_right], axis=0)
-        min_idx = xp.argmin(neighbors, axis=0)
-        min_val = xp.min(neighbors, axis=0)
-        mask = min_val < t
-        flow = w * 0.04
-        w[:] = w - flow * mask
-        flow_up = flow * ((min_idx == 0) & mask)
-        flow_down = flow * ((min_idx == 1) & mask)
-        flow_left = flow * ((min_idx == 2) & mask)
-        flow_right = flow * ((min_idx == 3) & mask)
-        w[:] = w + self.backend.roll(flow_up, -1, 0)
-        w[:] = w + self.backend.roll(flow_down, 1, 0)
-        w[:] = w + self.backend.roll(flow_left, -1, 1)
-        w[:] = w + self.backend.roll(flow_right, 1, 1)
+        return self.backend.asnumpy(field[xp.asarray(iy), xp.asarray(ix)])
+
+    def _voxels_at(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Vector form of _voxel_at for in-range index arrays."""
+        if self.voxel_field is None:
+            return np.zeros(len(x), dtype=np.int32)
+        height, top = self.surface_maps()
+        return np.where(z <= height[y, x], 1, np.where(z <= top[y, x], 2, 0))
+
+    def _column_heights(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return self.surface_maps()[0][y, x].astype(np.float64)
+
+    def terrain_changed(self) -> None:
+        """Call after editing terrain_field in place so water reroutes."""
+        self.hydrology.invalidate()
+
+    def voxels(self):
+        """The voxel volume (0=air, 1=solid, 2=water), synced first."""
+        self._sync_voxel_field()
+        return self.voxel_field
+
+    def refresh_surface(self) -> None:
+        """Recompute surface_height and water_top from terrain and water."""
+        self._surface = self._column_maps()
+        self.surface_height = self.backend.asnumpy(self._surface[0])
+        self.water_top = self.backend.asnumpy(self._surface[1])
+
+    def surface_maps(self):
+        """``(surface_height, water_top)``, computed on first use."""
+        if self.surface_height is None:
+            self.refresh_surface()
+        return self.surface_height, self.water_top
 
     def _voxel_at(self, x: int, y: int, z: int) -> int:
-        try:
-            return int(self.voxel_field[z, y, x])
-        except Exception:
+        if self.voxel_field is None or not (0 <= z < self.d and 0 <= y < self.h and 0 <= x < self.w):
             return 0
+        height, top = self.surface_maps()
+        if z <= height[y, x]:
+            return 1
+        return 2 if z <= top[y, x] else 0
 
     def _column_height(self, x: int, y: int) -> float:
         if self.voxel_field is None:
             return 0.0
-        max_z = min(self.d - 1, int(self.d) - 1)
-        for z in range(max_z, -1, -1):
-            if self._voxel_at(x, y, z) == 1:
-                return float(z)
-        return 0.0
+        return float(self.surface_maps()[0][y, x])
 
-    def _sync_voxel_field(self) -> None:
-        if self.voxel_field is None:
-            return
+    def _column_maps(self):
+        """``(height_idx, water_top)`` per column on the backend.
+
+        Column (x, y) of the voxel volume is solid up to ``height_idx`` and
+        water above it up to ``water_top``.
+        """
         xp = self.backend.xp
         d = int(max(1, self.d))
-        z = xp.arange(d, dtype=xp.int32)[:, None, None]
         height_idx = xp.clip(
             (self.terrain_field / max(self.terrain_scale, 0.001)) * (d - 1),
             0,
             d - 1,
         ).astype(xp.int32)
-        solid = z <= height_idx[None, ...]
-        vox = solid.astype(xp.uint8)
         sea_idx = int(max(0, min(d - 1, round(self.sea_level * (d - 1)))))
         water_layers = xp.clip(xp.rint(self.water_field * 2.0), 0, d - 1).astype(xp.int32)
         base_sea = xp.where(height_idx < sea_idx, sea_idx, height_idx)
         water_top = xp.maximum(base_sea, height_idx + water_layers)
         water_top = xp.clip(water_top, 0, d - 1)
-        water = (z > height_idx[None, ...]) & (z <= water_top[None, ...])
-        vox[water] = xp.uint8(2)
-        self.voxel_field[:] = vox
+        return height_idx, water_top
+
+    def _sync_voxel_field(self, columns=None) -> None:
+        """Rewrite the voxel columns whose height or water top changed.
+
+        The whole volume is rebuilt on the first sync and whenever
+        ``voxel_field`` has been replaced.
+        """
+        if self.voxel_field is None:
+            return
+        xp = self.backend.xp
+        height_idx, water_top = columns or self._column_maps()
+        vox = self.voxel_field
+        synced = self._voxel_synced
+        z = xp.arange(vox.shape[0], dtype=xp.int32)[:, None]
+        if synced is None or synced[0] is not vox or synced[1].shape != height_idx.shape:
+            h = height_idx.reshape(1, -1)
+            top = water_top.reshape(1, -1)
+            vox[:] = xp.where(z <= h, 1, xp.where(z <= top, 2, 0)).astype(xp.uint8).reshape(vox.shape)
+        else:
+            ys, xs = xp.nonzero((height_idx != synced[1]) | (water_top != synced[2]))
+            if ys.size:
+                h = height_idx[ys, xs][None, :]
+                top = water_top[ys, xs][None, :]
+                vox[:, ys, xs] = xp.where(z <= h, 1, xp.where(z <= top, 2, 0)).astype(xp.uint8)
+        self._voxel_synced = (vox, height_idx, water_top)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import ast
+import copy
+from typing import Any, Dict, List, Tuple
+
+from .actions import bind_action
+from .laws import Action, Law
+from .safeexpr import _SAFE_IMPL, CompiledExpr, compile_ast_node
+
+# Names the kernel puts into a law's env after the consts, so they shadow any
+# const of the same name and must never be inlined.
+RUNTIME_NAMES = frozenset({
+    "x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "color", "age", "seen",
+    "alive", "sound", "energy", "wealth", "aquatic", "static", "true", "false",
+    "terrain", "water", "fertility", "climate", "road", "settlement", "home",
+    "farm", "market", "latitude", "season", "rain", "time", "day_phase",
+    "day_sin", "day_cos", "daylight", "wind_x", "wind_y",
+})
+
+_IMPURE_CALLS = ("rand", "randint")
+
+
+@dataclass
+class OptimizeReport:
+    inlined: Dict[str, Any] = field(default_factory=dict)
+    dropped: List[str] = field(default_factory=list)
+    always: List[str] = field(default_factory=list)
+
+
+class _Fold(ast.NodeTransformer):
+    """Substitutes consts and folds subtrees whose operands are all constant."""
+
+    def __init__(self, consts: Dict[str, Any]):
+        self.consts = consts
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in self.consts:
+            return ast.copy_location(ast.Constant(value=self.consts[node.id]), node)
+        if node.id in ("true", "True"):
+            return ast.copy_location(ast.Constant(value=True), node)
+        if node.id in ("false", "False"):
+            return ast.copy_location(ast.Constant(value=False), node)
+        return node
+
+    def _const(self, node: ast.AST) -> ast.AST:
+        try:
+            expr = ast.Expression(body=node)
+            ast.fix_missing_locations(expr)
+            value = eval(compile(expr, "<fold>", "eval"), {"__builtins__": {}}, dict(_SAFE_IMPL))
+        except Exception:
+            return node
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+            return self._const(node)
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.operand, ast.Constant):
+            return self._const(node)
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Constant) and all(isinstance(c, ast.Constant) for c in node.comparators):
+            return self._const(node)
+        return node
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        is_and = isinstance(node.op, ast.And)
+        values = list(node.values)
+        # Leading constants decide or drop out exactly as Python's and/or would.
+        while len(values) > 1 and isinstance(values[0], ast.Constant):
+            if bool(values[0].value) != is_and:
+                return values[0]
+            values.pop(0)
+        if len(values) == 1:
+            return values[0]
+        node.values = values
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        self.generic_visit(node)
+        if node.func.id in _IMPURE_CALLS:
+            return node
+        if all(isinstance(a, ast.Constant) for a in node.args):
+            return self._const(node)
+        return node
+
+
+def _fold_expr(expr: CompiledExpr | None, consts: Dict[str, Any]) -> CompiledExpr | None:
+    if expr is None or expr.tree is None:
+        return expr
+    body = _Fold(consts).visit(copy.deepcopy(expr.tree.body))
+    return compile_ast_node(body, ast.unparse(body))
+
+
+def _inlinable(consts: Dict[str, Any], laws: List[Law]) -> Dict[str, Any]:
+    assigned = {a.name for law in laws for a in law.actions if a.kind == "assign"}
+    out: Dict[str, Any] = {}
+    for name, value in consts.items():
+        if name in RUNTIME_NAMES or name in assigned:
+            continue
+        if isinstance(value, (bool, int, float, str)):
+            out[name] = value
+    return out
+
+
+def optimize_laws(laws: List[Law], consts: Dict[str, Any]) -> Tuple[List[Law], OptimizeReport]:
+    """Inline resolved consts into law ASTs and fold constant subexpressions.
+
+    Returns new Law objects (the inputs may be shared by other kernels):
+    laws whose ``when`` folds to a false constant are dropped, and laws whose
+    ``when`` folds to a true constant get ``always=True`` so the kernel skips
+    the condition check.
+    """
+    report = OptimizeReport(inlined=_inlinable(consts, laws))
+    out: List[Law] = []
+    for law in laws:
+        when = _fold_expr(law.when, report.inlined)
+        const_when = isinstance(when.tree.body, ast.Constant) if when is not None and when.tree is not None else False
+        if const_when and not when.tree.body.value:
+            report.dropped.append(law.name)
+            continue
+        actions: List[Action] = []
+        for a in law.actions:
+            if a.kind == "assign":
+                actions.append(Action(kind="assign", name=a.name, op=a.op, expr=_fold_expr(a.expr, report.inlined)))
+            else:
+                args = [_fold_expr(x, report.inlined) for x in (a.args or [])]
+                actions.append(bind_action(Action(kind="call", name=a.name, args=args)))
+        always = const_when or law.always
+        if always:
+            report.always.append(law.name)
+        out.append(Law(name=law.name, priority=law.priority, when=when, actions=actions, always=always))
+    return out, report
+
+
+def _fmt_arg(value: Any) -> str:
+    if isinstance(value, CompiledExpr):
+        return value.src or "<expr>"
+    if value is None:
+        return "_"
+    return repr(value)
+
+
+def dump_program(laws: List[Law], report: OptimizeReport | None = None) -> str:
+    """Human-readable listing of a (possibly optimized) law program."""
+    lines: List[str] = []
+    if report is not None:
+        for name, value in report.inlined.items():
+            lines.append(f"const {name} = {value!r}  # inlined")
+        if report.inlined:
+            lines.append("")
+    for law in laws:
+        lines.append(f"law {law.name} priority {law.priority}")
+        lines.append("  when always" if law.always else f"  when {law.when.src if law.when else '?'}")
+        for a in law.actions:
+            if a.kind == "assign":
+                lines.append(f"  do {a.name} {a.op} {a.expr.src if a.expr else '?'}")
+            else:
+                args = ", ".join(_fmt_arg(v) for v in a.argv)
+                dyn = f"  # per-call: {list(a.dynamic)}" if a.dynamic else ""
+                lines.append(f"  do {a.name}({args}){dyn}")
+        lines.append("end")
+    if report is not None and report.dropped:
+        lines.append("")
+        for name in report.dropped:
+            lines.append(f"# dropped (when is constant false): {name}")
+    return "\n".join(lines)
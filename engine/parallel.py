@@ -0,0 +1,483 @@
+"""Domain-decomposed law execution across worker processes.
+
+The world is cut into horizontal strips of field rows, re-balanced every
+substep so each worker owns about the same number of live entities (an
+entity belongs to the strip holding its field cell, so its deposits and
+consumes always land in rows its worker owns). Entity columns and fields live
+in ``multiprocessing.shared_memory`` and are double-buffered:
+
+* workers read neighbors from the front entity buffer, which nobody writes
+  during the law phase, and write their own entities to the back buffer;
+* each worker copies its strip of every field plus a halo from the front
+  field buffer into private arrays, runs its entities, and writes its strip
+  to the back field buffer. What it changed in the halo rows goes back to the
+  parent as (cell, change) lists, which the parent adds to the back buffer
+  once every strip is written.
+
+The halo is one row (``_field_seek`` looks one cell around the entity) unless
+a law moves entities during the law phase (``wrap`` or an assignment to ``x``
+or ``y``): then a deposit or draw can land anywhere, so workers load the
+whole field and the halo covers every row outside the strip. Draws by two
+workers on one halo cell both see the front value; a cell over-drawn that
+way is clamped to zero.
+
+The parent then publishes the back entity buffer and swaps field buffers,
+and runs ``World.step_integrate`` on the shared arrays as usual. Field
+diffusion and decay stay there: they are whole-array numpy passes.
+
+Compared with the single-process scalar kernel, neighbors see each other's
+state from the start of the substep rather than partially updated, and
+``rand()`` draws from one stream per worker. Laws that only read positions
+(cohere, separate, attract, repel, collide, selectors on spawn attributes)
+match to floating-point noise (~1e-9); velocity-reading calls such as
+``align`` and randomized laws differ slightly. Compiled law closures cannot
+be pickled, so workers are spawned with the program as DSL source and
+recompile it.
+"""
+from __future__ import annotations
+
+import ast
+import multiprocessing as mp
+import random
+import traceback
+import weakref
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .laws import Action, Law
+from .model import ENTITY_COLUMNS, EntityTable, EntityView, World
+from .safeexpr import compile_expr
+
+# Fields laws can read or write through Kernel helpers and call handlers.
+SHARED_FIELDS = (
+    "sound_field", "food_field", "water_field", "road_field", "settlement_field",
+    "home_field", "farm_field", "market_field", "terrain_field", "fertility_field",
+    "climate_field",
+)
+# Of those, the ones laws only read. They sit in one shared block that is
+# never swapped, so the world keeps the same terrain array across substeps
+# (hydrology and flow fields key their caches on it) and workers read it in
+# place instead of copying it.
+READ_ONLY_FIELDS = ("terrain_field", "fertility_field", "climate_field")
+_WRITTEN_FIELDS = tuple(name for name in SHARED_FIELDS if name not in READ_ONLY_FIELDS)
+
+# World scalars the law phase reads; sent to workers every substep.
+_WORLD_SCALARS = ("time", "dt", "wind_x", "wind_y", "day_cycle", "season_cycle", "weather_cycle")
+
+_HALO_ROWS = 1  # _field_seek looks one cell around the entity
+
+# Call actions that move the entity during the law phase.
+_MOVING_CALLS = ("wrap",)
+
+# Unlinked blocks whose mappings must outlive their engine (see _shutdown).
+_DETACHED: List[shared_memory.SharedMemory] = []
+
+
+def _shared_array(shape: Tuple[int, ...], dtype) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _attach_array(name: str, shape: Tuple[int, ...], dtype) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    # Spawned workers share the parent's resource tracker, so attaching adds
+    # no second registration and the parent's unlink clears it.
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def program_source(consts: Dict[str, Any], laws: List[Law]) -> Dict[str, Any]:
+    """Picklable description of a compiled program (consts by value, laws as DSL)."""
+    return {
+        "consts": {k: repr(v) for k, v in consts.items() if isinstance(v, (bool, int, float, str))},
+        "laws": [
+            (
+                law.name,
+                law.priority,
+                law.when.src,
+                [
+                    (a.kind, a.name, a.op, a.expr.src if a.expr is not None else None,
+                     [x.src for x in (a.args or [])])
+                    for a in law.actions
+                ],
+            )
+            for law in laws
+        ],
+    }
+
+
+def load_program(spec: Dict[str, Any]):
+    consts = {k: compile_expr(src) for k, src in spec["consts"].items()}
+    laws = []
+    for name, priority, when, actions in spec["laws"]:
+        acts = []
+        for kind, aname, op, expr, args in actions:
+            if kind == "assign":
+                acts.append(Action(kind="assign", name=aname, op=op, expr=compile_expr(expr)))
+            else:
+                acts.append(Action(kind="call", name=aname, args=[compile_expr(x) for x in args]))
+        laws.append(Law(name=name, priority=priority, when=compile_expr(when), actions=acts))
+    return consts, laws
+
+
+def _string_constants(laws: List[Law]) -> List[str]:
+    out: List[str] = []
+    for law in laws:
+        exprs = [law.when] + [a.expr for a in law.actions] + [x for a in law.actions for x in (a.args or [])]
+        for expr in exprs:
+            if expr is None or expr.tree is None:
+                continue
+            for node in ast.walk(expr.tree):
+                if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                    out.append(node.value)
+    return out
+
+
+def moves_entities(laws: List[Law]) -> bool:
+    """True if some law changes x or y before integration."""
+    for law in laws:
+        for a in law.actions:
+            if a.kind == "assign" and a.name in ("x", "y"):
+                return True
+            if a.kind == "call" and a.name in _MOVING_CALLS:
+                return True
+    return False
+
+
+class ParallelEngine:
+    """Runs a Kernel's scalar law loop in worker processes, one strip each."""
+
+    def __init__(self, kernel, workers: int):
+        if kernel.world.backend.name == "gpu":
+            raise ValueError("parallel engine needs the CPU backend")
+        self.kernel = kernel
+        self.workers = max(1, int(workers))
+        self._parity = 0
+        self._sent_colors = -1
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self._procs: List[Any] = []
+        self._conns: List[Any] = []
+        self._finalizer = None
+        self._start()
+
+    # --- setup ----------------------------------------------------------
+
+    def _start(self) -> None:
+        kernel = self.kernel
+        world = kernel.world
+        table = world.entities
+        for color in _string_constants(kernel.laws):
+            table.color_code(color)  # stable codes before workers copy the list
+
+        cap = max(64, 2 * len(table))
+        self._front: Dict[str, np.ndarray] = {}
+        self._back: Dict[str, np.ndarray] = {}
+        entity_blocks = {}
+        for name, dtype in ENTITY_COLUMNS.items():
+            f_shm, f_arr = _shared_array((cap,), dtype)
+            b_shm, b_arr = _shared_array((cap,), dtype)
+            self._blocks += [f_shm, b_shm]
+            self._front[name] = f_arr
+            self._back[name] = b_arr
+            entity_blocks[name] = (f_shm.name, b_shm.name, np.dtype(dtype).str)
+        table.adopt(self._front)
+
+        self._fields: List[Dict[str, np.ndarray]] = [{}, {}]
+        field_blocks = {}
+        for name in SHARED_FIELDS:
+            src = np.asarray(getattr(world, name))
+            names = []
+            for side in ((0,) if name in READ_ONLY_FIELDS else (0, 1)):
+                shm, arr = _shared_array(src.shape, src.dtype)
+                arr[...] = src
+                self._blocks.append(shm)
+                self._fields[side][name] = arr
+                names.append(shm.name)
+            if name in READ_ONLY_FIELDS:
+                self._fields[1][name] = self._fields[0][name]
+                names.append(names[0])
+            setattr(world, name, self._fields[0][name])
+            field_blocks[name] = (names[0], names[1], src.shape, src.dtype.str)
+        self._parity = 0
+
+        spec = {
+            "program": program_source(kernel.consts, kernel.laws),
+            "w": world.w,
+            "h": world.h,
+            "d": world.d,
+            "halo": world.h if moves_entities(kernel.laws) else _HALO_ROWS,
+            "capacity": cap,
+            "colors": list(table.colors),
+            "entities": entity_blocks,
+            "fields": field_blocks,
+        }
+        ctx = mp.get_context("spawn")
+        for index in range(self.workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker_main, args=(child, spec, index), daemon=True)
+            proc.start()
+            child.close()
+            self._procs.append(proc)
+            self._conns.append(parent)
+        for conn in self._conns:
+            self._reply(conn)
+        self._sent_colors = -1
+        self._finalizer = weakref.finalize(self, _shutdown, list(self._procs), list(self._conns), list(self._blocks))
+
+    def close(self) -> None:
+        """Stop workers and release shared memory.
+
+        The entity table and world fields are copied back into private
+        arrays first, so the world stays usable after close.
+        """
+        if self._finalizer is None:
+            return
+        world = self.kernel.world
+        world.entities.adopt({name: col.copy() for name, col in world.entities._cols.items()})
+        for name in SHARED_FIELDS:
+            setattr(world, name, np.array(getattr(world, name)))
+        args = self._finalizer.detach()
+        self._finalizer = None
+        if args is not None:
+            _shutdown(*args[2], release=True)
+        self._procs, self._conns, self._blocks = [], [], []
+
+    def _restart(self) -> None:
+        self.close()
+        self._start()
+
+    def _reply(self, conn) -> Any:
+        status, payload = conn.recv()
+        if status == "error":
+            raise RuntimeError(f"parallel worker failed:\n{payload}")
+        return payload
+
+    # --- per substep ----------------------------------------------------
+
+    def _sync_bindings(self) -> None:
+        world = self.kernel.world
+        if world.entities._cols["x"] is not self._front["x"]:
+            self._restart()  # the table outgrew its shared columns
+            return
+        front = self._fields[self._parity]
+        for name in SHARED_FIELDS:
+            cur = getattr(world, name)
+            if cur is not front[name]:
+                front[name][...] = np.asarray(cur)
+                setattr(world, name, front[name])
+
+    def _bounds(self, rows: np.ndarray) -> List[int]:
+        """Strip edges (len workers + 1) splitting live entities evenly by row."""
+        h = self.kernel.world.h
+        if not rows.size:
+            return [int(round(h * k / self.workers)) for k in range(self.workers + 1)]
+        cuts = np.quantile(rows, np.arange(1, self.workers) / self.workers, method="lower")
+        edges = [0] + [int(c) + 1 for c in cuts] + [h]
+        for k in range(1, len(edges)):
+            edges[k] = max(edges[k], edges[k - 1])
+        return edges
+
+    def run(self, base_env: Dict[str, Any], season: float, rain: float) -> None:
+        self._sync_bindings()
+        world = self.kernel.world
+        table = world.entities
+        n = len(table)
+        for name in ENTITY_COLUMNS:
+            self._back[name][:n] = self._front[name][:n]
+        alive = table.column("alive")
+        rows = np.clip(np.rint(table.column("y")[alive]), 0, world.h - 1)
+        msg = {
+            "n": n,
+            "parity": self._parity,
+            "bounds": self._bounds(rows),
+            "world": {k: getattr(world, k) for k in _WORLD_SCALARS},
+            "base_env": base_env,
+            "season": season,
+            "rain": rain,
+        }
+        if len(table.colors) != self._sent_colors:
+            msg["colors"] = list(table.colors)
+        for conn in self._conns:
+            conn.send(msg)
+        new_colors = set()
+        spills = []
+        for conn in self._conns:
+            extra, spill = self._reply(conn)
+            new_colors.update(extra)
+            spills.append(spill)
+        if new_colors:
+            raise RuntimeError(f"parallel workers produced colors unknown at compile time: {sorted(new_colors)}")
+        self._sent_colors = len(table.colors)
+        for name in ENTITY_COLUMNS:
+            self._front[name][:n] = self._back[name][:n]
+        self._parity ^= 1
+        self._merge_halos(self._fields[self._parity], spills)
+        for name, arr in self._fields[self._parity].items():
+            setattr(world, name, arr)
+
+    @staticmethod
+    def _merge_halos(fields: Dict[str, np.ndarray], spills: List[Dict[str, Tuple[np.ndarray, ...]]]) -> None:
+        """Add the workers' halo changes to the strips their owners wrote."""
+        for spill in spills:
+            for name, (iy, ix, change) in spill.items():
+                field = fields[name]
+                np.add.at(field, (iy, ix), change.astype(field.dtype))
+                drawn = change < 0
+                if drawn.any():
+                    cells = (iy[drawn], ix[drawn])
+                    field[cells] = np.maximum(field[cells], 0)
+
+
+def _shutdown(procs, conns, blocks, release: bool = False) -> None:
+    """Stop workers and unlink shared memory.
+
+    Unless ``release`` is set (the caller has moved its data out), mappings
+    are kept open: arrays of a world that outlived its kernel may still
+    point into them.
+    """
+    for conn in conns:
+        try:
+            conn.send(None)
+        except (OSError, ValueError):
+            pass
+    for proc in procs:
+        proc.join(timeout=2.0)
+        if proc.is_alive():
+            proc.terminate()
+    for conn in conns:
+        conn.close()
+    for shm in blocks:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        if release:
+            shm.close()
+        else:
+            _DETACHED.append(shm)
+
+
+# --- worker side ---------------------------------------------------------
+
+class _Tile:
+    def __init__(self, spec: Dict[str, Any], index: int):
+        from .backend import get_backend
+        from .kernel import Kernel
+
+        self._blocks = []
+        cap = spec["capacity"]
+        self.front: Dict[str, np.ndarray] = {}
+        self.back: Dict[str, np.ndarray] = {}
+        for name, (f_name, b_name, dtype) in spec["entities"].items():
+            f_shm, self.front[name] = _attach_array(f_name, (cap,), np.dtype(dtype))
+            b_shm, self.back[name] = _attach_array(b_name, (cap,), np.dtype(dtype))
+            self._blocks += [f_shm, b_shm]
+        self.fields: List[Dict[str, np.ndarray]] = [{}, {}]
+        for name, (n0, n1, shape, dtype) in spec["fields"].items():
+            for side, block in ((0, n0), (1, n1)):
+                if side and name in READ_ONLY_FIELDS:
+                    self.fields[1][name] = self.fields[0][name]
+                    continue
+                shm, arr = _attach_array(block, tuple(shape), np.dtype(dtype))
+                self._blocks.append(shm)
+                self.fields[side][name] = arr
+
+        table = EntityTable.attach(self.front, 0, spec["colors"])
+        self.back_table = EntityTable.attach(self.back, 0, spec["colors"])
+        world = World(w=spec["w"], h=spec["h"], dt=1.0, d=spec["d"], entities=table, backend=get_backend(False))
+        # Private copies: each substep loads the strip plus halo rows into them.
+        for name in _WRITTEN_FIELDS:
+            setattr(world, name, np.zeros_like(self.fields[0][name]))
+        for name in READ_ONLY_FIELDS:
+            setattr(world, name, self.fields[0][name])
+        consts, laws = load_program(spec["program"])
+        self.kernel = Kernel(world, consts, laws, engine="scalar")
+        self.kernel._verlet = None
+        random.seed(7919 * (index + 1))
+        self.index = index
+        self.halo = int(spec["halo"])
+        if self.kernel.flow is not None:
+            # Distance maps look up to FLOW_RADIUS rows past the strip.
+            self.halo = max(self.halo, self.kernel.flow.halo_rows)
+
+    def run(self, msg: Dict[str, Any]) -> Tuple[List[str], Dict[str, Tuple[np.ndarray, ...]]]:
+        k = self.kernel
+        world = k.world
+        table = world.entities
+        n = msg["n"]
+        table._n = n
+        self.back_table._n = n
+        if "colors" in msg:
+            table.set_colors(msg["colors"])
+            self.back_table.set_colors(msg["colors"])
+        known = len(table.colors)
+        for key, value in msg["world"].items():
+            setattr(world, key, value)
+
+        lo, hi = msg["bounds"][self.index], msg["bounds"][self.index + 1]
+        front = self.fields[msg["parity"]]
+        back = self.fields[msg["parity"] ^ 1]
+        h0, h1 = max(0, lo - self.halo), min(world.h, hi + self.halo)
+        for name in _WRITTEN_FIELDS:
+            getattr(world, name)[h0:h1] = front[name][h0:h1]
+        if k.flow is not None:
+            k.flow.update(world, rows=(h0, h1))
+
+        if k._spatial:
+            k._build_grid()
+        alive = table.column("alive")
+        rows = np.clip(np.rint(table.column("y")), 0, world.h - 1)
+        own = np.flatnonzero(alive & (rows >= lo) & (rows < hi))
+        base_env, season, rain = msg["base_env"], msg["season"], msg["rain"]
+        for i in own.tolist():
+            # Own row in the back buffer: reads see this entity's own updates,
+            # neighbor reads go to the untouched front buffer.
+            k._apply_laws(EntityView(self.back_table, i), base_env, season, rain)
+        if k.field_batch is not None:
+            k.field_batch.apply(world, self.back_table)
+
+        spill = {}
+        for name in _WRITTEN_FIELDS:
+            private = getattr(world, name)
+            back[name][lo:hi] = private[lo:hi]
+            cells = [self._halo_changes(private, front[name], a, b) for a, b in ((h0, lo), (hi, h1)) if b > a]
+            cells = [c for c in cells if c[0].size]
+            if cells:
+                spill[name] = tuple(np.concatenate(col) for col in zip(*cells))
+        extra = self.back_table.colors[known:] + table.colors[known:]
+        return list(extra), spill
+
+    @staticmethod
+    def _halo_changes(private: np.ndarray, front: np.ndarray, r0: int, r1: int) -> Tuple[np.ndarray, ...]:
+        """(iy, ix, change) of the cells this worker changed in rows r0:r1."""
+        change = private[r0:r1] - front[r0:r1]
+        iy, ix = np.nonzero(change)
+        return iy + r0, ix, change[iy, ix]
+
+    def close(self) -> None:
+        self.kernel = None
+        self.front = self.back = {}
+        self.fields = [{}, {}]
+        self.back_table = None
+
+
+def _worker_main(conn, spec: Dict[str, Any], index: int) -> None:
+    try:
+        tile = _Tile(spec, index)
+        conn.send(("ok", None))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        try:
+            conn.send(("ok", tile.run(msg)))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
@@ -107,15 +107,18 @@ def render(
         mk = np.clip(mk, 0.0, 1.0)
         img[..., 0] = np.maximum(img[..., 0], (130 + mk * 110).astype(np.uint8))
 
-    for e in world.entities:
-        if not e.alive:
-            continue
-        x = int(max(0, min(w-1, round(e.x))))
-        y = int(max(0, min(h-1, round(e.y))))
-        base = color_rgb(e.color)
+    table = world.entities
+    idx = table.alive_indices()
+    xs = np.clip(np.round(table.column("x")[idx]), 0, w - 1).astype(np.int64).tolist()
+    ys = np.clip(np.round(table.column("y")[idx]), 0, h - 1).astype(np.int64).tolist()
+    hardness = table.column("hardness")[idx].tolist()
+    palette = [color_rgb(c) for c in table.colors]
+    codes = table.column("color")[idx].tolist()
+    for x, y, hard, code in zip(xs, ys, hardness, codes):
+        base = palette[code]
         img[y, x, :] = base
 
-        r = int(max(1, min(6, 1 + e.hardness * 0.6)))
+        r = int(max(1, min(6, 1 + hard * 0.6)))
         for dy in range(-r, r+1):
             yy = y + dy
             if yy < 0 or yy >= h:
@@ -1,14 +1,18 @@
 from __future__ import annotations
 from dataclasses import dataclass
 import ast
+import copy
 import math
 import random
-from typing import Any, Dict, Mapping, Optional
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
 
 @dataclass(frozen=True)
 class CompiledExpr:
     src: str
     code: Any # code object
+    tree: Any = None # validated ast.Expression, kept for lowering passes
+    fn: Optional[Callable[[Mapping[str, Any]], Any]] = None # closure-compiled form, see _closure
+    names: Tuple[str, ...] = () # env variables the expression reads (its slot layout)
 
 SAFE_FUNCS = {
     "min", "max", "abs", "round", "clamp", "lerp",
@@ -55,25 +59,78 @@ def _validate(node: ast.AST) -> None:
             if n.func.id not in SAFE_FUNCS:
                 raise ValueError(f"Function forbidden: {n.func.id}")
 
-def compile_ast_node(node: ast.AST, src_hint: str = "") -> CompiledExpr:
+class _SlotRewriter(ast.NodeTransformer):
+    """Turns free names into ``_env[...]`` reads and safe names into bound args."""
+
+    def __init__(self):
+        self.names: Dict[str, None] = {}
+        self.bound: Dict[str, None] = {}
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in _SAFE_IMPL:
+            self.bound[node.id] = None
+            return ast.copy_location(ast.Name(id=f"_b_{node.id}", ctx=ast.Load()), node)
+        self.names[node.id] = None
+        read = ast.Subscript(
+            value=ast.Name(id="_env", ctx=ast.Load()),
+            slice=ast.Constant(value=node.id),
+            ctx=ast.Load(),
+        )
+        return ast.copy_location(read, node)
+
+
+def _closure(tree: ast.Expression) -> Tuple[Callable[[Mapping[str, Any]], Any], Tuple[str, ...]]:
+    """Compile a validated expression into ``fn(env)``.
+
+    Safe functions and true/false are bound as default arguments when the
+    expression is compiled, so a call costs one Python frame and a dict read
+    per variable instead of copying _SAFE_IMPL and the env into a new scope.
+    """
+    rewriter = _SlotRewriter()
+    body = rewriter.visit(copy.deepcopy(tree.body))
+    bound = list(rewriter.bound)
+    args = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg(arg="_env")] + [ast.arg(arg=f"_b_{n}") for n in bound],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[ast.Name(id=f"_impl_{n}", ctx=ast.Load()) for n in bound],
+    )
+    lam = ast.Expression(body=ast.Lambda(args=args, body=body))
+    ast.fix_missing_locations(lam)
+    namespace: Dict[str, Any] = {"__builtins__": {}}
+    namespace.update({f"_impl_{n}": _SAFE_IMPL[n] for n in bound})
+    fn = eval(compile(lam, "<dsl-closure>", "eval"), namespace)
+    return fn, tuple(rewriter.names)
+
+def compile_ast_node(node: ast.AST, src_hint: str = "", closure: bool = True) -> CompiledExpr:
     _validate(node)
     # Wrap in Expression if needed, though usually we get an Expression from parse
     if not isinstance(node, ast.Expression):
         node = ast.Expression(body=node)
     ast.fix_missing_locations(node)
     code = compile(node, "<dsl>", "eval")
-    return CompiledExpr(src=src_hint, code=code)
+    fn, names = _closure(node) if closure else (None, ())
+    return CompiledExpr(src=src_hint, code=code, tree=node, fn=fn, names=names)
 
-def compile_expr(src: str) -> CompiledExpr:
+def compile_expr(src: str, closure: bool = True) -> CompiledExpr:
     s = (src or "").strip()
     if not s: s = "False"
     try:
         node = ast.parse(s, mode="eval")
     except SyntaxError as e:
         raise ValueError(f"Syntax error in '{s}': {e}")
-    return compile_ast_node(node, s)
+    return compile_ast_node(node, s, closure=closure)
+
+_NO_ENV: Mapping[str, Any] = {}
 
 def eval_expr(compiled: CompiledExpr, env: Optional[Mapping[str, Any]] = None) -> Any:
+    fn = compiled.fn
+    if fn is not None:
+        try:
+            return fn(_NO_ENV if env is None else env)
+        except KeyError as exc:
+            raise NameError(f"name {exc.args[0]!r} is not defined") from None
     scope = dict(_SAFE_IMPL)
     if env: scope.update(env)
     return eval(compiled.code, {"__builtins__": {}}, scope)
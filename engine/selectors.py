@@ -0,0 +1,107 @@
+"""Neighbor selectors compiled to array form.
+
+A selector such as ``attract(40, 0.3, color == "red")`` is evaluated with the
+candidate neighbor's attributes layered over the querying entity's env
+(see ``Kernel._selector_ok``). Compiling it splits its names into neighbor
+columns and values read from the querying entity, so a whole candidate array
+is filtered with one expression evaluation. Selectors that only read the
+neighbor's spawn-time attributes (color, aquatic, static) reduce to a mask
+over the table, recomputed when the spatial index is rebuilt or a color,
+aquatic or static value changes (``EntityTable.static_version``), so a color
+set earlier in the same substep is seen as the scalar ``_selector_ok`` sees it.
+"""
+from __future__ import annotations
+
+import ast
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from .actions import ACTIONS
+from .laws import Law
+from .safeexpr import CompiledExpr
+from .vector import Unlowerable, VectorExpr, _make_impl, lower_expr
+
+# Names a selector resolves against the neighbor (keys of Entity.as_env).
+NEIGHBOR_NAMES = frozenset({
+    "x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "color", "age", "seen",
+    "alive", "sound", "energy", "wealth", "aquatic", "static",
+})
+
+STATIC_NAMES = frozenset({"color", "aquatic", "static"})
+
+_IMPL = _make_impl(np.random.default_rng(0))
+
+
+class NeighborSelector:
+    def __init__(self, expr: CompiledExpr, vexpr: VectorExpr):
+        self.expr = expr
+        self.vexpr = vexpr
+        self.neighbor_names = tuple(n for n in vexpr.names if n in NEIGHBOR_NAMES)
+        self.self_names = tuple(n for n in vexpr.names if n not in NEIGHBOR_NAMES)
+        self.static = not self.self_names and set(self.neighbor_names) <= STATIC_NAMES
+        self._mask: np.ndarray | None = None
+        self._stamp: Any = None
+
+    def _eval(self, scope: Dict[str, Any], n: int) -> np.ndarray:
+        scope.update(_IMPL)
+        with np.errstate(all="ignore"):
+            out = eval(self.vexpr.code, {"__builtins__": {}}, scope)
+        if np.ndim(out) == 0:
+            return np.full(n, bool(out))
+        return np.asarray(out, dtype=bool)
+
+    def table_mask(self, table, stamp: int) -> np.ndarray:
+        """Mask over every row of the table; cached until ``stamp`` or the
+        table's color, aquatic or static columns change."""
+        key = (stamp, table.static_version)
+        if self._stamp != key or self._mask is None:
+            scope = {name: table.column(name) for name in self.neighbor_names}
+            self._mask = self._eval(scope, len(table))
+            self._stamp = key
+        return self._mask
+
+    def pair_mask(self, table, j: np.ndarray, own: Dict[str, Any], stamp: int) -> np.ndarray:
+        """Mask over neighbor indices ``j``; ``own`` holds the querying side's values.
+
+        Values in ``own`` are scalars (one querying entity) or arrays aligned
+        with ``j`` (one query per pair).
+        """
+        if self.static:
+            return self.table_mask(table, stamp)[j]
+        scope: Dict[str, Any] = {name: table.column(name)[j] for name in self.neighbor_names}
+        for name in self.self_names:
+            try:
+                scope[name] = own[name]
+            except KeyError:
+                raise NameError(f"name '{name}' is not defined") from None
+        return self._eval(scope, len(j))
+
+
+def compile_selector(expr: CompiledExpr, intern: Callable[[str], int]) -> NeighborSelector | None:
+    """Array form of a selector, or None when it must stay per pair."""
+    if expr.tree is None:
+        return None
+    for node in ast.walk(expr.tree):
+        if isinstance(node, ast.Call) and node.func.id in ("rand", "randint"):
+            return None  # keep the scalar random stream
+    try:
+        return NeighborSelector(expr, lower_expr(expr, intern))
+    except Unlowerable:
+        return None
+
+
+def compile_selectors(laws: List[Law], intern: Callable[[str], int]) -> Dict[int, NeighborSelector]:
+    """Compiled selectors of all spatial calls, keyed by id() of the CompiledExpr."""
+    out: Dict[int, NeighborSelector] = {}
+    for law in laws:
+        for a in law.actions:
+            spec = ACTIONS.get(a.name) if a.kind == "call" else None
+            if spec is None or 2 not in spec.raw or len(a.argv) < 3:
+                continue
+            expr = a.argv[2]
+            if isinstance(expr, CompiledExpr) and id(expr) not in out:
+                sel = compile_selector(expr, intern)
+                if sel is not None:
+                    out[id(expr)] = sel
+    return out
@@ -59,6 +59,9 @@ class Simulation:
                 "t": self.kernel.world.time,
                 "steps": steps,
                 "elapsed_ms": elapsed * 1000.0,
+                **self.kernel.metrics(),
+                "field_ms": self.kernel.world.schedule.report(),
+                "water": self.kernel.world.hydrology.report(),
             }
         )
 
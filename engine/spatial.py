@@ -0,0 +1,206 @@
+from __future__ import annotations
+import math
+from typing import List
+
+import numpy as np
+
+from .laws import Law
+
+# Calls that query neighbors; argument 0 is the search radius for all of them.
+SPATIAL_CALLS = ("collide", "cohere", "align", "separate", "attract", "repel")
+
+DEFAULT_CELL_SIZE = 32.0
+MIN_CELL_SIZE = 2.0
+
+
+def auto_cell_size(laws: List[Law], default: float = DEFAULT_CELL_SIZE) -> float | None:
+    """Cell size matching the largest constant radius of the spatial calls.
+
+    Returns None when no law queries neighbors, and ``default`` when every
+    spatial radius is computed per entity.
+    """
+    spatial = False
+    radius = 0.0
+    for law in laws:
+        for a in law.actions:
+            if a.kind != "call" or a.name not in SPATIAL_CALLS:
+                continue
+            spatial = True
+            if 0 not in a.dynamic and isinstance(a.argv[0], float):
+                radius = max(radius, a.argv[0])
+    if not spatial:
+        return None
+    if radius <= 0.0:
+        return float(default)
+    return max(MIN_CELL_SIZE, radius)
+
+
+class CellList:
+    """Uniform grid of entity indices, counting-sorted by cell.
+
+    Cells cover the world rectangle; entities outside it are clamped into the
+    border cells, so queries that reach the border still see them. Cells are
+    laid out row-major, which makes each row of a query window one contiguous
+    slice of ``order``.
+    """
+
+    def __init__(self, w: int, h: int, cell_size: float):
+        self.cell_size = float(cell_size)
+        self.gw = max(1, int(math.ceil(w / self.cell_size)))
+        self.gh = max(1, int(math.ceil(h / self.cell_size)))
+        self.starts = np.zeros(self.gw * self.gh + 1, dtype=np.int64)
+        self.order = np.zeros(0, dtype=np.int64)
+
+    def _cells(self, v: np.ndarray, limit: int) -> np.ndarray:
+        c = np.nan_to_num(np.floor(v / self.cell_size), nan=0.0)
+        return np.clip(c, 0, limit - 1).astype(np.int64)
+
+    def build(self, x: np.ndarray, y: np.ndarray, alive: np.ndarray) -> None:
+        idx = np.flatnonzero(alive)
+        cell = self._cells(y[idx], self.gh) * self.gw + self._cells(x[idx], self.gw)
+        counts = np.bincount(cell, minlength=self.gw * self.gh)
+        np.cumsum(counts, out=self.starts[1:])
+        self.order = idx[np.argsort(cell, kind="stable")]
+
+    def query(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Indices of entities in the cells overlapping the query square."""
+        if not (math.isfinite(x) and math.isfinite(y)):
+            return self.order[:0]
+        cs = self.cell_size
+        x0 = min(self.gw - 1, max(0, int(math.floor((x - radius) / cs))))
+        x1 = min(self.gw - 1, max(0, int(math.floor((x + radius) / cs))))
+        y0 = min(self.gh - 1, max(0, int(math.floor((y - radius) / cs))))
+        y1 = min(self.gh - 1, max(0, int(math.floor((y + radius) / cs))))
+        return self._gather(x0, x1, y0, y1)
+
+    def window(self, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+        """Indices of entities in the cells overlapping a rectangle."""
+        if not all(math.isfinite(v) for v in (left, top, right, bottom)):
+            return self.order[:0]
+        cs = self.cell_size
+        x0 = min(self.gw - 1, max(0, int(math.floor(left / cs))))
+        x1 = min(self.gw - 1, max(0, int(math.floor(right / cs))))
+        y0 = min(self.gh - 1, max(0, int(math.floor(top / cs))))
+        y1 = min(self.gh - 1, max(0, int(math.floor(bottom / cs))))
+        return self._gather(x0, x1, y0, y1)
+
+    def _gather(self, x0: int, x1: int, y0: int, y1: int) -> np.ndarray:
+        starts, order, gw = self.starts, self.order, self.gw
+        if y0 == y1:
+            return order[starts[y0 * gw + x0]:starts[y0 * gw + x1 + 1]]
+        return np.concatenate(
+            [order[starts[row * gw + x0]:starts[row * gw + x1 + 1]] for row in range(y0, y1 + 1)]
+        )
+
+    def pairs(self, x: np.ndarray, y: np.ndarray, idx: np.ndarray, radius: float):
+        """All (query, neighbor) pairs within radius for the entities in idx.
+
+        Returns ``(qi, j, dx, dy, d2)`` where ``qi`` indexes into ``idx``, ``j``
+        is the neighbor's entity index (never the query entity itself) and
+        ``dx, dy`` point from the query entity to the neighbor.
+        """
+        k = max(0, int(math.ceil(radius / self.cell_size)))
+        qx = x[idx]
+        qy = y[idx]
+        cx = self._cells(qx, self.gw)
+        cy = self._cells(qy, self.gh)
+        lo = np.maximum(cx - k, 0)
+        hi = np.minimum(cx + k, self.gw - 1) + 1
+        qis, starts, counts = [], [], []
+        local = np.arange(len(idx))
+        for oy in range(-k, k + 1):
+            row = cy + oy
+            ok = (row >= 0) & (row < self.gh)
+            base = row[ok] * self.gw
+            s = self.starts[base + lo[ok]]
+            qis.append(local[ok])
+            starts.append(s)
+            counts.append(self.starts[base + hi[ok]] - s)
+        qi = np.concatenate(qis)
+        start = np.concatenate(starts)
+        n = np.concatenate(counts)
+        total = int(n.sum())
+        qi = np.repeat(qi, n)
+        offs = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+        j = self.order[np.repeat(start, n) + offs]
+        dx = x[j] - qx[qi]
+        dy = y[j] - qy[qi]
+        d2 = dx * dx + dy * dy
+        keep = (d2 <= radius * radius) & (j != idx[qi])
+        return qi[keep], j[keep], dx[keep], dy[keep], d2[keep]
+
+
+class VerletList:
+    """Neighbor pairs within ``cutoff + skin``, reused until someone moves too far.
+
+    A pair within ``cutoff`` now was within ``cutoff + skin`` at build time as
+    long as neither entity has moved more than ``skin / 2`` since, so queries
+    filter the cached candidates by current distance instead of rebuilding.
+    Queries with a larger radius fall back to the cell list built alongside,
+    widened by the skin.
+    """
+
+    def __init__(self, cells: CellList, cutoff: float, skin: float):
+        self.cells = cells
+        self.cutoff = float(cutoff)
+        self.skin = float(skin)
+        self.ptr = np.zeros(1, dtype=np.int64)
+        self.nbr = np.zeros(0, dtype=np.int64)
+        self._x0: np.ndarray | None = None
+        self._y0: np.ndarray | None = None
+        self._alive = 0
+        self.checks = 0
+        self.builds = 0
+
+    def stale(self, x: np.ndarray, y: np.ndarray, alive: np.ndarray) -> bool:
+        if self._x0 is None or len(x) != len(self._x0) or int(alive.sum()) > self._alive:
+            return True
+        live = np.flatnonzero(alive)
+        dx = x[live] - self._x0[live]
+        dy = y[live] - self._y0[live]
+        moved = dx * dx + dy * dy
+        limit = 0.5 * self.skin
+        # NaN displacement counts as moved.
+        return bool(live.size) and not bool(np.all(moved <= limit * limit))
+
+    def update(self, x: np.ndarray, y: np.ndarray, alive: np.ndarray) -> bool:
+        """Rebuild if stale; returns True when the list was rebuilt."""
+        self.checks += 1
+        if not self.stale(x, y, alive):
+            return False
+        self.cells.build(x, y, alive)
+        idx = np.flatnonzero(alive)
+        qi, j, _, _, _ = self.cells.pairs(x, y, idx, self.cutoff + self.skin)
+        q = idx[qi]
+        order = np.argsort(q, kind="stable")
+        self.nbr = j[order]
+        self.ptr = np.zeros(len(x) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(q, minlength=len(x)), out=self.ptr[1:])
+        self._x0 = x.copy()
+        self._y0 = y.copy()
+        self._alive = int(idx.size)
+        self.builds += 1
+        return True
+
+    def query(self, i: int, x: float, y: float, radius: float) -> np.ndarray:
+        """Candidate neighbors of entity i; filter by current distance."""
+        if radius > self.cutoff or i + 1 >= len(self.ptr):
+            return self.cells.query(x, y, radius + self.skin)
+        return self.nbr[self.ptr[i]:self.ptr[i + 1]]
+
+    def pairs(self, x: np.ndarray, y: np.ndarray, idx: np.ndarray, radius: float):
+        """Same contract as CellList.pairs, served from the cached list."""
+        if radius > self.cutoff:
+            qi, j, dx, dy, d2 = self.cells.pairs(x, y, idx, radius + self.skin)
+            keep = d2 <= radius * radius
+            return qi[keep], j[keep], dx[keep], dy[keep], d2[keep]
+        start = self.ptr[idx]
+        n = self.ptr[idx + 1] - start
+        qi = np.repeat(np.arange(len(idx)), n)
+        offs = np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n)
+        j = self.nbr[np.repeat(start, n) + offs]
+        dx = x[j] - x[idx][qi]
+        dy = y[j] - y[idx][qi]
+        d2 = dx * dx + dy * dy
+        keep = d2 <= radius * radius
+        return qi[keep], j[keep], dx[keep], dy[keep], d2[keep]
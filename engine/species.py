@@ -0,0 +1,99 @@
+"""Species classification resolved once per color.
+
+Entities carry their species as an interned color code (see EntityTable), so
+everything derived from the color name, such as the render kind and whether
+the species swims, is resolved once per color code into small lookup arrays.
+Built-in rules cover the bundled worldpacks; profiles add their own through
+the ``kind`` field.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_KIND = "creature"
+
+# Render kinds by exact (lowercased) color name.
+KIND_BY_COLOR: Dict[str, str] = {
+    "human": "humanoid",
+    "settler": "humanoid",
+    "fae": "humanoid",
+    "tribe": "humanoid",
+    "pilot": "humanoid",
+    "animal": "animal",
+    "fauna": "animal",
+    "beast": "animal",
+    "raptor": "animal",
+    "alien": "alien",
+    "outsider": "alien",
+    "voidborn": "alien",
+    "building": "building",
+    "habitat": "building",
+    "obelisk": "building",
+    "station": "building",
+    "tree": "tree",
+    "grove": "tree",
+    "cycad": "tree",
+    "dino": "dino",
+    "saurian": "dino",
+    "wyrm": "dino",
+    "metal": "machine",
+    "gold": "machine",
+    "synth": "machine",
+}
+
+# Color substrings that make an entity aquatic even without the flag.
+AQUATIC_TERMS = (
+    "fish", "aqua", "water", "shark", "jellyfish", "diver", "swimmer", "ocean", "sea", "coral",
+)
+
+
+class SpeciesRegistry:
+    """Kind and aquatic classification per color, cached per color code."""
+
+    def __init__(self):
+        self.kinds: List[str] = [DEFAULT_KIND] + sorted(set(KIND_BY_COLOR.values()))
+        self._kind_overrides: Dict[str, str] = {}
+        self._resolved: List[str] = []
+        self._kind_codes = np.zeros(0, dtype=np.int16)
+        self._aquatic = np.zeros(0, dtype=bool)
+
+    def register(self, color: str, kind: str) -> None:
+        """Classify ``color`` as ``kind`` (a new kind name is added)."""
+        kind = str(kind).strip().lower() or DEFAULT_KIND
+        if kind not in self.kinds:
+            self.kinds.append(kind)
+        self._kind_overrides[str(color).strip().lower()] = kind
+        self._resolved = []
+
+    def kind_of(self, color: str) -> str:
+        key = (color or "").strip().lower()
+        return self._kind_overrides.get(key) or KIND_BY_COLOR.get(key, DEFAULT_KIND)
+
+    def is_aquatic(self, color: str) -> bool:
+        key = (color or "").lower()
+        return any(term in key for term in AQUATIC_TERMS)
+
+    def _resolve(self, colors: Sequence[str]) -> None:
+        known = len(self._resolved)
+        if list(colors[:known]) != self._resolved:
+            known = 0  # a different color table
+        if known == len(colors):
+            return
+        fresh = list(colors[known:])
+        kinds = np.asarray([self.kinds.index(self.kind_of(c)) for c in fresh], dtype=np.int16)
+        aquatic = np.asarray([self.is_aquatic(c) for c in fresh], dtype=bool)
+        self._kind_codes = np.concatenate([self._kind_codes[:known], kinds])
+        self._aquatic = np.concatenate([self._aquatic[:known], aquatic])
+        self._resolved = list(colors)
+
+    def kind_codes(self, colors: Sequence[str]) -> np.ndarray:
+        """Index into ``kinds`` for each color code of ``colors``."""
+        self._resolve(colors)
+        return self._kind_codes
+
+    def aquatic_codes(self, colors: Sequence[str]) -> np.ndarray:
+        """Aquatic-by-name flag for each color code of ``colors``."""
+        self._resolve(colors)
+        return self._aquatic
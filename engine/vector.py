@@ -0,0 +1,698 @@
+"""Vectorized law execution.
+
+Laws run one at a time in priority order across the whole population:
+``when`` conditions lower to boolean masks, assignments to masked array
+updates and simple per-entity calls to column arithmetic. Anything that
+cannot be lowered runs through the scalar ``Kernel._call`` path for the
+entities selected by the law's mask.
+
+Neighbor calls (cohere, align, separate, attract, repel, collide) that run
+back to back in a law with the same constant radius are fused into one
+flocking stage: the neighbor pairs are found once over the cell list and each
+call's velocity change is a per-entity reduction over those pairs, after the
+call's compiled selector (if any) has masked them.
+"""
+from __future__ import annotations
+
+import ast
+import copy
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .fields import gather_cells
+from .flow import FLOW_CALLS
+from .laws import Action, Law
+from .model import EntityView
+from .safeexpr import CompiledExpr, eval_expr
+
+
+class Unlowerable(Exception):
+    """Expression or action has no array equivalent."""
+
+
+_BOOL_NAMES = {"true", "false", "True", "False"}
+# Entity columns stored as bool, so and/or over them stays elementwise.
+_BOOL_COLUMNS = {"alive", "aquatic", "static"}
+
+_FUNC_MAP = {
+    "min": "_v_min",
+    "max": "_v_max",
+    "abs": "_v_abs",
+    "round": "_v_round",
+    "clamp": "_v_clamp",
+    "lerp": "_v_lerp",
+    "sin": "_v_sin",
+    "cos": "_v_cos",
+    "tan": "_v_tan",
+    "sqrt": "_v_sqrt",
+    "log": "_v_log",
+    "exp": "_v_exp",
+    "rand": "_v_rand",
+    "randint": "_v_randint",
+}
+
+# Env keys a scalar call handler may write; copied back after fallback calls.
+_CALL_WRITES = ("x", "y", "vx", "vy", "vz", "energy", "alive", "sound", "seen", "wealth")
+
+# Entity columns shared live between the vector env and the EntityTable.
+_LIVE_COLUMNS = (
+    "x", "y", "z", "vx", "vy", "vz", "mass", "hardness",
+    "seen", "sound", "energy", "wealth", "alive", "aquatic",
+)
+
+# Neighbor calls the flocking stage can fuse; radius is argument 0 for all.
+_FLOCK_CALLS = ("cohere", "align", "separate", "attract", "repel", "collide")
+
+# (call, field, default amount) of the emit calls, and (call, field, default
+# amount, default energy gain) of the consume calls, lowered when the kernel
+# batches field writes.
+_EMIT_CALLS = (
+    ("emit_sound", "sound_field", 0.1),
+    ("emit_food", "food_field", 0.1),
+    ("emit_water", "water_field", 0.08),
+    ("emit_road", "road_field", 0.1),
+    ("emit_settlement", "settlement_field", 0.1),
+    ("emit_home", "home_field", 0.1),
+    ("emit_farm", "farm_field", 0.1),
+    ("emit_market", "market_field", 0.1),
+)
+_CONSUME_CALLS = (
+    ("consume_food", "food_field", 0.05, 1.0),
+    ("consume_water", "water_field", 0.05, 0.6),
+)
+
+# Default strength of the field-seeking calls (see FLOW_CALLS).
+_SEEK_STRENGTH = {"follow_road": 0.04, "seek_home": 0.03, "seek_farm": 0.03, "seek_market": 0.03}
+
+_FIELD_NAMES = ("terrain", "water", "fertility", "climate", "road", "settlement", "home", "farm", "market")
+
+
+def _is_boolish(node: ast.AST) -> bool:
+    if isinstance(node, (ast.Compare, ast.BoolOp)):
+        return True
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return True
+    if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+        return True
+    return isinstance(node, ast.Name) and (node.id in _BOOL_NAMES or node.id in _BOOL_COLUMNS)
+
+
+def _call(name: str, args: List[ast.AST]) -> ast.Call:
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+
+class _Lowerer(ast.NodeTransformer):
+    def __init__(self, intern: Callable[[str], int]):
+        self.intern = intern
+        self.names: set[str] = set()
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id == "color":
+            raise Unlowerable("color is only lowered inside == / != string comparisons")
+        if node.id not in _BOOL_NAMES:
+            self.names.add(node.id)
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if isinstance(node.value, str):
+            raise Unlowerable("string constants are only lowered in color comparisons")
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        operands = [node.left] + list(node.comparators)
+        has_color = any(isinstance(o, ast.Name) and o.id == "color" for o in operands)
+        if has_color:
+            if not all(isinstance(op, (ast.Eq, ast.NotEq)) for op in node.ops):
+                raise Unlowerable("color only supports == and !=")
+            lowered = []
+            for o in operands:
+                if isinstance(o, ast.Name) and o.id == "color":
+                    self.names.add("color")
+                    lowered.append(o)
+                elif isinstance(o, ast.Constant) and isinstance(o.value, str):
+                    lowered.append(ast.Constant(value=self.intern(o.value)))
+                else:
+                    raise Unlowerable("color compared against a non-string")
+        else:
+            lowered = [self.visit(o) for o in operands]
+        parts = [
+            ast.Compare(left=lowered[k], ops=[op], comparators=[lowered[k + 1]])
+            for k, op in enumerate(node.ops)
+        ]
+        if len(parts) == 1:
+            return parts[0]
+        return _call("_v_and", parts)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        if not all(_is_boolish(v) for v in node.values):
+            raise Unlowerable("and/or over non-boolean operands")
+        fn = "_v_and" if isinstance(node.op, ast.And) else "_v_or"
+        return _call(fn, [self.visit(v) for v in node.values])
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        if isinstance(node.op, ast.Not):
+            return _call("_v_not", [self.visit(node.operand)])
+        return self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        name = node.func.id  # validated by safeexpr: direct calls only
+        if name not in _FUNC_MAP:
+            raise Unlowerable(f"no array form for {name}()")
+        args = [self.visit(a) for a in node.args]
+        if name in ("rand", "randint"):
+            args.append(ast.Name(id="_n", ctx=ast.Load()))
+        return _call(_FUNC_MAP[name], args)
+
+
+@dataclass(frozen=True)
+class VectorExpr:
+    src: str
+    code: Any
+    names: Tuple[str, ...]
+
+
+def lower_expr(compiled: CompiledExpr, intern: Callable[[str], int]) -> VectorExpr:
+    if compiled.tree is None:
+        raise Unlowerable("expression was compiled without an AST")
+    tree = copy.deepcopy(compiled.tree)
+    lowerer = _Lowerer(intern)
+    body = lowerer.visit(tree.body)
+    expr = ast.Expression(body=body)
+    ast.fix_missing_locations(expr)
+    code = compile(expr, "<dsl-vector>", "eval")
+    return VectorExpr(src=compiled.src, code=code, names=tuple(sorted(lowerer.names)))
+
+
+def _reduce(fn):
+    def run(*xs):
+        out = xs[0]
+        for x in xs[1:]:
+            out = fn(out, x)
+        return out
+    return run
+
+
+def _make_impl(rng: np.random.Generator) -> Dict[str, Any]:
+    def v_round(x, nd=0):
+        return np.round(x, int(nd))
+
+    def v_randint(a, b, n):
+        lo = np.trunc(a)
+        return np.floor(rng.random(n) * (np.trunc(b) - lo + 1)) + lo
+
+    return {
+        "_v_and": _reduce(np.logical_and),
+        "_v_or": _reduce(np.logical_or),
+        "_v_not": np.logical_not,
+        "_v_min": _reduce(np.minimum),
+        "_v_max": _reduce(np.maximum),
+        "_v_abs": np.abs,
+        "_v_round": v_round,
+        "_v_clamp": lambda x, lo, hi: np.where(x < lo, lo, np.where(x > hi, hi, x)),
+        "_v_lerp": lambda a, b, t: a + (b - a) * t,
+        "_v_sin": np.sin,
+        "_v_cos": np.cos,
+        "_v_tan": np.tan,
+        "_v_sqrt": np.sqrt,
+        "_v_log": np.log,
+        "_v_exp": np.exp,
+        "_v_rand": lambda n: rng.random(n),
+        "_v_randint": v_randint,
+        "true": True, "false": False, "True": True, "False": False,
+    }
+
+
+@dataclass
+class _VecAction:
+    action: Action
+    expr: Optional[VectorExpr] = None
+    args: Optional[List[Any]] = None  # lowered call args, or _FlockMembers when fused
+    handler: Optional[Callable] = None
+    fused: Tuple[Action, ...] = ()
+
+    @property
+    def lowered(self) -> bool:
+        return self.expr is not None or self.handler is not None
+
+
+@dataclass
+class _FlockMember:
+    action: Action
+    dynamic: Dict[int, VectorExpr]
+    selector: Any = None  # selectors.NeighborSelector
+
+
+@dataclass
+class _VecLaw:
+    law: Law
+    when: Optional[VectorExpr]
+    actions: List[_VecAction]
+
+
+def _float(v):
+    if isinstance(v, np.ndarray):
+        return v.astype(np.float64, copy=False)
+    return float(v)
+
+
+def _arg(args: List[Any], k: int, default):
+    return _float(args[k]) if len(args) > k else default
+
+
+class VectorEngine:
+    """Runs a Kernel's laws law-by-law over entity columns.
+
+    Unlike the scalar path (entity-major), every entity sees the results of
+    law N before law N+1 starts for anyone; neighbor reads therefore observe
+    a slightly different update order.
+    """
+
+    def __init__(self, kernel, seed: int = 0):
+        self.kernel = kernel
+        self.rng = np.random.default_rng(seed)
+        self._impl = _make_impl(self.rng)
+        self._calls: Dict[str, Callable] = {
+            "drag": self._drag,
+            "clamp_speed": self._clamp_speed,
+            "bounce": self._bounce,
+            "wrap": self._wrap,
+            "wind": self._wind,
+            "gust": self._gust,
+            "wander": self._wander,
+            "seek": self._seek,
+            "avoid": self._avoid,
+            "metabolize": self._metabolize,
+            "decay_unseen": self._decay_seen,
+            "fade_color": self._decay_seen,
+            "trade": self._trade,
+        }
+        if kernel.field_batch is not None:
+            # Field writes are queued, so they no longer need the scalar path.
+            for name, field, amount in _EMIT_CALLS:
+                self._calls[name] = self._emit(field, amount, sound=name == "emit_sound")
+            for name, field, amount, gain in _CONSUME_CALLS:
+                self._calls[name] = self._consume(field, amount, gain)
+        if kernel.flow is not None:
+            for name, field in FLOW_CALLS.items():
+                self._calls[name] = self._flow_seek(field, _SEEK_STRENGTH[name])
+        self.plan: List[_VecLaw] = [self._plan_law(law) for law in kernel.laws]
+
+    # --- planning -------------------------------------------------------
+
+    def _try_lower(self, compiled: CompiledExpr | None) -> Optional[VectorExpr]:
+        if compiled is None:
+            return None
+        try:
+            return lower_expr(compiled, self.kernel.world.entities.color_code)
+        except Unlowerable:
+            return None
+
+    def _plan_law(self, law: Law) -> _VecLaw:
+        actions: List[_VecAction] = []
+        for a in law.actions:
+            if a.kind == "assign":
+                expr = None if a.name == "color" else self._try_lower(a.expr)
+                actions.append(_VecAction(action=a, expr=expr))
+                continue
+            member = self._flock_member(a)
+            if member is not None:
+                prev = actions[-1] if actions else None
+                if prev is not None and prev.fused and prev.fused[0].argv[0] == a.argv[0]:
+                    prev.args.append(member)
+                    prev.fused = prev.fused + (a,)
+                else:
+                    actions.append(_VecAction(action=a, args=[member], handler=self._flock, fused=(a,)))
+                continue
+            handler = self._calls.get(a.name)
+            args = [self._try_lower(x) for x in (a.args or [])]
+            if handler is None or any(x is None for x in args):
+                actions.append(_VecAction(action=a))
+            else:
+                actions.append(_VecAction(action=a, args=args, handler=handler))
+        return _VecLaw(law=law, when=self._try_lower(law.when), actions=actions)
+
+    def _flock_member(self, a: Action) -> Optional[_FlockMember]:
+        if a.name not in _FLOCK_CALLS or 0 in a.dynamic or not isinstance(a.argv[0], float):
+            return None
+        selector = None
+        if a.name != "collide" and a.argv[2] is not None:
+            selector = self.kernel._selectors.get(id(a.argv[2]))
+            if selector is None:
+                return None
+        dynamic: Dict[int, VectorExpr] = {}
+        for pos in a.dynamic:
+            vexpr = self._try_lower(a.argv[pos])
+            if vexpr is None:
+                return None
+            dynamic[pos] = vexpr
+        return _FlockMember(action=a, dynamic=dynamic, selector=selector)
+
+    def plan_summary(self) -> List[Dict[str, Any]]:
+        summary = []
+        for vl in self.plan:
+            actions = []
+            for va in vl.actions:
+                if va.fused:
+                    actions.extend((a.name, "fused") for a in va.fused)
+                else:
+                    actions.append((va.action.name, "vector" if va.lowered else "scalar"))
+            summary.append({
+                "law": vl.law.name,
+                "when": "vector" if vl.when is not None else "scalar",
+                "actions": actions,
+            })
+        return summary
+
+    # --- env ------------------------------------------------------------
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        world = self.kernel.world
+        ix = np.clip(np.rint(x), 0, world.w - 1).astype(np.int64)
+        iy = np.clip(np.rint(y), 0, world.h - 1).astype(np.int64)
+        return ix, iy
+
+    def _gather(self, field, iy: np.ndarray, ix: np.ndarray) -> np.ndarray:
+        return gather_cells(self.kernel.world.backend, field, iy, ix).astype(np.float64)
+
+    def build_env(self, base_env: Dict[str, Any], season: float, rain: float) -> Dict[str, Any]:
+        kernel = self.kernel
+        world = kernel.world
+        table = world.entities
+        env: Dict[str, Any] = dict(base_env)
+        for name in _LIVE_COLUMNS:
+            env[name] = table.column(name)
+        env["age"] = table.column("age").copy()
+        env["static"] = table.column("static").copy()
+        env["color"] = table.column("color")
+        ix, iy = self._cells(env["x"], env["y"])
+        fields = (
+            world.terrain_field, world.water_field, world.fertility_field, world.climate_field,
+            world.road_field, world.settlement_field, world.home_field, world.farm_field,
+            world.market_field,
+        )
+        for name, field in zip(_FIELD_NAMES, fields):
+            env[name] = self._gather(field, iy, ix)
+        env.update(kernel._clock_env(season, rain))
+        if world.h <= 1:
+            env["latitude"] = np.zeros(len(table))
+        else:
+            env["latitude"] = (env["y"] / (world.h - 1)) * 2.0 - 1.0
+        return env
+
+    def _eval(self, vexpr: VectorExpr, env: Dict[str, Any], idx: np.ndarray):
+        scope = dict(self._impl)
+        scope["_n"] = int(idx.size)
+        for name in vexpr.names:
+            try:
+                v = env[name]
+            except KeyError:
+                raise NameError(f"name '{name}' is not defined") from None
+            scope[name] = v[idx] if isinstance(v, np.ndarray) else v
+        with np.errstate(all="ignore"):
+            return eval(vexpr.code, {"__builtins__": {}}, scope)
+
+    def _row_env(self, env: Dict[str, Any], i: int) -> Dict[str, Any]:
+        row = {k: (v[i] if isinstance(v, np.ndarray) else v) for k, v in env.items()}
+        row["color"] = self.kernel.world.entities.colors[int(env["color"][i])]
+        row["alive"] = bool(row["alive"])
+        row["aquatic"] = bool(row["aquatic"])
+        row["static"] = bool(row["static"])
+        return row
+
+    def _column(self, env: Dict[str, Any], name: str) -> np.ndarray:
+        cur = env.get(name, 0.0)
+        if isinstance(cur, np.ndarray):
+            return cur
+        col = np.full(len(self.kernel.world.entities), cur, dtype=np.float64)
+        env[name] = col
+        return col
+
+    # --- execution ------------------------------------------------------
+
+    def run(self, env: Dict[str, Any]) -> None:
+        alive = env["alive"]
+        for vl in self.plan:
+            active = np.flatnonzero(alive)
+            if not active.size:
+                return
+            idx = self._select(vl, env, active)
+            if not idx.size:
+                continue
+            for va in vl.actions:
+                if va.expr is not None:
+                    self._assign(va.action, self._eval(va.expr, env, idx), env, idx)
+                elif va.fused:
+                    va.handler(env, idx, va.args)
+                elif va.handler is not None:
+                    args = [self._eval(x, env, idx) for x in va.args]
+                    va.handler(env, idx, args)
+                else:
+                    self._fallback(va.action, env, idx)
+
+    def _select(self, vl: _VecLaw, env: Dict[str, Any], active: np.ndarray) -> np.ndarray:
+        if vl.law.always:
+            return active
+        if vl.when is None:
+            keep = [i for i in active.tolist() if eval_expr(vl.law.when, self._row_env(env, i))]
+            return np.asarray(keep, dtype=np.int64)
+        mask = self._eval(vl.when, env, active)
+        if np.ndim(mask) == 0:
+            return active if bool(mask) else active[:0]
+        return active[np.asarray(mask, dtype=bool)]
+
+    def _assign(self, a: Action, val, env: Dict[str, Any], idx: np.ndarray) -> None:
+        col = self._column(env, a.name)
+        cur = col[idx]
+        with np.errstate(all="ignore"):
+            if a.op == "=":
+                new = val
+            elif a.op == "+=":
+                new = cur + val
+            elif a.op == "-=":
+                new = cur - val
+            elif a.op == "*=":
+                new = cur * val
+            elif a.op == "/=":
+                new = np.where(np.asarray(val) != 0, cur / np.where(np.asarray(val) != 0, val, 1), cur)
+            else:
+                return
+        col[idx] = new
+        if a.name in ("aquatic", "static"):
+            self.kernel.world.entities.static_version += 1
+
+    def _fallback(self, a: Action, env: Dict[str, Any], idx: np.ndarray) -> None:
+        kernel = self.kernel
+        table = kernel.world.entities
+        if a.kind == "assign":
+            col = self._column(env, a.name) if a.name != "color" else None
+            for i in idx.tolist():
+                row = self._row_env(env, i)
+                val = eval_expr(a.expr, row)
+                if a.name == "color":
+                    if a.op == "=":
+                        env["color"][i] = table.color_code(str(val))
+                        table.static_version += 1
+                    continue
+                self._assign(a, val, env, np.asarray([i]))
+            return
+        for i in idx.tolist():
+            row = self._row_env(env, i)
+            kernel._invoke(a, row, EntityView(table, i))
+            for name in _CALL_WRITES:
+                env[name][i] = row[name]
+
+    # --- lowered calls --------------------------------------------------
+
+    def _rand01(self, idx: np.ndarray, salt: int) -> np.ndarray:
+        ids = self.kernel.world.entities.column("id")[idx].astype(np.float64)
+        t = float(self.kernel.world.time)
+        return (np.sin((ids + 1) * 12.9898 + (t + salt) * 0.123) * 43758.5453) % 1
+
+    def _drag(self, env, idx, args) -> None:
+        damp = np.maximum(0.0, 1.0 - _arg(args, 0, 0.02))
+        for name in ("vx", "vy", "vz"):
+            col = env[name]
+            col[idx] = col[idx] * damp
+
+    def _clamp_speed(self, env, idx, args) -> None:
+        limit = _arg(args, 0, self.kernel.cfg.max_speed)
+        vx = env["vx"][idx]
+        vy = env["vy"][idx]
+        speed = np.hypot(vx, vy)
+        over = (speed > limit) & (speed > 0.001)
+        scale = np.where(over, limit / np.where(over, speed, 1.0), 1.0)
+        env["vx"][idx] = vx * scale
+        env["vy"][idx] = vy * scale
+
+    def _bounce(self, env, idx, args) -> None:
+        margin = _arg(args, 0, 0.0)
+        elasticity = _arg(args, 1, 0.8)
+        world = self.kernel.world
+        for pos, vel, size in (("x", "vx", world.w), ("y", "vy", world.h)):
+            p = env[pos][idx]
+            v = env[vel][idx]
+            flip = (p < margin) | (p > size - 1 - margin)
+            env[vel][idx] = np.where(flip, -v * elasticity, v)
+
+    def _wrap(self, env, idx, args) -> None:
+        margin = _arg(args, 0, 0.0)
+        world = self.kernel.world
+        for pos, size in (("x", world.w), ("y", world.h)):
+            p = env[pos][idx]
+            hi = size - 1 + margin
+            env[pos][idx] = np.where(p < -margin, hi, np.where(p > hi, -margin, p))
+
+    def _wind(self, env, idx, args) -> None:
+        strength = _arg(args, 0, 1.0)
+        world = self.kernel.world
+        env["vx"][idx] = env["vx"][idx] + world.wind_x * strength
+        env["vy"][idx] = env["vy"][idx] + world.wind_y * strength
+
+    def _gust(self, env, idx, args) -> None:
+        strength = _arg(args, 0, 1.0)
+        world = self.kernel.world
+        env["vx"][idx] = env["vx"][idx] + (self._rand01(idx, 11) - 0.5) * strength + world.wind_x
+        env["vy"][idx] = env["vy"][idx] + (self._rand01(idx, 17) - 0.5) * strength + world.wind_y
+
+    def _wander(self, env, idx, args) -> None:
+        strength = _arg(args, 0, 0.05)
+        env["vx"][idx] = env["vx"][idx] + (self._rand01(idx, 3) - 0.5) * strength
+        env["vy"][idx] = env["vy"][idx] + (self._rand01(idx, 7) - 0.5) * strength
+
+    def _steer(self, env, idx, dx, dy, strength) -> None:
+        d = np.sqrt(dx * dx + dy * dy)
+        ok = d > 0.001
+        inv = np.where(ok, 1.0 / np.where(ok, d, 1.0), 0.0)
+        env["vx"][idx] = env["vx"][idx] + dx * inv * strength
+        env["vy"][idx] = env["vy"][idx] + dy * inv * strength
+
+    def _seek(self, env, idx, args) -> None:
+        x = env["x"][idx]
+        y = env["y"][idx]
+        tx = _arg(args, 0, x)
+        ty = _arg(args, 1, y)
+        self._steer(env, idx, tx - x, ty - y, _arg(args, 2, 0.05))
+
+    def _avoid(self, env, idx, args) -> None:
+        x = env["x"][idx]
+        y = env["y"][idx]
+        tx = _arg(args, 0, x)
+        ty = _arg(args, 1, y)
+        self._steer(env, idx, x - tx, y - ty, _arg(args, 2, 0.05))
+
+    def _metabolize(self, env, idx, args) -> None:
+        energy = env["energy"][idx] - _arg(args, 0, 0.01)
+        env["energy"][idx] = energy
+        env["alive"][idx[energy <= 0.0]] = False
+
+    def _decay_seen(self, env, idx, args) -> None:
+        env["seen"][idx] = np.maximum(0.0, env["seen"][idx] - _arg(args, 0, 0.02))
+
+    def _trade(self, env, idx, args) -> None:
+        rate = _arg(args, 0, 0.02)
+        ix, iy = self._cells(env["x"][idx], env["y"][idx])
+        market = self._gather(self.kernel.world.market_field, iy, ix)
+        env["wealth"][idx] = env["wealth"][idx] + market * rate
+        env["energy"][idx] = env["energy"][idx] - rate * 0.02
+
+    def _emit(self, field: str, default: float, sound: bool = False):
+        def run(env, idx, args) -> None:
+            amount = _arg(args, 0, default)
+            ix, iy = self._cells(env["x"][idx], env["y"][idx])
+            self.kernel.field_batch.deposit(field, iy, ix, amount)
+            if sound:
+                env["sound"][idx] = env["sound"][idx] + amount
+        return run
+
+    def _consume(self, field: str, default: float, default_gain: float):
+        def run(env, idx, args) -> None:
+            ix, iy = self._cells(env["x"][idx], env["y"][idx])
+            self.kernel.field_batch.consume(field, idx, iy, ix, _arg(args, 0, default), _arg(args, 1, default_gain))
+        return run
+
+    def _flow_seek(self, field: str, default: float):
+        def run(env, idx, args) -> None:
+            ix, iy = self._cells(env["x"][idx], env["y"][idx])
+            dx, dy = self.kernel.flow.step_at(field, iy, ix)
+            move = (dx != 0) | (dy != 0)
+            sel = idx[move]
+            tx = (ix[move] + dx[move]).astype(np.float64)
+            ty = (iy[move] + dy[move]).astype(np.float64)
+            strength = _arg(args, 0, default)
+            if isinstance(strength, np.ndarray):
+                strength = strength[move]
+            self._steer(env, sel, tx - env["x"][sel], ty - env["y"][sel], strength)
+        return run
+
+    # --- fused neighbor calls -------------------------------------------
+
+    def _flock(self, env, idx, members: List[_FlockMember]) -> None:
+        """Run a group of neighbor calls sharing one radius over one pair set.
+
+        Every call reads the state from before the group; velocity changes are
+        summed in action order and written back once.
+        """
+        kernel = self.kernel
+        table = kernel.world.entities
+        radius = members[0].action.argv[0]
+        x, y = env["x"], env["y"]
+        pairs = kernel._pairs(x, y, idx, radius)
+        live = env["alive"][pairs[1]]
+        pairs = tuple(p[live] for p in pairs)
+        n = idx.size
+        dvx = np.zeros(n)
+        dvy = np.zeros(n)
+        with np.errstate(all="ignore"):
+            for m in members:
+                argv = list(m.action.argv)
+                for pos, vexpr in m.dynamic.items():
+                    argv[pos] = _float(self._eval(vexpr, env, idx))
+                qi, j, dx, dy, d2 = pairs
+                if m.selector is not None:
+                    own = {}
+                    for name in m.selector.self_names:
+                        if name in env:
+                            v = env[name]
+                            own[name] = v[idx][qi] if isinstance(v, np.ndarray) else v
+                    keep = m.selector.pair_mask(table, j, own, kernel._grid_stamp)
+                    qi, j, dx, dy, d2 = qi[keep], j[keep], dx[keep], dy[keep], d2[keep]
+                mode = m.action.name
+                if mode in ("cohere", "align", "separate"):
+                    strength = argv[1]
+                    count = np.bincount(qi, minlength=n)
+                    has = count > 0
+                    safe = np.where(has, count, 1)
+                    if mode == "cohere":
+                        tx = x[idx] - np.where(has, np.bincount(qi, x[j], n) / safe, x[idx])
+                        ty = y[idx] - np.where(has, np.bincount(qi, y[j], n) / safe, y[idx])
+                        d = np.sqrt(tx * tx + ty * ty)
+                        ok = d > 0.001
+                        inv = np.where(ok, 1.0 / np.where(ok, d, 1.0), 0.0)
+                        dvx -= tx * inv * strength
+                        dvy -= ty * inv * strength
+                    elif mode == "align":
+                        vx, vy = env["vx"], env["vy"]
+                        dvx += np.where(has, (np.bincount(qi, vx[j], n) / safe - vx[idx]) * strength, 0.0)
+                        dvy += np.where(has, (np.bincount(qi, vy[j], n) / safe - vy[idx]) * strength, 0.0)
+                    else:
+                        inv = 1.0 / np.sqrt(np.maximum(d2, 0.001))
+                        dvx -= np.bincount(qi, dx * inv, n) * strength
+                        dvy -= np.bincount(qi, dy * inv, n) * strength
+                elif mode in ("attract", "repel"):
+                    near = d2 >= 0.001
+                    inv = 1.0 / (d2[near] + 8.0)
+                    gain = argv[1] / np.maximum(0.1, env["mass"][idx])
+                    if mode == "repel":
+                        gain = -gain
+                    dvx += np.bincount(qi[near], dx[near] * inv, n) * gain
+                    dvy += np.bincount(qi[near], dy[near] * inv, n) * gain
+                else:
+                    near = d2 > 0.0001
+                    dist = np.sqrt(d2[near])
+                    gain = argv[2] + argv[1] * 0.02
+                    dvx -= np.bincount(qi[near], dx[near] / dist, n) * gain
+                    dvy -= np.bincount(qi[near], dy[near] / dist, n) * gain
+        env["vx"][idx] = env["vx"][idx] + dvx
+        env["vy"][idx] = env["vy"][idx] + dvy
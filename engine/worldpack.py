@@ -138,6 +138,9 @@ def validate_worldpack(data: Dict[str, Any] | WorldPack) -> List[str]:
             color = profile.get("color")
             if color is not None and not isinstance(color, str):
                 errors.append(f"profiles[{idx}].color must be a string")
+            kind = profile.get("kind")
+            if kind is not None and not isinstance(kind, str):
+                errors.append(f"profiles[{idx}].kind must be a string")
     laws = data.get("laws", [])
     if laws is not None and not isinstance(laws, list):
         errors.append("laws must be a list")
@@ -3,6 +3,7 @@ import EngineView from "./components/EngineView";
 import PixelArtView from "./components/PixelArtView";
 import { CharacterCreator } from "./components/CharacterCreator";
 import { AmbientAudio } from "./engine/ambientAudio";
+import { decodeFields } from "./engine/fieldProtocol";
 
 const DEFAULT_ENTITY_COUNT = 300;  // More entities for a living world
 const DEFAULT_API_BASE = "http://127.0.0.1:8000";
@@ -137,6 +138,8 @@ export default function App() {
   const [status, setStatus] = useState("Idle");
   const [initialFrame, setInitialFrame] = useState<FramePayload | null>(null);
   const [fields, setFields] = useState<FieldPayload | null>(null);
+  // Last compact field fetch: its query and serial, for ?since= refetches.
+  const fieldsFetchRef = useRef<{ query: string; serial: number; payload: FieldPayload } | null>(null);
   const [lastFrame, setLastFrame] = useState<FramePayload | null>(null);
   const [selectedId, setSelectedId] = useState<number | null>(null);
   const [autoStarted, setAutoStarted] = useState(false);
@@ -373,14 +376,20 @@ export default function App() {
       const includeVoxels = mode === "3d";
       const url = new URL(`${API_BASE}/api/fields`);
       url.searchParams.set("step", String(step));
+      url.searchParams.set("encoding", "compact");
       if (includeVoxels) {
         url.searchParams.set("voxels", "1");
         url.searchParams.set("z_step", "1");
       }
+      const query = url.search;
+      const previous = fieldsFetchRef.current?.query === query ? fieldsFetchRef.current : null;
+      if (previous) url.searchParams.set("since", String(previous.serial));
       const res = await fetch(url.toString());
       if (!res.ok) return;
       if (res.status === 204) return;
-      const payload = (await res.json()) as FieldPayload;
+      const packed = (await res.json()) as Record<string, unknown> & { serial: number };
+      const payload = await decodeFields<FieldPayload>(packed, previous?.payload);
+      fieldsFetchRef.current = { query, serial: packed.serial, payload };
       setFields(payload);
     } catch {
       return;
@@ -2,6 +2,8 @@ import React, { useEffect, useMemo, useRef, useState, useCallback } from "react"
 import { Renderer, Entity } from "../engine/Renderer";
 import type { AssetStyle } from "../engine/assets";
 import { EntityThoughts, SpeechBubble } from "./SpeechBubble";
+import { decodeFrame, FrameState, isBinaryFrame } from "../engine/frameProtocol";
+import { decodeFields, isCompactFields } from "../engine/fieldProtocol";
 
 type FramePayload = {
   t: number;
@@ -72,9 +74,10 @@ const normalizeWsUrl = (apiBase?: string) => {
     const parsed = new URL(base);
     parsed.protocol = parsed.protocol === "https:" ? "wss:" : "ws:";
     parsed.pathname = "/ws/stream";
+    parsed.search = "?format=binary&delta=1&fields=compact";
     return parsed.toString();
   } catch {
-    return base.replace(/^http/, "ws").replace(/\/+$/, "") + "/ws/stream";
+    return base.replace(/^http/, "ws").replace(/\/+$/, "") + "/ws/stream?format=binary&delta=1&fields=compact";
   }
 };
 
@@ -329,19 +332,45 @@ export default function EngineView({
       }
     };
 
+    const frameState = new FrameState();
+    let subscribed = "";
+
+    // Stream only the part of the world on screen (whole cells, plus the
+    // server's margin); re-sent as the camera pans or zooms.
+    const subscribeView = () => {
+      const area = rendererRef.current?.visibleArea() ?? null;
+      if (!ws || ws.readyState !== WebSocket.OPEN) return;
+      const message = area
+        ? { type: "subscribe", rect: area.rect.map((v) => Math.round(v)), zoom: Math.round(area.zoom * 10) / 10 }
+        : { type: "subscribe" };
+      const key = JSON.stringify(message);
+      if (key === subscribed) return;
+      subscribed = key;
+      ws.send(key);
+    };
+    const viewTimer = window.setInterval(subscribeView, 250);
+
     const connect = () => {
       if (closed || !normalizedWsUrl) return;
+      frameState.reset();
+      subscribed = "";
       ws = new WebSocket(normalizedWsUrl);
+      ws.binaryType = "arraybuffer";
       ws.onopen = () => {
         lastMessage = Date.now();
+        subscribeView();
       };
       ws.onmessage = (ev) => {
         try {
-          const data = JSON.parse(ev.data);
+          const data = isBinaryFrame(ev.data) ? decodeFrame(ev.data) : JSON.parse(ev.data);
           lastMessage = Date.now();
 
           // New: Handle typed messages (Terrain Fields)
           if (data.type === "fields") {
+            if (isCompactFields(data.data)) {
+              void decodeFields<any>(data.data).then((decoded) => rendererRef.current?.setFields(decoded));
+              return;
+            }
             const renderer = rendererRef.current;
             if (renderer && data.data) {
               renderer.setFields(data.data);
@@ -349,9 +378,14 @@ export default function EngineView({
             return;
           }
 
-          // Default: Treat as FramePayload
+          // Default: Treat as FramePayload, merged onto the entities held
           stopPolling();
-          applyPayload(data);
+          const frame = frameState.apply(data);
+          if (!frame) {
+            ws?.send(JSON.stringify({ type: "resync" }));
+            return;
+          }
+          applyPayload(frame);
         } catch {
           return;
         }
@@ -388,6 +422,7 @@ export default function EngineView({
       closed = true;
       if (timer) window.clearTimeout(timer);
       if (healthTimer) window.clearInterval(healthTimer);
+      window.clearInterval(viewTimer);
       stopPolling();
       ws?.close();
     };
@@ -687,6 +687,20 @@ export class Renderer {
     }
   }
 
+  // Ground rectangle (world cells) the isometric camera shows, for the
+  // stream's area-of-interest subscription; null when every cell may show.
+  visibleArea(): { rect: [number, number, number, number]; zoom: number } | null {
+    if (this.mode === "3d") return null;
+    const cam = this.camera;
+    const a = (cam.right - cam.left) / 2 / cam.zoom;
+    const b = (cam.top - cam.bottom) / 2 / cam.zoom;
+    // Screen axes on the ground plane for a camera looking along (1, 1, 1).
+    const half = (Math.SQRT2 * a + Math.sqrt(6) * b) / 2;
+    const cx = this.orbit.panX + this.w / 2;
+    const cy = this.orbit.panY + this.h / 2;
+    return { rect: [cx - half, cy - half, cx + half, cy + half], zoom: this.orbit.zoom };
+  }
+
   setMode(mode: RenderMode) {
     this.mode = mode;
     this.activeCamera = mode === "3d" ? this.debugCamera : this.camera;
@@ -0,0 +1,59 @@
+// Decoder for compact field payloads (/api/fields?encoding=compact, and the
+// first /ws/stream message with ?fields=compact). Layout: pack_field in
+// server/protocol.py: value = q * scale + offset, q zlib-compressed, base64.
+
+export type PackedField = {
+  dtype: "uint8" | "uint16";
+  shape: number[];
+  offset: number;
+  scale: number;
+  data: string;
+};
+
+type Nested = number | Nested[];
+
+export const isCompactFields = (payload: unknown): payload is Record<string, unknown> =>
+  typeof payload === "object" && payload !== null && (payload as { encoding?: string }).encoding === "compact";
+
+const isPacked = (value: unknown): value is PackedField =>
+  typeof value === "object" && value !== null && typeof (value as PackedField).data === "string" && Array.isArray((value as PackedField).shape);
+
+const inflate = async (base64: string) => {
+  const binary = atob(base64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  // zlib-wrapped, which DecompressionStream calls "deflate".
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("deflate"));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+};
+
+export async function unpackField(field: PackedField): Promise<Nested> {
+  const raw = await inflate(field.data);
+  const q = field.dtype === "uint8" ? raw : new Uint16Array(raw.buffer, raw.byteOffset, raw.byteLength / 2);
+  const { shape, scale, offset } = field;
+  const strides = shape.map((_, dim) => shape.slice(dim + 1).reduce((a, b) => a * b, 1));
+  const build = (dim: number, start: number): Nested[] => {
+    const stride = strides[dim];
+    const out = new Array<Nested>(shape[dim]);
+    for (let i = 0; i < shape[dim]; i++) {
+      out[i] = dim === shape.length - 1 ? q[start + i] * scale + offset : build(dim + 1, start + i * stride);
+    }
+    return out;
+  };
+  return shape.length === 0 ? q[0] * scale + offset : build(0, 0);
+}
+
+// Unpacks every packed map into nested arrays. Maps left out because they did
+// not change (?since=) are taken from `previous`.
+export async function decodeFields<T extends object>(payload: Record<string, unknown>, previous?: T | null): Promise<T> {
+  const out: Record<string, unknown> = { ...(previous ?? {}), ...payload };
+  delete out.encoding;
+  await Promise.all(
+    Object.entries(payload)
+      .filter(([, value]) => isPacked(value))
+      .map(async ([name, value]) => {
+        out[name] = await unpackField(value as PackedField);
+      })
+  );
+  return out as T;
+}
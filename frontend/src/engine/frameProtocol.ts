@@ -0,0 +1,138 @@
+import type { Entity } from "./Renderer";
+
+// Decoder for the binary /ws/stream frames (?format=binary).
+// Layout: server/protocol.py. All values are little-endian.
+
+export const FRAME_MAGIC = "AGFR";
+export const FRAME_SCHEMA_VERSION = 1;
+const FLAG_QUANTIZED = 1;
+const FLAG_DELTA = 2;
+const HEADER_SIZE = 32;
+const QUANT_MAX = 65535;
+
+export type BinaryFrame = {
+  tick: number;
+  t: number;
+  w: number;
+  h: number;
+  entities: Entity[];
+  // Delta frames (?delta=1): entities holds only spawned/changed entities.
+  type?: "delta" | "keyframe";
+  base?: number;
+  removed?: number[];
+};
+
+const utf8 = new TextDecoder();
+
+export const isBinaryFrame = (data: unknown): data is ArrayBuffer => data instanceof ArrayBuffer;
+
+export function decodeFrame(buffer: ArrayBuffer): BinaryFrame {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  const magic = utf8.decode(bytes.subarray(0, 4));
+  if (magic !== FRAME_MAGIC) throw new Error("not an Aethergrid frame");
+  const version = view.getUint16(4, true);
+  if (version !== FRAME_SCHEMA_VERSION) throw new Error(`unsupported frame schema version ${version}`);
+  const flags = view.getUint16(6, true);
+  const tick = view.getUint32(8, true);
+  const count = view.getUint32(12, true);
+  const t = view.getFloat64(16, true);
+  const w = view.getUint16(24, true);
+  const h = view.getUint16(26, true);
+  const d = view.getUint16(28, true);
+  const ncolors = view.getUint16(30, true);
+
+  let offset = HEADER_SIZE;
+  let delta: Pick<BinaryFrame, "type" | "base" | "removed"> = {};
+  if (flags & FLAG_DELTA) {
+    const base = view.getUint32(offset, true);
+    const nremoved = view.getUint32(offset + 4, true);
+    const removed = new Array<number>(nremoved);
+    for (let i = 0; i < nremoved; i++) removed[i] = view.getUint32(offset + 8 + i * 4, true);
+    delta = { type: "delta", base, removed };
+    offset += 8 + nremoved * 4;
+  }
+  const tableStart = offset;
+  const colors: string[] = [];
+  const kinds: string[] = [];
+  const readString = () => {
+    const n = bytes[offset];
+    const text = utf8.decode(bytes.subarray(offset + 1, offset + 1 + n));
+    offset += 1 + n;
+    return text;
+  };
+  for (let i = 0; i < ncolors; i++) {
+    colors.push(readString());
+    kinds.push(readString());
+  }
+  offset += (4 - ((offset - tableStart) % 4)) % 4;
+
+  const column = (width: number, read: (at: number) => number) => {
+    const out = new Array<number>(count);
+    for (let i = 0; i < count; i++) out[i] = read(offset + i * width);
+    offset += count * width;
+    return out;
+  };
+  const u32 = () => column(4, (at) => view.getUint32(at, true));
+  const u16 = () => column(2, (at) => view.getUint16(at, true));
+  const f32 = () => column(4, (at) => view.getFloat32(at, true));
+  const position = (extent: number) =>
+    flags & FLAG_QUANTIZED ? u16().map((q) => (q * extent) / QUANT_MAX) : f32();
+
+  const id = u32();
+  const vx = f32();
+  const vy = f32();
+  const vz = f32();
+  f32(); // mass, not rendered
+  const hardness = f32();
+  const energy = f32();
+  const wealth = f32();
+  const x = position(w);
+  const y = position(h);
+  const z = position(d);
+  const codes = u16();
+
+  const entities: Entity[] = new Array(count);
+  for (let i = 0; i < count; i++) {
+    entities[i] = {
+      id: id[i],
+      x: x[i],
+      y: y[i],
+      z: z[i],
+      vx: vx[i],
+      vy: vy[i],
+      vz: vz[i],
+      color: colors[codes[i]],
+      kind: kinds[codes[i]],
+      size: 3 + hardness[i] * 0.6,
+      hardness: hardness[i],
+      energy: energy[i],
+      wealth: wealth[i],
+    };
+  }
+  return { ...delta, tick, t, w, h, entities };
+}
+
+// Entities held by a delta-stream client. apply() returns the full frame, or
+// null when a delta does not follow the frame held (ask the server to resync).
+export class FrameState {
+  private entities = new Map<number, Entity>();
+  tick = -1;
+
+  apply(frame: BinaryFrame): BinaryFrame | null {
+    if (frame.type === "delta") {
+      if (frame.base !== this.tick) return null;
+      for (const id of frame.removed ?? []) this.entities.delete(id);
+    } else {
+      this.entities.clear();
+    }
+    for (const entity of frame.entities) this.entities.set(entity.id, entity);
+    this.tick = frame.tick;
+    return { tick: frame.tick, t: frame.t, w: frame.w, h: frame.h, entities: Array.from(this.entities.values()) };
+  }
+
+  reset() {
+    this.entities.clear();
+    this.tick = -1;
+  }
+}
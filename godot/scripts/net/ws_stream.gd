@@ -6,17 +6,32 @@ signal connected
 signal disconnected
 signal error(err: int)
 
+const FRAME_MAGIC := "AGFR"
+const FRAME_SCHEMA_VERSION := 1
+const FLAG_QUANTIZED := 1
+const FLAG_DELTA := 2
+const HEADER_SIZE := 32
+const QUANT_MAX := 65535.0
+
 var peer := WebSocketPeer.new()
 var active := false
 var has_connected := false
+var binary_frames := true  # ask for the binary frame format (server/protocol.py)
+# Entities held for delta frames (?delta=1), by id, and the tick they are at.
+var held := {}
+var held_tick := -1
 
 func connect_to_url(url: String) -> void:
+	if binary_frames and not url.contains("?"):
+		url += "?format=binary"
 	var err := peer.connect_to_url(url)
 	if err != OK:
 		emit_signal("error", err)
 		return
 	active = true
 	has_connected = false
+	held.clear()
+	held_tick = -1
 	set_process(true)
 
 func close() -> void:
@@ -35,7 +50,13 @@ func _process(_delta: float) -> void:
 			has_connected = true
 			emit_signal("connected")
 		while peer.get_available_packet_count() > 0:
-			var text := peer.get_packet().get_string_from_utf8()
+			var packet := peer.get_packet()
+			if not peer.was_string_packet():
+				var frame := apply_frame(decode_frame(packet))
+				if not frame.is_empty():
+					emit_signal("frame_received", frame)
+				continue
+			var text := packet.get_string_from_utf8()
 			var json := JSON.new()
 			if json.parse(text) != OK:
 				continue
@@ -51,3 +72,91 @@ func _process(_delta: float) -> void:
 			active = false
 			emit_signal("disconnected")	
 			set_process(false)
+
+# Merges a decoded frame into the held entities and returns the full frame.
+# A delta that does not follow the held tick is dropped and a keyframe asked for.
+func apply_frame(frame: Dictionary) -> Dictionary:
+	if frame.is_empty():
+		return frame
+	if frame.get("type", "") == "delta":
+		if frame["base"] != held_tick:
+			peer.send_text(JSON.stringify({"type": "resync"}))
+			return {}
+		for id in frame["removed"]:
+			held.erase(id)
+	else:
+		held.clear()
+	for ent in frame["entities"]:
+		held[ent["id"]] = ent
+	held_tick = frame["tick"]
+	return {"tick": frame["tick"], "t": frame["t"], "w": frame["w"], "h": frame["h"], "entities": held.values()}
+
+# Unpacks a binary frame into the same Dictionary as a JSON frame (plus "tick";
+# delta frames also carry "type", "base" and "removed").
+static func decode_frame(data: PackedByteArray) -> Dictionary:
+	if data.size() < HEADER_SIZE or data.slice(0, 4).get_string_from_ascii() != FRAME_MAGIC:
+		return {}
+	if data.decode_u16(4) != FRAME_SCHEMA_VERSION:
+		return {}
+	var flags := data.decode_u16(6)
+	var quantized := (flags & FLAG_QUANTIZED) != 0
+	var count := data.decode_u32(12)
+	var extents := [float(data.decode_u16(24)), float(data.decode_u16(26)), float(data.decode_u16(28))]
+	var ncolors := data.decode_u16(30)
+	var offset := HEADER_SIZE
+	var delta := {}
+	if flags & FLAG_DELTA:
+		var nremoved := data.decode_u32(offset + 4)
+		var removed := []
+		for i in nremoved:
+			removed.append(data.decode_u32(offset + 8 + i * 4))
+		delta = {"type": "delta", "base": data.decode_u32(offset), "removed": removed}
+		offset += 8 + nremoved * 4
+	var table_start := offset
+	var colors: Array[String] = []
+	var kinds: Array[String] = []
+	for i in ncolors:
+		for out in [colors, kinds]:
+			var n := data[offset]
+			out.append(data.slice(offset + 1, offset + 1 + n).get_string_from_utf8())
+			offset += 1 + n
+	offset += (4 - (offset - table_start) % 4) % 4
+
+	var ids := []
+	for i in count:
+		ids.append(data.decode_u32(offset + i * 4))
+	offset += count * 4
+	var floats := {}
+	for name in ["vx", "vy", "vz", "mass", "hardness", "energy", "wealth"]:
+		var col := []
+		for i in count:
+			col.append(data.decode_float(offset + i * 4))
+		offset += count * 4
+		floats[name] = col
+	for axis in 3:
+		var col := []
+		for i in count:
+			if quantized:
+				col.append(data.decode_u16(offset + i * 2) * extents[axis] / QUANT_MAX)
+			else:
+				col.append(data.decode_float(offset + i * 4))
+		offset += count * (2 if quantized else 4)
+		floats[["x", "y", "z"][axis]] = col
+
+	var entities := []
+	for i in count:
+		var code := data.decode_u16(offset + i * 2)
+		var ent := {"id": ids[i], "color": colors[code], "kind": kinds[code]}
+		for name in floats:
+			ent[name] = floats[name][i]
+		ent["size"] = 3.0 + ent["hardness"] * 0.6
+		entities.append(ent)
+	var frame := {
+		"tick": data.decode_u32(8),
+		"t": data.decode_double(16),
+		"w": int(extents[0]),
+		"h": int(extents[1]),
+		"entities": entities,
+	}
+	frame.merge(delta)
+	return frame
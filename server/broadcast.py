@@ -0,0 +1,54 @@
+"""Fan-out of simulation frames to ``/ws/stream`` subscribers.
+
+The simulation loop publishes each frame it produces once. Every subscriber
+is woken, picks up the latest frame (a slow one skips to it) and asks for it
+in its encoding; each encoding of a frame is serialized once and the same
+bytes go to every subscriber that wants it. Nothing is published while the
+simulation is paused, so idle subscribers send nothing.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class FrameHub:
+    def __init__(self) -> None:
+        self.version = 0  # bumped by every publish
+        self.frame: Any = None
+        self._encoded: Dict[Hashable, Any] = {}
+        self._subscribers: Set[asyncio.Event] = set()
+        self.encodes = 0  # serializations since startup
+
+    def publish(self, frame: Any) -> int:
+        """Make ``frame`` the current one and wake every subscriber."""
+        self.version += 1
+        self.frame = frame
+        self._encoded.clear()
+        for wake in self._subscribers:
+            wake.set()
+        return self.version
+
+    def subscribe(self) -> asyncio.Event:
+        """Event set on every publish; already set when a frame is waiting."""
+        wake = asyncio.Event()
+        if self.frame is not None:
+            wake.set()
+        self._subscribers.add(wake)
+        return wake
+
+    def unsubscribe(self, wake: asyncio.Event) -> None:
+        self._subscribers.discard(wake)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def encoded(self, key: Hashable, encode: Callable[[], T]) -> T:
+        """The current frame in the encoding ``key``, serialized on first use."""
+        if key not in self._encoded:
+            self._encoded[key] = encode()
+            self.encodes += 1
+        return self._encoded[key]
@@ -0,0 +1,95 @@
+"""Area-of-interest subscriptions for ``/ws/stream``.
+
+A client sends the part of the world it shows::
+
+    {"type": "subscribe", "rect": [x0, y0, x1, y1], "zoom": 1.5}
+    {"type": "subscribe", "center": [x, y], "radius": r}
+
+and from then on gets only the entities inside that area plus a margin of
+``AOI_MARGIN / zoom`` cells, so entities slide in before they reach the
+screen edge. ``{"type": "subscribe"}`` without an area goes back to the
+whole world. Subscriptions can be sent again at any time as the camera pans.
+
+Culling uses a cell list (``engine.spatial.CellList``, the kernel's
+neighbor index) built once per frame from the frame's positions and shared
+by every viewer. In delta mode a view remembers which entities its client
+holds: entities that enter the area arrive as spawns, those that leave or
+despawn as removals, and the rest as in the world-wide delta.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Mapping, Tuple
+
+import numpy as np
+
+from .protocol import FrameDelta
+
+AOI_MARGIN = 8.0
+MIN_ZOOM = 0.25
+
+
+@dataclass(frozen=True)
+class AreaOfInterest:
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    zoom: float = 1.0
+
+    @classmethod
+    def from_message(cls, message: Mapping[str, Any]) -> "AreaOfInterest | None":
+        """Parse a subscribe message; None means the whole world."""
+        zoom = float(message.get("zoom", 1.0) or 1.0)
+        if message.get("rect") is not None:
+            x0, y0, x1, y1 = (float(v) for v in message["rect"])
+        elif message.get("center") is not None:
+            cx, cy = (float(v) for v in message["center"])
+            r = abs(float(message.get("radius", 0.0)))
+            x0, y0, x1, y1 = cx - r, cy - r, cx + r, cy + r
+        else:
+            return None
+        if not all(math.isfinite(v) for v in (x0, y0, x1, y1, zoom)):
+            raise ValueError("area of interest must be finite")
+        return cls(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1), zoom)
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """The area grown by the zoom-scaled margin."""
+        m = AOI_MARGIN / max(self.zoom, MIN_ZOOM)
+        return self.x0 - m, self.y0 - m, self.x1 + m, self.y1 + m
+
+    def rows(self, frame) -> np.ndarray:
+        """Sorted frame rows of the entities inside ``bounds()``."""
+        left, top, right, bottom = self.bounds()
+        rows = frame.spatial_index().window(left, top, right, bottom)
+        x = frame.columns["x"][rows]
+        y = frame.columns["y"][rows]
+        inside = (x >= left) & (x <= right) & (y >= top) & (y <= bottom)
+        return np.sort(rows[inside])
+
+
+class View:
+    """One client's area of interest and the entity ids it holds."""
+
+    def __init__(self, area: AreaOfInterest | None = None):
+        self.area = area
+        self.held: np.ndarray | None = None  # sorted ids; None before a keyframe
+
+    def select(self, frame, delta: FrameDelta | None, since: int | None) -> FrameDelta:
+        """Rows of ``frame`` to send and ids to drop, and advance ``held``.
+
+        ``delta`` is the frame's world-wide delta when it applies on top of
+        ``since``; ``since == frame.tick`` re-sends the same frame (the area
+        moved), which only adds and drops entities.
+        """
+        rows = self.area.rows(frame)
+        ids = np.asarray(frame.columns["id"], dtype=np.int64)[rows]
+        held, self.held = self.held, np.sort(ids)
+        resend = since is not None and since == frame.tick
+        if since is None or held is None or (delta is None and not resend):
+            return FrameDelta(True, -1, rows)
+        changed = np.isin(rows, delta.rows, assume_unique=True) if delta is not None else np.zeros(rows.size, dtype=bool)
+        entering = ~np.isin(ids, held, assume_unique=True)
+        removed = np.setdiff1d(held, ids, assume_unique=True)
+        return FrameDelta(False, int(since), rows[changed | entering], removed)
@@ -8,6 +8,7 @@ from typing import Any, Dict, List
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from .interest import AreaOfInterest, View
 from .sim_service import SimulationService
 from .ollama_service import ollama_service
 from engine.backend import gpu_available, gpu_available_cached
@@ -132,8 +133,20 @@ async def frame() -> Dict[str, Any]:
 
 
 @app.get("/api/fields")
-async def fields(step: int = 4, voxels: bool = False, z_step: int = 1) -> Dict[str, Any]:
-    payload = service.fields_payload(step=step, voxels=voxels, z_step=z_step)
+async def fields(
+    step: int = 4,
+    voxels: bool = False,
+    z_step: int = 1,
+    encoding: str = "json",
+    bits: int = 8,
+    since: int | None = None,
+) -> Dict[str, Any]:
+    try:
+        payload = service.fields_payload(
+            step=step, voxels=voxels, z_step=z_step, encoding=encoding, bits=bits, since=since
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     if payload is None:
         return Response(status_code=204)
     return payload
@@ -231,36 +244,95 @@ async def set_ollama_model(payload: Dict[str, Any]) -> Dict[str, Any]:
 
 @app.websocket("/ws/stream")
 async def ws_stream(ws: WebSocket):
+    # ?format=binary streams frames as server.protocol binary messages
+    # (&positions=int16 quantizes positions); anything else keeps JSON text.
+    # ?delta=1 sends each new frame as a delta on the previous one or a
+    # keyframe; the client can send {"type": "resync"} to get a keyframe.
+    # Frames come from service.hub: one message per published frame, encoded
+    # once for all subscribers, and nothing while the simulation is paused.
+    # {"type": "subscribe", "rect": [...]} limits the stream to an area of
+    # interest (see server.interest).
+    binary = ws.query_params.get("format", "json").lower() == "binary"
+    quantize = ws.query_params.get("positions", "float32").lower() in ("int16", "uint16", "quantized")
+    deltas = ws.query_params.get("delta", "0").lower() in ("1", "true", "yes")
+    # ?fields=compact sends the initial field maps quantized and compressed.
+    field_encoding = ws.query_params.get("fields", "json").lower()
     await ws.accept()
+    wake = service.hub.subscribe()
+    resync = asyncio.Event()
+    moved = asyncio.Event()  # area of interest changed since the last send
+    view = View()
+
+    async def _receive() -> None:
+        try:
+            while True:
+                try:
+                    message = json.loads(await ws.receive_text())
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                if message.get("type") == "resync":
+                    resync.set()
+                    wake.set()
+                elif message.get("type") == "subscribe":
+                    try:
+                        area = AreaOfInterest.from_message(message)
+                    except (TypeError, ValueError):
+                        continue
+                    if area is None and view.area is not None:
+                        resync.set()  # the client holds only part of the world
+                    elif view.area is None:
+                        view.held = None
+                    view.area = area
+                    moved.set()
+                    wake.set()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            wake.set()
+
+    reader = asyncio.create_task(_receive())
+    seen = 0  # hub version last sent
+    sent_tick = None  # tick of the last frame sent in delta mode
     try:
         # Send initial terrain data immediately upon connection
-        fields = service.fields_payload(step=2)
+        fields = service.fields_payload(step=2, encoding=field_encoding)
         if fields:
             await ws.send_text(json.dumps({"type": "fields", "data": fields}, allow_nan=False))
         
         while True:
-            payload = service.frame_payload()
-            if payload is None:
-                await asyncio.sleep(0.1)
+            await wake.wait()
+            wake.clear()
+            if reader.done():
+                logger.info("Client disconnected")
+                return
+            if service.hub.version == seen and not resync.is_set() and not moved.is_set():
                 continue
             try:
-                # Wrap frame in type to distinguish from fields if needed, 
-                # but for now keeping compatible with current frontend unless we change it.
-                # Actually, checking frontend Renderer.ts, it expects just the payload?
-                # Let's check Renderer.ts first to be safe, but sending fields as a separate message
-                # might break it if it expects only one type. 
-                # WAIT: Renderer.ts usually fetches fields via HTTP or expects a specific WS format.
-                # Let's stick to just making sure the loop is stable first.
-                await ws.send_text(json.dumps(payload, allow_nan=False))
+                since = None
+                if deltas:
+                    since = -1 if sent_tick is None or resync.is_set() else sent_tick
+                    resync.clear()
+                moved.clear()
+                version, frame = service.hub.version, service.hub.frame
+                message = service.stream_message(binary, quantize=quantize, since=since, view=view)
+                if message is None:
+                    continue
+                if binary:
+                    await ws.send_bytes(message)
+                else:
+                    await ws.send_text(message)
+                seen, sent_tick = version, frame.tick
             except WebSocketDisconnect:
                 logger.info("Client disconnected")
                 return
             except Exception:
                 logger.exception("WebSocket frame serialization failed")
                 return
-            
-            # Rate limit to avoid flooding
-            await asyncio.sleep(max(0.033, service.tick_ms / 1000.0))
     except WebSocketDisconnect:
         logger.info("Client disconnected during init")
         return
+    finally:
+        service.hub.unsubscribe(wake)
+        reader.cancel()
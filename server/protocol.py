@@ -0,0 +1,289 @@
+"""Binary frame encoding for ``/ws/stream``.
+
+Clients that connect with ``?format=binary`` get each frame as one binary
+message instead of JSON. All values are little-endian.
+
+Header (32 bytes)::
+
+    magic    4s   b"AGFR"
+    version  u16  SCHEMA_VERSION
+    flags    u16  FLAG_QUANTIZED: positions are u16 (see below), else f32
+    tick     u32  simulation ticks since the server started (identifies the frame)
+    count    u32  entities in the frame
+    time     f64  world time
+    w, h, d  u16  world size
+    colors   u16  entries in the color table
+
+Color table, one entry per color code: ``u8`` length + UTF-8 color name, then
+``u8`` length + UTF-8 render kind. Zero bytes pad it to a multiple of 4.
+
+Columns, ``count`` values each, in this order::
+
+    id                                           u32
+    vx, vy, vz, mass, hardness, energy, wealth   f32
+    x, y, z                                      f32, or u16 when quantized
+    color                                        u16 (index into the table)
+
+Quantized positions map ``[0, w]`` (``h``, ``d`` for y, z) onto
+``0..65535``: ``x = q * w / 65535``. ``size`` is not sent; it is
+``3 + 0.6 * hardness``, as in the JSON frames.
+
+Delta frames (``FLAG_DELTA``) carry only the entities that spawned or changed
+since the frame ticked ``base``. Right after the header they add::
+
+    base     u32  tick of the frame this one applies to
+    removed  u32  number of despawned ids, followed by that many u32 ids
+
+``count`` and the columns then cover the changed entities only. A client that
+does not hold frame ``base`` must ask for a keyframe instead (see
+``/ws/stream``).
+
+``decode_frame`` is the reference decoder and returns the JSON frame shape.
+
+Field maps (``/api/fields?encoding=compact``) are sent per field as
+``pack_field`` dicts: the values quantized to ``uint8`` or ``uint16`` as
+``value = q * scale + offset``, zlib-compressed and base64-encoded. Integer
+maps (voxel layers) keep their exact values.
+"""
+from __future__ import annotations
+
+import base64
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"AGFR"
+SCHEMA_VERSION = 1
+FLAG_QUANTIZED = 1
+FLAG_DELTA = 2
+
+HEADER = struct.Struct("<4sHHIIdHHHH")
+QUANT_MAX = 65535
+
+FLOAT_COLUMNS = ("vx", "vy", "vz", "mass", "hardness", "energy", "wealth")
+POSITION_COLUMNS = ("x", "y", "z")
+
+# Smallest change of each column that puts an entity into a delta frame.
+DELTA_THRESHOLDS: Dict[str, float] = {
+    "x": 0.05, "y": 0.05, "z": 0.05,
+    "vx": 0.02, "vy": 0.02, "vz": 0.02,
+    "mass": 0.01, "hardness": 0.01, "energy": 0.01, "wealth": 0.01,
+}
+
+
+def _pad4(n: int) -> int:
+    return -n % 4
+
+
+@dataclass
+class FrameDelta:
+    """What changed in one frame relative to the tracker's baseline."""
+
+    keyframe: bool
+    base: int  # tick of the previous frame (-1 for a keyframe)
+    rows: np.ndarray  # positions in the frame columns to send
+    removed: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+
+class DeltaTracker:
+    """Per-entity baseline that delta frames are measured against.
+
+    The baseline is what a client holds after applying every frame so far:
+    an entity's values there only move when a frame carries it, so small
+    drifts never add up past the thresholds. A keyframe is due every
+    ``keyframe_ticks`` ticks and after ``reset()``.
+    """
+
+    def __init__(self, keyframe_ticks: int = 30, thresholds: Mapping[str, float] | None = None):
+        self.keyframe_ticks = max(1, int(keyframe_ticks))
+        self.thresholds = dict(DELTA_THRESHOLDS if thresholds is None else thresholds)
+        self.reset()
+
+    def reset(self) -> None:
+        self._ids = np.zeros(0, dtype=np.int64)  # sorted
+        self._cols: Dict[str, np.ndarray] = {}
+        self._tick: int | None = None
+        self._key_tick = 0
+
+    def update(self, columns: Mapping[str, np.ndarray], tick: int) -> FrameDelta:
+        """Diff a frame's columns against the baseline and advance it."""
+        ids = np.asarray(columns["id"], dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        names = [name for name in self.thresholds if name in columns] + ["color"]
+        current = {name: np.asarray(columns[name])[order] for name in names}
+        base = self._tick
+        self._tick = int(tick)
+        if base is None or tick - self._key_tick >= self.keyframe_ticks:
+            self._ids, self._cols, self._key_tick = sorted_ids, current, int(tick)
+            return FrameDelta(True, -1, np.arange(ids.size))
+
+        pos = np.minimum(np.searchsorted(self._ids, sorted_ids), max(self._ids.size - 1, 0))
+        known = self._ids[pos] == sorted_ids if self._ids.size else np.zeros(ids.size, dtype=bool)
+        changed = ~known
+        previous = {name: self._cols[name][pos] if self._ids.size else current[name] for name in names}
+        for name in names:
+            if name == "color":
+                changed |= known & (current[name] != previous[name])
+            else:
+                changed |= known & (np.abs(current[name] - previous[name]) > self.thresholds[name])
+        for name in names:
+            current[name] = np.where(changed, current[name], previous[name])
+        removed = self._ids[~np.isin(self._ids, sorted_ids)]
+        self._ids, self._cols = sorted_ids, current
+        return FrameDelta(False, base, np.sort(order[changed]), removed)
+
+
+def encode_frame(
+    columns: Dict[str, np.ndarray],
+    colors: Sequence[str],
+    kinds: Sequence[str],
+    tick: int,
+    t: float,
+    size: Tuple[int, int, int],
+    quantize: bool = False,
+    delta: FrameDelta | None = None,
+) -> bytes:
+    """Pack one frame. ``columns`` holds id, color and every float column.
+
+    With a ``delta`` only its rows are packed, as a delta frame unless it is
+    a keyframe (a keyframe of part of the world).
+    """
+    flags = FLAG_QUANTIZED if quantize else 0
+    extra = b""
+    if delta is not None:
+        columns = {name: np.asarray(col)[delta.rows] for name, col in columns.items()}
+    if delta is not None and not delta.keyframe:
+        flags |= FLAG_DELTA
+        removed = np.asarray(delta.removed, dtype="<u4")
+        extra = struct.pack("<II", int(delta.base) & 0xFFFFFFFF, removed.size) + removed.tobytes()
+    count = int(len(columns["id"]))
+    parts: List[bytes] = [
+        HEADER.pack(
+            MAGIC, SCHEMA_VERSION, flags,
+            int(tick) & 0xFFFFFFFF, count, float(t),
+            int(size[0]), int(size[1]), int(size[2]), len(colors),
+        ),
+        extra,
+    ]
+    table = bytearray()
+    for color, kind in zip(colors, kinds):
+        for text in (color, kind):
+            raw = text.encode("utf-8")[:255]
+            table.append(len(raw))
+            table += raw
+    table += b"\0" * _pad4(len(table))
+    parts.append(bytes(table))
+
+    parts.append(np.asarray(columns["id"], dtype="<u4").tobytes())
+    for name in FLOAT_COLUMNS:
+        parts.append(np.asarray(columns[name], dtype="<f4").tobytes())
+    for name, extent in zip(POSITION_COLUMNS, size):
+        values = np.asarray(columns[name], dtype=np.float64)
+        if quantize:
+            scaled = np.rint(np.clip(values / max(int(extent), 1), 0.0, 1.0) * QUANT_MAX)
+            parts.append(scaled.astype("<u2").tobytes())
+        else:
+            parts.append(values.astype("<f4").tobytes())
+    parts.append(np.asarray(columns["color"], dtype="<u2").tobytes())
+    return b"".join(parts)
+
+
+def decode_frame(data: bytes) -> Dict[str, Any]:
+    """Unpack a binary frame into the JSON frame shape (plus ``tick``).
+
+    Delta frames also get ``base`` and ``removed``, as in the JSON stream.
+    """
+    magic, version, flags, tick, count, t, w, h, d, ncolors = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not an Aethergrid frame")
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"unsupported frame schema version {version}")
+    offset = HEADER.size
+    delta: Dict[str, Any] = {}
+    if flags & FLAG_DELTA:
+        base, nremoved = struct.unpack_from("<II", data, offset)
+        removed = np.frombuffer(data, dtype="<u4", count=nremoved, offset=offset + 8)
+        delta = {"type": "delta", "base": base, "removed": removed.tolist()}
+        offset += 8 + removed.nbytes
+    table_start = offset
+    colors: List[str] = []
+    kinds: List[str] = []
+    for _ in range(ncolors):
+        for out in (colors, kinds):
+            n = data[offset]
+            out.append(data[offset + 1:offset + 1 + n].decode("utf-8"))
+            offset += 1 + n
+    offset += _pad4(offset - table_start)
+
+    def take(dtype: str) -> np.ndarray:
+        nonlocal offset
+        arr = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += arr.nbytes
+        return arr
+
+    cols: Dict[str, np.ndarray] = {"id": take("<u4")}
+    for name in FLOAT_COLUMNS:
+        cols[name] = take("<f4")
+    for name, extent in zip(POSITION_COLUMNS, (w, h, d)):
+        if flags & FLAG_QUANTIZED:
+            cols[name] = take("<u2") * (extent / QUANT_MAX)
+        else:
+            cols[name] = take("<f4")
+    codes = take("<u2")
+
+    lists = {name: arr.tolist() for name, arr in cols.items()}
+    entities = []
+    for k, code in enumerate(codes.tolist()):
+        ent = {name: lists[name][k] for name in ("id", "x", "y", "z", "vx", "vy", "vz", "mass", "hardness")}
+        ent["color"] = colors[code]
+        ent["kind"] = kinds[code]
+        ent["size"] = 3.0 + ent["hardness"] * 0.6
+        ent["energy"] = lists["energy"][k]
+        ent["wealth"] = lists["wealth"][k]
+        entities.append(ent)
+    return {**delta, "tick": tick, "t": t, "w": w, "h": h, "entities": entities}
+
+
+def pack_field(values: Any, bits: int = 8) -> Dict[str, Any]:
+    """Quantize, compress and base64-encode one field map.
+
+    Float maps use ``bits`` (8 or 16) spread over their own value range, so
+    the error is at most half a step, ``scale / 2``. Integer maps are stored
+    exactly, in 8 bits when their range fits and 16 otherwise.
+    """
+    arr = np.asarray(values)
+    lo = float(arr.min()) if arr.size else 0.0
+    if arr.dtype.kind in "iub":
+        span = float(arr.max()) - lo if arr.size else 0.0
+        if span > 0xFFFF:
+            raise ValueError("integer field range does not fit in 16 bits")
+        bits, scale = (8 if span <= 0xFF else 16), 1.0
+        q = arr.astype(np.int64) - int(lo)
+    else:
+        if bits not in (8, 16):
+            raise ValueError("bits must be 8 or 16")
+        arr = np.nan_to_num(arr.astype(np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        lo = float(arr.min()) if arr.size else 0.0
+        hi = float(arr.max()) if arr.size else 0.0
+        scale = (hi - lo) / ((1 << bits) - 1) if hi > lo else 1.0
+        q = np.rint((arr - lo) / scale)
+    dtype = "<u1" if bits == 8 else "<u2"
+    return {
+        "dtype": "uint8" if bits == 8 else "uint16",
+        "shape": list(arr.shape),
+        "offset": lo,
+        "scale": scale,
+        "data": base64.b64encode(zlib.compress(q.astype(dtype).tobytes(), 6)).decode("ascii"),
+    }
+
+
+def unpack_field(packed: Dict[str, Any]) -> np.ndarray:
+    """Reference decoder of ``pack_field``."""
+    dtype = "<u1" if packed["dtype"] == "uint8" else "<u2"
+    raw = zlib.decompress(base64.b64decode(packed["data"]))
+    q = np.frombuffer(raw, dtype=dtype).reshape(packed["shape"])
+    return q * packed["scale"] + packed["offset"]
@@ -4,21 +4,28 @@ import asyncio
 import json
 import logging
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 import math
 import base64
 import re
+import zlib
+
+import numpy as np
 
 from engine.backend import get_backend, disable_gpu
 from engine.compiler import compile_program
 from engine.safeexpr import eval_expr
 from engine.factory import seed_world
 from engine.kernel import Kernel
+from engine.spatial import CellList
 from engine.worldpack import load_worldpack_json, worldpack_to_dsl
 
 from .db import SessionLocal
+from .broadcast import FrameHub
+from .interest import View
+from .protocol import DeltaTracker, FrameDelta, encode_frame, pack_field
 from .models import Snapshot, Metric, Base
 from sqlalchemy import inspect
 
@@ -29,7 +36,60 @@ class Frame:
     t: float
     w: int
     h: int
-    entities: List[Dict[str, Any]]
+    # Entity dicts of the JSON payloads; built from `columns` on first use.
+    entities: List[Dict[str, Any]] | None
+    tick: int = 0
+    d: int = 1
+    # Column arrays (alive entities) and the color/kind tables behind the
+    # binary stream encoding; see server.protocol.
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    colors: List[str] = field(default_factory=list)
+    kinds: List[str] = field(default_factory=list)
+    delta: FrameDelta | None = None
+    cell_size: float = 32.0  # of the culling index; the kernel's grid cell size
+    _index: CellList | None = field(default=None, repr=False, compare=False)
+
+    def spatial_index(self) -> CellList:
+        """Cell list over the frame rows, built on first use."""
+        if self._index is None:
+            index = CellList(self.w, self.h, self.cell_size)
+            if self.columns:
+                x, y = self.columns["x"], self.columns["y"]
+                index.build(x, y, np.ones(len(x), dtype=bool))
+            self._index = index
+        return self._index
+
+    def entity_dicts(self, rows: np.ndarray | None = None) -> List[Dict[str, Any]]:
+        """Entities as JSON dicts, all of them or those at ``rows``."""
+        if rows is None and self.entities is not None:
+            return self.entities
+        if not self.columns:
+            return []
+        take = (lambda col: col) if rows is None else (lambda col: col[rows])
+        cols = {name: take(arr).tolist() for name, arr in self.columns.items()}
+        ents: List[Dict[str, Any]] = []
+        for k, ent_id in enumerate(cols["id"]):
+            hardness = cols["hardness"][k]
+            code = cols["color"][k]
+            ents.append({
+                "id": ent_id,
+                "x": cols["x"][k],
+                "y": cols["y"][k],
+                "z": cols["z"][k],
+                "vx": cols["vx"][k],
+                "vy": cols["vy"][k],
+                "vz": cols["vz"][k],
+                "mass": cols["mass"][k],
+                "hardness": hardness,
+                "color": self.colors[code],
+                "kind": self.kinds[code],
+                "size": 3.0 + hardness * 0.6,
+                "energy": cols["energy"][k],
+                "wealth": cols["wealth"][k],
+            })
+        if rows is None:
+            self.entities = ents
+        return ents
 
 
 class SimulationService:
@@ -39,6 +99,16 @@ class SimulationService:
         self.tick_ms = 33
         self.steps = 1
         self.last_frame: Frame | None = None
+        # Ticks run since startup; frames are identified by this, so it is not
+        # reset when a new program is applied.
+        self.ticks = 0
+        # Baseline of the delta frames sent to `/ws/stream?delta=1` clients.
+        self.deltas = DeltaTracker()
+        # Every produced frame is published here for the /ws/stream clients.
+        self.hub = FrameHub()
+        # Content checksums and versions of the field maps fields_payload sent.
+        self._field_versions: Dict[tuple, tuple[int, int]] = {}
+        self._field_serial = 0
         self._lock = asyncio.Lock()
         self._last_emit = 0.0
         self._persist_every = 1.5
@@ -205,7 +275,7 @@ class SimulationService:
                 W = int(const_values.get("W", 96))
                 H = int(const_values.get("H", 96))
                 world = seed_world(W, H, n=n, seed=seed, backend=backend, profiles=scaled_profiles)
-                kernel = Kernel(world, consts, prog.laws)
+                kernel = Kernel(world, consts, prog.laws, engine="scalar")
                 W, H = kernel.world.w, kernel.world.h
                 DT = kernel.world.dt
                 depth = int(const_values.get("D", const_values.get("DEPTH", 16)))
@@ -243,7 +313,7 @@ class SimulationService:
                     W = int(const_values.get("W", 96))
                     H = int(const_values.get("H", 96))
                     world = seed_world(W, H, n=n, seed=seed, backend=backend, profiles=scaled_profiles)
-                    kernel = Kernel(world, consts, prog.laws)
+                    kernel = Kernel(world, consts, prog.laws, engine="scalar")
                     W, H = kernel.world.w, kernel.world.h
                     DT = kernel.world.dt
                     depth = int(const_values.get("D", const_values.get("DEPTH", 16)))
@@ -269,8 +339,25 @@ class SimulationService:
                     kernel = Kernel(world, consts, prog.laws)
                 else:
                     raise
+            if self.kernel is not None:
+                # Stops the old program's parallel workers and frees its shared memory.
+                self.kernel.close()
             self.kernel = kernel
+            self._configure_deltas(kernel.consts)
+            # The new program's first frame must not share a tick with the
+            # old program's last one.
+            self.ticks += 1
             self.last_frame = self._make_frame()
+            self.hub.publish(self.last_frame)
+
+    def _configure_deltas(self, consts: Dict[str, Any]) -> None:
+        """Keyframe cadence and per-column thresholds from STREAM_* consts."""
+        thresholds = dict(self.deltas.thresholds)
+        for name in thresholds:
+            key = f"STREAM_DELTA_{name.upper()}"
+            if key in consts:
+                thresholds[name] = float(consts[key])
+        self.deltas = DeltaTracker(int(float(consts.get("STREAM_KEYFRAME", 30))), thresholds)
 
     def set_run(self, value: bool):
         self.running = value
@@ -344,6 +431,7 @@ class SimulationService:
         start = time.perf_counter()
         for _ in range(max(1, self.steps)):
             self.kernel.tick(observer_xy=None, observer_radius=55)
+            self.ticks += 1
         elapsed = (time.perf_counter() - start) * 1000.0
         frame = self._make_frame()
         return frame, elapsed
@@ -354,6 +442,7 @@ class SimulationService:
         async with self._lock:
             frame, elapsed = await asyncio.to_thread(self._step_sync)
             self.last_frame = frame
+            self.hub.publish(frame)
         await asyncio.to_thread(self._persist_sync, frame, elapsed)
 
     def _finite(self, value: Any, default: float = 0.0) -> float:
@@ -365,108 +454,190 @@ class SimulationService:
             return default
         return num
 
-    def _kind_from_color(self, color: str) -> str:
-        key = (color or "").strip().lower()
-        mapping = {
-            "human": "humanoid",
-            "settler": "humanoid",
-            "fae": "humanoid",
-            "tribe": "humanoid",
-            "pilot": "humanoid",
-            "animal": "animal",
-            "fauna": "animal",
-            "beast": "animal",
-            "raptor": "animal",
-            "alien": "alien",
-            "outsider": "alien",
-            "voidborn": "alien",
-            "building": "building",
-            "habitat": "building",
-            "obelisk": "building",
-            "station": "building",
-            "tree": "tree",
-            "grove": "tree",
-            "cycad": "tree",
-            "dino": "dino",
-            "saurian": "dino",
-            "wyrm": "dino",
-            "metal": "machine",
-            "gold": "machine",
-            "synth": "machine",
-        }
-        return mapping.get(key, "creature")
-
     def _make_frame(self) -> Frame:
         kernel = self.kernel
         if not kernel:
             return Frame(t=0.0, w=1, h=1, entities=[])
-        ents: List[Dict[str, Any]] = []
-        for e in kernel.world.entities:
-            if not e.alive:
-                continue
-            ents.append({
-                "id": int(e.id),
-                "x": self._finite(e.x),
-                "y": self._finite(e.y),
-                "z": self._finite(e.z),
-                "vx": self._finite(e.vx),
-                "vy": self._finite(e.vy),
-                "vz": self._finite(e.vz),
-                "mass": self._finite(e.mass),
-                "hardness": self._finite(e.hardness),
-                "color": str(e.color),
-                "kind": self._kind_from_color(str(e.color)),
-                "size": self._finite(3.0 + self._finite(e.hardness) * 0.6, 3.0),
-                "energy": self._finite(e.energy),
-                "wealth": self._finite(e.wealth),
-            })
+        table = kernel.world.entities
+        idx = table.alive_indices()
+        arrays = {
+            name: np.nan_to_num(table.column(name)[idx], nan=0.0, posinf=0.0, neginf=0.0)
+            for name in ("x", "y", "z", "vx", "vy", "vz", "mass", "hardness", "energy", "wealth")
+        }
+        arrays["id"] = table.column("id")[idx]
+        arrays["color"] = table.column("color")[idx]
+        species = kernel.world.species
+        kinds = [species.kinds[c] for c in species.kind_codes(table.colors).tolist()]
         return Frame(
             t=self._finite(kernel.world.time),
             w=int(kernel.world.w),
             h=int(kernel.world.h),
-            entities=ents,
+            entities=None,
+            tick=self.ticks,
+            d=int(kernel.world.d),
+            columns=arrays,
+            colors=list(table.colors),
+            kinds=kinds,
+            delta=self.deltas.update(arrays, self.ticks),
+            cell_size=float(kernel.grid_cell_size),
         )
 
-    def frame_payload(self) -> Dict[str, Any] | None:
+    @staticmethod
+    def _delta_since(frame: Frame, since: int | None) -> FrameDelta | None:
+        """The frame's delta if it applies on top of frame ``since``."""
+        delta = frame.delta
+        if since is None or delta is None or delta.keyframe or delta.base != since:
+            return None
+        return delta
+
+    def _select(self, frame: Frame, since: int | None, view: View | None) -> FrameDelta | None:
+        """What to send of ``frame``; None means the whole frame."""
+        if view is None or view.area is None:
+            return self._delta_since(frame, since)
+        return view.select(frame, self._delta_since(frame, since), since)
+
+    def frame_payload(self, since: int | None = None, view: View | None = None) -> Dict[str, Any] | None:
+        """The last frame as JSON.
+
+        With ``since`` (the tick of the frame the client holds) the payload is
+        typed: a ``delta`` with the spawned/changed entities and the despawned
+        ids when the frame follows that one, otherwise a full ``keyframe``.
+        A ``view`` with an area limits either to the entities inside it.
+        """
         frame = self.last_frame
         if frame is None:
             return None
-        return {
+        payload: Dict[str, Any] = {
             "t": self._finite(frame.t),
             "w": int(frame.w),
             "h": int(frame.h),
-            "entities": frame.entities,
         }
+        delta = self._select(frame, since, view)
+        rows = None if delta is None else delta.rows
+        if since is not None:
+            payload["tick"] = frame.tick
+            payload["type"] = "keyframe" if delta is None or delta.keyframe else "delta"
+        payload["entities"] = frame.entity_dicts(rows)
+        if delta is not None and not delta.keyframe:
+            payload["base"] = delta.base
+            payload["removed"] = delta.removed.tolist()
+        return payload
 
-    def fields_payload(self, step: int = 4, voxels: bool = False, z_step: int = 1) -> Dict[str, Any] | None:
+    def frame_bytes(self, quantize: bool = False, since: int | None = None, view: View | None = None) -> bytes | None:
+        """The last frame in the binary stream encoding (server.protocol).
+
+        ``since`` and ``view`` work as in ``frame_payload``.
+        """
+        frame = self.last_frame
+        if frame is None or not frame.columns:
+            return None
+        return encode_frame(
+            frame.columns,
+            frame.colors,
+            frame.kinds,
+            tick=frame.tick,
+            t=self._finite(frame.t),
+            size=(frame.w, frame.h, frame.d),
+            quantize=quantize,
+            delta=self._select(frame, since, view),
+        )
+
+    def stream_message(
+        self, binary: bool, quantize: bool = False, since: int | None = None, view: View | None = None
+    ) -> bytes | str | None:
+        """The published frame as one ``/ws/stream`` message.
+
+        Arguments as in ``frame_bytes``/``frame_payload``. Every encoding is
+        serialized once per frame and shared by all subscribers asking for
+        it; so are area-of-interest frames without deltas, per area. Deltas
+        of an area depend on what each client holds and are built per view.
+        """
+        frame = self.hub.frame
+        if frame is None or frame is not self.last_frame:
+            return None
+        encode = (lambda: self.frame_bytes(quantize, since, view)) if binary else (
+            lambda: json.dumps(self.frame_payload(since, view), allow_nan=False)
+        )
+        if view is not None and view.area is not None:
+            if since is not None:
+                return encode()
+            kind: Any = view.area
+        else:
+            kind = "full" if since is None else ("delta" if self._delta_since(frame, since) else "keyframe")
+        return self.hub.encoded(("binary", quantize, kind) if binary else ("json", kind), encode)
+
+    def fields_payload(
+        self,
+        step: int = 4,
+        voxels: bool = False,
+        z_step: int = 1,
+        encoding: str = "json",
+        bits: int = 8,
+        since: int | None = None,
+    ) -> Dict[str, Any] | None:
+        """Field maps, sampled every ``step`` cells.
+
+        ``encoding="compact"`` sends each map as a ``server.protocol.pack_field``
+        dict (``bits`` per float value) instead of nested lists. Every map has
+        a version under ``versions`` that changes with its content; with
+        ``since`` (the ``serial`` of an earlier payload with the same ``step``)
+        maps that did not change since are left out.
+        """
         kernel = self.kernel
         if not kernel:
             return None
         step = max(1, int(step))
         z_step = max(1, int(z_step))
+        compact = encoding == "compact"
         backend = kernel.world.backend
-        terrain = backend.asnumpy(kernel.world.terrain_field)[::step, ::step]
-        water = backend.asnumpy(kernel.world.water_field)[::step, ::step]
-        fertility = backend.asnumpy(kernel.world.fertility_field)[::step, ::step]
-        climate = backend.asnumpy(kernel.world.climate_field)[::step, ::step]
-        payload = {
+        surface_height, water_top = kernel.world.surface_maps()
+        maps: Dict[str, np.ndarray] = {
+            "terrain": backend.asnumpy(kernel.world.terrain_field)[::step, ::step],
+            "water": backend.asnumpy(kernel.world.water_field)[::step, ::step],
+            "fertility": backend.asnumpy(kernel.world.fertility_field)[::step, ::step],
+            "climate": backend.asnumpy(kernel.world.climate_field)[::step, ::step],
+            # Voxel layer indices of the top solid and top water voxel per column.
+            "surface_height": np.asarray(surface_height)[::step, ::step].astype(int),
+            "water_top": np.asarray(water_top)[::step, ::step].astype(int),
+        }
+        if voxels:
+            maps["voxels"] = backend.asnumpy(kernel.world.voxels())[::z_step, ::step, ::step].astype(int)
+        grid_h, grid_w = maps["terrain"].shape
+        versions = {name: self._field_version(name, step, z_step, arr) for name, arr in maps.items()}
+        payload: Dict[str, Any] = {
             "step": step,
             "w": int(kernel.world.w),
             "h": int(kernel.world.h),
             "d": int(kernel.world.d),
-            "grid_w": int(terrain.shape[1]),
-            "grid_h": int(terrain.shape[0]),
-            "terrain": terrain.astype(float).tolist(),
-            "water": water.astype(float).tolist(),
-            "fertility": fertility.astype(float).tolist(),
-            "climate": climate.astype(float).tolist(),
+            "grid_w": int(grid_w),
+            "grid_h": int(grid_h),
+            "serial": self._field_serial,
+            "versions": versions,
         }
+        if compact:
+            payload["encoding"] = "compact"
+        for name, arr in maps.items():
+            if since is not None and versions[name] <= since:
+                continue
+            if compact:
+                payload[name] = pack_field(arr, bits)
+            else:
+                payload[name] = arr.astype(int if arr.dtype.kind in "iub" else float).tolist()
         if voxels:
-            vox = backend.asnumpy(kernel.world.voxel_field)[::z_step, ::step, ::step]
-            payload["voxels"] = vox.astype(int).tolist()
             payload["voxel_step"] = {"x": step, "y": step, "z": z_step}
         return payload
 
+    def _field_version(self, name: str, step: int, z_step: int, arr: np.ndarray) -> int:
+        """Serial number of the last change seen in a sampled field map."""
+        crc = zlib.crc32(np.ascontiguousarray(arr).tobytes())
+        key = (name, step, z_step)
+        seen = self._field_versions.get(key)
+        if seen is not None and seen[0] == crc:
+            return seen[1]
+        self._field_serial += 1
+        self._field_versions[key] = (crc, self._field_serial)
+        return self._field_serial
+
     def apply_ai_actions(self, actions: List[Dict[str, Any]]) -> None:
         if not self.kernel or not actions:
             return
@@ -477,8 +648,8 @@ class SimulationService:
                 entity_id = int(action.get("entity_id", 0))
             except (TypeError, ValueError):
                 continue
-            entity = next((e for e in world.entities if e.id == entity_id and e.alive), None)
-            if not entity:
+            entity = world.entities.by_id(entity_id)
+            if entity is None or not entity.alive:
                 continue
             kind = str(action.get("action", "")).lower()
             payload = action.get("payload", {}) or {}
@@ -534,7 +705,7 @@ class SimulationService:
             "t": frame.t,
             "w": frame.w,
             "h": frame.h,
-            "entities": frame.entities,
+            "entities": frame.entity_dicts(),
         }, allow_nan=False)
         with SessionLocal() as session:
             session.add(Snapshot(t=frame.t, payload=payload))
@@ -62,6 +62,39 @@ class ActionCallTests(unittest.TestCase):
         kernel = Kernel(world, prog.consts, prog.laws)
         kernel.tick(observer_xy=(16, 16), observer_radius=10)
 
+    def test_calls_bind_at_compile_time(self):
+        src = "\n".join(
+            [
+                "law bound priority 1",
+                "  when true",
+                "  do drag(0.015)",
+                "  do emit_sound(0.35 * rand())",
+                "  do cohere(4 * 2, 0.05, color == \"red\")",
+                "  do clamp_speed()",
+                "end",
+            ]
+        )
+        drag, sound, cohere, clamp = compile_program(src).laws[0].actions
+        self.assertEqual(drag.argv, (0.015,))
+        self.assertEqual(drag.dynamic, ())
+        self.assertEqual(sound.dynamic, (0,))
+        self.assertEqual(cohere.argv[:2], (8.0, 0.05))
+        self.assertIs(cohere.argv[2], cohere.args[2])
+        self.assertEqual(cohere.dynamic, ())
+        self.assertEqual(clamp.argv, (None,))
+        self.assertIsNotNone(drag.handler)
+
+    def test_unknown_call_is_rejected(self):
+        src = "law bad priority 1\n  when true\n  do teleport(1, 2)\nend\n"
+        with self.assertRaises(ValueError):
+            compile_program(src)
+
+    def test_extra_call_arguments_are_rejected(self):
+        for call in ("drag(1, 2, 3, 4)", "emit_sound(1, 2, 3, 4, 5)", "cohere(1, 2, true, 4, 5)"):
+            src = f"law bad priority 1\n  when true\n  do {call}\nend\n"
+            with self.assertRaises(ValueError, msg=call):
+                compile_program(src)
+
 
 if __name__ == "__main__":
     unittest.main()
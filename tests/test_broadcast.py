@@ -0,0 +1,42 @@
+import asyncio
+
+from server.broadcast import FrameHub
+from server.protocol import decode_frame
+from tests.test_protocol import _service
+
+
+def test_hub_wakes_subscribers_only_on_publish():
+    async def run():
+        hub = FrameHub()
+        early = hub.subscribe()
+        assert not early.is_set()
+        hub.publish("frame-1")
+        late = hub.subscribe()
+        assert early.is_set() and late.is_set() and hub.version == 1
+        early.clear()
+        late.clear()
+        hub.unsubscribe(late)
+        hub.publish("frame-2")
+        assert early.is_set() and not late.is_set()
+        assert hub.subscribers == 1
+
+    asyncio.run(run())
+
+
+def test_each_encoding_is_serialized_once_per_frame():
+    service = _service()
+    service.hub.publish(service.last_frame)
+    messages = [service.stream_message(True, since=-1) for _ in range(5)]
+    assert all(m is messages[0] for m in messages)
+    assert service.stream_message(False) is service.stream_message(False)
+    assert service.hub.encodes == 2
+    assert decode_frame(messages[0])["tick"] == service.last_frame.tick
+
+    base = service.last_frame.tick
+    frame, _ = service._step_sync()
+    service.last_frame = frame
+    service.hub.publish(frame)
+    delta = service.stream_message(True, since=base)
+    assert decode_frame(delta)["type"] == "delta"
+    assert service.stream_message(True, since=-1) is not delta  # keyframe for a new viewer
+    assert service.hub.encodes == 4
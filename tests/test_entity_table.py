@@ -0,0 +1,69 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.factory import seed_world
+from engine.model import Entity, EntityTable, World
+
+
+def _entity(i, color="red", x=1.0):
+    return Entity(id=i, x=x, y=2.0, z=0.5, vx=0.1, vy=-0.1, vz=0.0, mass=1.0, hardness=0.8, color=color)
+
+
+def test_views_read_and_write_through_columns():
+    table = EntityTable([_entity(1), _entity(2, color="blue", x=5.0)])
+    assert len(table) == 2
+    e = table[1]
+    assert e.id == 2 and e.x == 5.0 and e.color == "blue"
+    e.x = 7.5
+    e.color = "gold"
+    assert table.column("x")[1] == 7.5
+    assert table.colors[table.column("color")[1]] == "gold"
+    assert [v.id for v in table] == [1, 2]
+
+
+def test_env_round_trip_matches_entity():
+    plain = _entity(3)
+    table = EntityTable([plain])
+    view = table[0]
+    assert view.as_env() == plain.as_env()
+    env = view.as_env()
+    env.update({"vx": 2.0, "alive": False, "color": "green"})
+    view.apply_env(env)
+    plain.apply_env(env)
+    assert view.to_entity() == plain
+
+
+def test_world_wraps_entity_lists_and_grows():
+    world = World(w=8, h=8, dt=1.0, entities=[_entity(1)], backend=get_backend(False))
+    assert isinstance(world.entities, EntityTable)
+    for i in range(2, 200):
+        world.entities.append(_entity(i))
+    assert len(world.entities) == 199
+    assert world.entities.by_id(150).id == 150
+    assert world.entities.by_id(999) is None
+
+
+def test_seeded_world_is_compact():
+    world = seed_world(32, 32, n=500, seed=3, backend=get_backend(False))
+    assert len(world.entities) == 500
+    assert world.entities.nbytes / len(world.entities) < 128
+
+
+def test_integration_water_rules_and_trail_deposits():
+    world = World(w=8, h=8, dt=1.0, entities=[], backend=get_backend(False))
+    world.gravity_z = 0.0
+    world.sea_level = 0.0
+    world.water_field[:, 4:] = 1.0  # deep water on the right half
+    world.entities.append(Entity(id=1, x=3.0, y=2.0, z=1.5, vx=1.0, vy=0.0, vz=0.0, mass=1.0, hardness=1.0, color="red"))
+    world.entities.append(Entity(id=2, x=1.0, y=5.0, z=1.5, vx=1.0, vy=0.0, vz=0.0, mass=1.0, hardness=1.0, color="reef_fish"))
+    world.entities.append(Entity(id=3, x=1.0, y=5.0, z=1.5, vx=0.0, vy=0.0, vz=0.0, mass=1.0, hardness=1.0, color="red"))
+    before = world.water_field.copy()
+    world.refresh_surface()
+    assert world.water_top[0, 5] == 2 and world.surface_height[0, 5] == 0
+    world._integrate_entities(1.0)
+    land, fish, idle = world.entities
+    assert (land.x, land.vx) == (3.0, -0.8)  # refused the deep water
+    assert fish.vx == 0.5 and abs(fish.x - 1.1) < 1e-12  # stranded fish crawls
+    assert (idle.x, idle.age) == (1.0, 1.0)
+    assert world.trail_field[5, 1] == np.float32(0.35) + np.float32(0.35)
+    assert (world.water_field == before).all()
@@ -0,0 +1,97 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.fields import FieldBatch, FieldStack, TiledField, boundary_mode, consume_policy
+from engine.model import Entity, World
+
+
+def _roll_step(f, decay):
+    f = f * decay
+    return (f + np.roll(f, 1, 0) + np.roll(f, -1, 0) + np.roll(f, 1, 1) + np.roll(f, -1, 1)) / 5.0
+
+
+def test_wrap_diffusion_matches_roll_reference():
+    rng = np.random.default_rng(0)
+    world = World(w=9, h=7, dt=1.0, backend=get_backend(False))
+    start = {name: rng.random((7, 9)).astype(np.float32) for name in ("sound_field", "food_field", "water_field")}
+    for name, value in start.items():
+        getattr(world, name)[...] = value
+    assert world.sound_field.base is world.diffusion.data
+
+    world.diffusion.step(world, "wrap")
+    for name, decay in (("sound_field", 0.92), ("food_field", 0.95), ("water_field", 0.985)):
+        np.testing.assert_allclose(getattr(world, name), _roll_step(start[name], decay), rtol=1e-5)
+
+
+def test_boundaries_and_rebound_fields():
+    backend = get_backend(False)
+    stack = FieldStack(backend, 6, 6, fields=(("a", 1.0), ("b", 1.0)))
+
+    class Holder:
+        pass
+
+    holder = Holder()
+    holder.a = np.ones((6, 6), dtype=np.float32)
+    holder.b = np.ones((6, 6), dtype=np.float32)
+    stack.bind(holder)
+    stack.step(holder, "clamp")
+    np.testing.assert_allclose(holder.a, 1.0)
+
+    holder.b = np.ones((6, 6), dtype=np.float32)  # no longer a stack view
+    stack.step(holder, "zero")
+    assert holder.a[0, 0] == np.float32(0.6) and holder.a[3, 3] == 1.0
+    np.testing.assert_allclose(holder.b, holder.a)
+    assert boundary_mode(1) == "clamp" and boundary_mode("Zero") == "zero"
+
+
+def test_slow_fields_decay_on_their_interval():
+    world = World(w=4, h=4, dt=1.0, backend=get_backend(False))
+    world.road_field[:] = 1.0
+    world.trail_field[:] = 1.0
+    world.schedule.set_interval("road_field", 3)
+    for _ in range(2):
+        world.schedule.step(world)
+    assert world.road_field[0, 0] == 1.0
+    world.schedule.step(world)
+    np.testing.assert_allclose(world.road_field, 0.995 ** 3, rtol=1e-6)
+    np.testing.assert_allclose(world.trail_field, 0.92 ** 3, rtol=1e-6)
+    assert world.schedule.rates["road_field"].const_name == "FIELD_INTERVAL_ROAD"
+    assert set(world.schedule.report()) >= {"diffusion", "road_field", "paradox_heat"}
+
+
+def test_tiled_fields_track_dense_storage():
+    dense = World(w=40, h=24, dt=1.0, backend=get_backend(False))
+    tiled = World(w=40, h=24, dt=1.0, backend=get_backend(False), sparse_fields=True)
+    road = tiled.road_field
+    assert isinstance(road, TiledField) and road.nbytes == 0
+    for world in (dense, tiled):
+        world.road_field[3, 37] += 0.5
+        world.road_field[20, 2] += 0.25
+        world.road_field[20, 2] = world.road_field[20, 2] - 0.1
+    assert len(road.tiles) == 2
+    np.testing.assert_array_equal(np.asarray(road), dense.road_field)
+    iy, ix = np.array([3, 20, 0]), np.array([37, 2, 0])
+    np.testing.assert_array_equal(road[iy, ix], dense.road_field[iy, ix])
+
+    road.eps = 0.2
+    tiled.schedule.step(tiled)
+    assert len(road.tiles) == 1 and road[20, 2] == 0.0
+    tiled.set_sparse_fields(False)
+    assert isinstance(tiled.road_field, np.ndarray) and tiled.road_field[3, 37] == np.float32(0.5) * np.float32(0.995)
+
+
+def test_field_batch_resolves_shared_draws():
+    for policy, expect in (("proportional", [0.1875, 0.5625, 0.5]), ("ordered", [0.25, 0.5, 0.5])):
+        world = World(w=4, h=4, dt=1.0, entities=[], backend=get_backend(False))
+        for i in range(3):
+            world.entities.append(Entity(id=i, x=0, y=0, z=0, vx=0, vy=0, vz=0, mass=1, hardness=1, color="red", energy=0.0))
+        world.food_field[1, 2] = 0.5
+        batch = FieldBatch(policy)
+        batch.deposit("food_field", 1, 2, 0.25)
+        batch.consume("food_field", np.array([1, 0]), np.array([1, 1]), np.array([2, 2]), np.array([0.75, 0.25]), 1.0)
+        batch.consume("food_field", 2, 3, 3, 0.5, 1.0)
+        world.food_field[3, 3] = 1.0
+        batch.apply(world)
+        np.testing.assert_allclose(world.entities.column("energy"), expect)
+        assert world.food_field[1, 2] == 0.0 and world.food_field[3, 3] == 0.5
+    assert consume_policy(1) == "ordered"
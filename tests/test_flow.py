@@ -0,0 +1,70 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.flow import FlowFields, flow_method
+from engine.model import World
+
+
+def test_distance_flow_routes_across_plateau_around_water():
+    world = World(w=12, h=5, dt=1.0, backend=get_backend(False))
+    world.terrain_field[...] = 1.0
+    world.terrain_field[0:4, 6] = 0.0  # water wall open only on the bottom row
+    world.home_field[2, 10] = 1.0
+    flows = FlowFields(["home_field"], method="distance", radius=32)
+    flows.update(world)
+
+    # Walk from the far side of the wall, where the field is flat zero.
+    y, x = 2, 1
+    for _ in range(30):
+        dx, dy = flows.step_at("home_field", y, x)
+        if not (dx or dy):
+            break
+        y, x = y + int(dy), x + int(dx)
+        assert world.terrain_field[y, x] == 1.0
+    assert (y, x) == (2, 10)
+
+    gradient = FlowFields(["home_field"])
+    gradient.update(world)
+    assert gradient.step_at("home_field", 2, 1) == (0, 0)
+    assert gradient.step_at("home_field", 1, 9) == (1, 1)
+    assert flow_method(1) == "distance"
+
+
+def test_distance_flow_does_not_cut_between_water_corners():
+    world = World(w=5, h=5, dt=1.0, backend=get_backend(False))
+    world.terrain_field[...] = 1.0
+    world.terrain_field[1, 2] = world.terrain_field[2, 1] = 0.0
+    world.home_field[1, 1] = 1.0
+    flows = FlowFields(["home_field"], method="distance")
+    flows.update(world)
+    assert flows.step_at("home_field", 2, 2) != (-1, -1)
+
+    y, x = 2, 2
+    for _ in range(10):
+        dx, dy = flows.step_at("home_field", y, x)
+        if not (dx or dy):
+            break
+        if dx and dy:
+            assert world.terrain_field[y + dy, x] == 1.0 and world.terrain_field[y, x + dx] == 1.0
+        y, x = y + int(dy), x + int(dx)
+    assert (y, x) == (1, 1)
+
+
+def test_band_rebuild_padded_by_halo_matches_full_grid():
+    world = World(w=16, h=40, dt=1.0, backend=get_backend(False))
+    world.terrain_field[...] = 1.0
+    world.home_field[3, 8] = 1.0  # above the band, within the radius
+    full = FlowFields(["home_field"], method="distance", radius=12)
+    full.update(world)
+
+    lo, hi = 10, 20
+    band = FlowFields(["home_field"], method="distance", radius=12)
+    pad = band.halo_rows
+    band.update(world, rows=(max(0, lo - pad), min(world.h, hi + pad)))
+    np.testing.assert_array_equal(band.fields["home_field"].dx[lo:hi], full.fields["home_field"].dx[lo:hi])
+    np.testing.assert_array_equal(band.fields["home_field"].dy[lo:hi], full.fields["home_field"].dy[lo:hi])
+    assert full.step_at("home_field", lo, 8) == (0, -1)
+
+    unpadded = FlowFields(["home_field"], method="distance", radius=12)
+    unpadded.update(world, rows=(lo - 1, hi + 1))
+    assert unpadded.step_at("home_field", lo, 8) == (0, 0)
@@ -0,0 +1,53 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.hydrology import hydrology_mode
+from engine.model import World
+
+
+def _roll_flow(t, w, rate=0.04):
+    neighbors = np.stack([np.roll(t, 1, 0), np.roll(t, -1, 0), np.roll(t, 1, 1), np.roll(t, -1, 1)])
+    lowest = np.argmin(neighbors, axis=0)
+    mask = neighbors.min(axis=0) < t
+    flow = w * rate
+    w = w - flow * mask
+    for k, (shift, axis) in enumerate(((-1, 0), (1, 0), (-1, 1), (1, 1))):
+        w = w + np.roll(flow * ((lowest == k) & mask), shift, axis)
+    return w
+
+
+def _world(seed=0):
+    rng = np.random.default_rng(seed)
+    world = World(w=11, h=9, dt=1.0, backend=get_backend(False))
+    world.terrain_field[...] = rng.random((9, 11)).astype(np.float32)
+    world.water_field[...] = rng.random((9, 11)).astype(np.float32)
+    return world
+
+
+def test_steepest_flow_matches_roll_reference():
+    world = _world()
+    expect = world.water_field.copy()
+    for _ in range(5):
+        expect = _roll_flow(world.terrain_field, expect)
+        world.hydrology.step(world)
+    np.testing.assert_allclose(world.water_field, expect, rtol=1e-5)
+    assert world.hydrology.report()["route_builds"] == 1
+
+
+def test_split_flow_conserves_water_and_reroutes():
+    world = _world(1)
+    world.hydrology.set_mode("split")
+    start = float(world.water_field.sum(dtype=np.float64))
+    for _ in range(20):
+        world.hydrology.step(world)
+    assert abs(float(world.water_field.sum(dtype=np.float64)) - start) < 1e-4
+    stats = world.hydrology.report()
+    assert stats["moved_last"] > 0 and stats["draining_cells"] > 0
+
+    world.terrain_field[...] = 0.0
+    world.terrain_changed()
+    before = world.water_field.copy()
+    world.hydrology.step(world)
+    np.testing.assert_array_equal(world.water_field, before)
+    assert world.hydrology.report()["route_builds"] == 2
+    assert hydrology_mode(1) == "split"
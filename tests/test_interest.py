@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from server.interest import AOI_MARGIN, AreaOfInterest, View
+from server.protocol import FrameDelta, decode_frame
+from server.sim_service import Frame
+from tests.test_protocol import _columns, _service
+
+
+def _frame(ids, x, tick):
+    cols = _columns(ids, x)
+    cols["y"][:] = 10.0
+    return Frame(t=0.0, w=100, h=20, entities=None, tick=tick, columns=cols, colors=["a"], kinds=["blob"], cell_size=16.0)
+
+
+def test_area_parses_rect_and_radius():
+    area = AreaOfInterest.from_message({"type": "subscribe", "rect": [30, 20, 10, 5], "zoom": 2})
+    assert (area.x0, area.y0, area.x1, area.y1, area.zoom) == (10, 5, 30, 20, 2)
+    assert area.bounds() == (10 - AOI_MARGIN / 2, 5 - AOI_MARGIN / 2, 30 + AOI_MARGIN / 2, 20 + AOI_MARGIN / 2)
+    area = AreaOfInterest.from_message({"center": [50, 50], "radius": 5})
+    assert (area.x0, area.y1) == (45, 55)
+    assert AreaOfInterest.from_message({"type": "subscribe"}) is None
+    with pytest.raises(ValueError):
+        AreaOfInterest.from_message({"rect": [0, 0, float("nan"), 1]})
+
+
+def test_view_sends_entering_and_drops_leaving_entities():
+    view = View(AreaOfInterest(0, 0, 20, 20, zoom=AOI_MARGIN))  # margin of one cell
+    first = view.select(_frame([1, 2, 3], [5.0, 15.0, 60.0], tick=1), None, since=-1)
+    assert first.keyframe and first.rows.tolist() == [0, 1]
+
+    # Entity 2 walks out, 3 walks in (both changed world-wide); 1 did not change.
+    frame = _frame([1, 2, 3], [5.0, 40.0, 18.0], tick=2)
+    world = FrameDelta(False, 1, np.array([1, 2]))
+    step = view.select(frame, world, since=1)
+    assert not step.keyframe and step.base == 1
+    assert step.rows.tolist() == [2] and step.removed.tolist() == [2]
+
+    # The camera pans over entity 2 on the same frame: only adds and drops.
+    view.area = AreaOfInterest(30, 0, 50, 20, zoom=AOI_MARGIN)
+    pan = view.select(frame, None, since=2)
+    assert not pan.keyframe and pan.base == 2
+    assert pan.rows.tolist() == [1] and pan.removed.tolist() == [1, 3]
+
+    # A client that lost track gets a keyframe of its area.
+    assert view.select(_frame([1, 2, 3], [5.0, 40.0, 18.0], tick=3), None, since=1).keyframe
+
+
+def test_service_streams_only_the_subscribed_area():
+    service = _service()
+    service.hub.publish(service.last_frame)
+    cols = service.last_frame.columns
+    view = View(AreaOfInterest(0, 0, 15, 15))
+    left, top, right, bottom = view.area.bounds()
+    inside = (cols["x"] >= left) & (cols["x"] <= right) & (cols["y"] >= top) & (cols["y"] <= bottom)
+    assert 0 < inside.sum() < len(inside)
+
+    payload = json.loads(service.stream_message(False, view=view))
+    assert sorted(e["id"] for e in payload["entities"]) == sorted(cols["id"][inside].tolist())
+    frame = decode_frame(service.stream_message(True, since=-1, view=view))
+    assert "type" not in frame and len(frame["entities"]) == int(inside.sum())
+    # Same area without deltas: shared between viewers.
+    assert service.stream_message(False, view=View(view.area)) == service.stream_message(False, view=view)
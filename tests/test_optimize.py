@@ -0,0 +1,84 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+
+
+SRC = "\n".join(
+    [
+        "const W = 48",
+        "const H = 48",
+        "const G = 0.1",
+        "const STORMS = 0",
+        "const DRIFT = 0.25",
+        "law gravity priority 10",
+        "  when true and DRIFT > 0",
+        "  do vy += G * 2; seek(W/2, H/2, DRIFT * 0.1)",
+        "end",
+        "law storm priority 9",
+        "  when STORMS > 0 and energy > 0.5",
+        "  do gust(1.0)",
+        "end",
+        "law tired priority 8",
+        "  when energy < DRIFT",
+        "  do vx *= 1 - DRIFT; wander(rand() * DRIFT)",
+        "end",
+    ]
+)
+
+
+def _kernel(src, n=30):
+    prog = compile_program(src)
+    world = seed_world(48, 48, n=n, seed=3, backend=get_backend(False))
+    return Kernel(world, prog.consts, prog.laws)
+
+
+def test_consts_are_inlined_and_folded():
+    kernel = _kernel(SRC)
+    laws = {law.name: law for law in kernel.laws}
+    assert "storm" not in laws
+    assert kernel.optimized.dropped == ["storm"]
+    gravity = laws["gravity"]
+    assert gravity.always
+    assert gravity.actions[0].expr.src == "0.2"
+    assert gravity.actions[1].argv == (24.0, 24.0, 0.025)
+    assert not gravity.actions[1].dynamic
+    tired = laws["tired"]
+    assert not tired.always
+    assert tired.when.src == "energy < 0.25"
+    assert tired.actions[1].dynamic == (0,)
+
+    dump = kernel.dump_program()
+    assert "when always" in dump
+    assert "seek(24.0, 24.0, 0.025)" in dump
+    assert "dropped (when is constant false): storm" in dump
+
+
+def test_optimized_program_matches_unoptimized():
+    fast = _kernel(SRC)
+    slow = _kernel(SRC + "\nconst OPTIMIZE = 0")
+    assert slow.optimized is None and len(slow.laws) == 3
+    for _ in range(10):
+        fast.tick()
+        slow.tick()
+    for name in ("x", "y", "vx", "vy", "energy"):
+        np.testing.assert_array_equal(
+            fast.world.entities.column(name), slow.world.entities.column(name)
+        )
+
+
+def test_assigned_and_shadowed_consts_stay_symbolic():
+    src = "\n".join(
+        [
+            "const LIMIT = 2",
+            "const energy = 9",
+            "law a priority 1",
+            "  when energy > LIMIT",
+            "  do LIMIT = LIMIT + 1",
+            "end",
+        ]
+    )
+    law = _kernel(src).laws[0]
+    assert law.when.src == "energy > LIMIT"
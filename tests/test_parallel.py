@@ -0,0 +1,142 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+
+SRC = """const W = 160
+const H = 120
+const MAX_SPEED = 1.5
+law flock priority 2
+  when true
+  do cohere(8, 0.02); separate(8, 0.1, color != "gray"); collide(3, 0.8, 0.06)
+end
+law eat priority 1
+  when energy < 1.5
+  do consume_food(0.05, 1.0); emit_road(0.02); clamp_speed(1.5)
+end
+"""
+
+
+def _run(engine, workers=None, ticks=3):
+    prog = compile_program(SRC)
+    world = seed_world(160, 120, n=120, seed=3, backend=get_backend(False))
+    kernel = Kernel(world, prog.consts, prog.laws, engine=engine, workers=workers)
+    try:
+        for _ in range(ticks):
+            kernel.tick()
+    finally:
+        kernel.close()
+    return world
+
+
+def test_parallel_engine_matches_scalar():
+    a = _run("scalar")
+    b = _run("parallel", workers=2)
+    for name in ("x", "y", "vx", "vy", "energy"):
+        np.testing.assert_allclose(
+            b.entities.column(name), a.entities.column(name), atol=1e-6, err_msg=name
+        )
+    np.testing.assert_allclose(b.food_field, a.food_field, atol=1e-6)
+    np.testing.assert_allclose(b.road_field, a.road_field, atol=1e-6)
+
+
+def test_parallel_const_selects_engine():
+    prog = compile_program(SRC.replace("const MAX_SPEED", "const PARALLEL = 1\nconst MAX_SPEED"))
+    world = seed_world(160, 120, n=20, seed=1, backend=get_backend(False))
+    kernel = Kernel(world, prog.consts, prog.laws)
+    try:
+        assert kernel.cfg.engine == "parallel"
+        kernel.tick()
+    finally:
+        kernel.close()
+
+
+HOP_SRC = """const W = 160
+const H = 120
+law hop priority 2
+  when true
+  do y += 37; wrap(0); emit_road(0.5); emit_farm(0.25)
+end
+law eat priority 1
+  when true
+  do consume_food(0.01, 1.0)
+end
+"""
+
+
+def test_deposits_across_strip_edges_are_merged():
+    def run(engine, workers=None):
+        prog = compile_program(HOP_SRC)
+        world = seed_world(160, 120, n=150, seed=5, backend=get_backend(False))
+        world.food_field[...] = 1.0
+        kernel = Kernel(world, prog.consts, prog.laws, engine=engine, workers=workers)
+        try:
+            for _ in range(3):
+                kernel.tick()
+        finally:
+            kernel.close()
+        return world
+
+    a = run("scalar")
+    b = run("parallel", workers=3)
+    assert a.road_field.sum() > 0
+    for name in ("road_field", "farm_field", "food_field"):
+        np.testing.assert_allclose(getattr(b, name), getattr(a, name), atol=1e-5, err_msg=name)
+    np.testing.assert_allclose(b.entities.column("energy"), a.entities.column("energy"), atol=1e-6)
+
+
+def test_reloading_a_parallel_program_releases_workers():
+    import asyncio
+    import multiprocessing as mp
+
+    from engine import parallel
+    from server.sim_service import SimulationService
+
+    service = SimulationService()
+    src = SRC.replace("const MAX_SPEED", "const PARALLEL = 2\nconst MAX_SPEED")
+    detached = len(parallel._DETACHED)
+    for _ in range(3):
+        asyncio.run(service.apply_program(src, None, seed=1, n=30, backend_name="cpu"))
+        assert service.kernel.cfg.engine == "parallel"
+        assert len(mp.active_children()) == 2
+    service.kernel.close()
+    assert not mp.active_children()
+    assert len(parallel._DETACHED) == detached
+
+
+def test_parallel_substeps_keep_hydrology_routes():
+    world = _run("parallel", workers=2, ticks=6)
+    assert world.hydrology.report()["route_builds"] == 1
+
+
+def test_parallel_distance_flow_matches_scalar():
+    src = """const W = 160
+const H = 120
+const FLOW_FIELDS = 1
+const FLOW_METHOD = 1
+const FLOW_RADIUS = 24
+law home priority 1
+  when true
+  do seek_home(0.3); clamp_speed(1.0)
+end
+"""
+
+    def run(engine, workers=None):
+        prog = compile_program(src)
+        world = seed_world(160, 120, n=120, seed=4, backend=get_backend(False))
+        world.home_field[...] = 0.0
+        world.home_field[10::30, 15::40] = 1.0
+        kernel = Kernel(world, prog.consts, prog.laws, engine=engine, workers=workers)
+        try:
+            for _ in range(4):
+                kernel.tick()
+        finally:
+            kernel.close()
+        return world
+
+    a = run("scalar")
+    b = run("parallel", workers=3)
+    for name in ("x", "y", "vx", "vy"):
+        np.testing.assert_allclose(b.entities.column(name), a.entities.column(name), atol=1e-6, err_msg=name)
@@ -0,0 +1,145 @@
+import json
+
+import numpy as np
+import pytest
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+from server.protocol import HEADER, DeltaTracker, decode_frame, encode_frame, pack_field, unpack_field
+from server.sim_service import SimulationService
+
+
+def _service():
+    service = SimulationService()
+    prog = compile_program("law drift priority 1\n  when true\n  do vx += 0.1\nend")
+    world = seed_world(40, 30, n=25, seed=2, backend=get_backend(False))
+    world.entities[3].color = "settler"
+    service.kernel = Kernel(world, prog.consts, prog.laws)
+    service._step_sync()
+    service.last_frame = service._make_frame()
+    return service
+
+
+def test_binary_frame_round_trips_json_frame():
+    service = _service()
+    expected = service.frame_payload()
+    data = service.frame_bytes()
+    decoded = decode_frame(data)
+    assert decoded["tick"] == 1 and decoded["w"] == 40 and decoded["h"] == 30
+    assert len(data) < len(json.dumps(expected)) / 4
+    for got, want in zip(decoded["entities"], expected["entities"]):
+        assert got["id"] == want["id"] and got["color"] == want["color"] and got["kind"] == want["kind"]
+        for key in ("x", "y", "z", "vx", "energy", "size"):
+            assert got[key] == pytest.approx(want[key], rel=1e-6, abs=1e-6)
+    assert decoded["entities"][3]["kind"] == "humanoid"
+
+
+def test_quantized_positions_stay_within_a_step():
+    service = _service()
+    exact = decode_frame(service.frame_bytes())["entities"]
+    packed = service.frame_bytes(quantize=True)
+    assert len(packed) < len(service.frame_bytes())
+    for got, want in zip(decode_frame(packed)["entities"], exact):
+        assert abs(got["x"] - want["x"]) <= 40 / 65535
+        assert abs(got["y"] - want["y"]) <= 30 / 65535
+    assert HEADER.size == 32
+
+
+def _columns(ids, x, color=None):
+    n = len(ids)
+    cols = {name: np.zeros(n, dtype=np.float32) for name in ("y", "z", "vx", "vy", "vz", "mass", "hardness", "energy", "wealth")}
+    cols["id"] = np.asarray(ids, dtype=np.int64)
+    cols["x"] = np.asarray(x, dtype=np.float32)
+    cols["color"] = np.asarray(color if color is not None else [0] * n, dtype=np.int32)
+    return cols
+
+
+def test_delta_tracker_sends_spawns_changes_and_despawns():
+    tracker = DeltaTracker(keyframe_ticks=10)
+    first = tracker.update(_columns([1, 2, 3], [1.0, 2.0, 3.0]), tick=1)
+    assert first.keyframe and first.rows.tolist() == [0, 1, 2]
+
+    # Entity 1 drifts below the threshold each frame; the drift is measured
+    # against what was last sent, so it is sent once it adds up.
+    delta = tracker.update(_columns([1, 2, 3], [1.03, 2.0, 3.0]), tick=2)
+    assert not delta.keyframe and delta.base == 1 and delta.rows.size == 0
+    delta = tracker.update(_columns([1, 2, 3], [1.06, 2.0, 3.0], color=[0, 1, 0]), tick=3)
+    assert delta.rows.tolist() == [0, 1]
+
+    delta = tracker.update(_columns([4, 1, 3], [4.0, 1.06, 3.0]), tick=4)
+    assert delta.rows.tolist() == [0] and delta.removed.tolist() == [2]
+    assert tracker.update(_columns([4, 1, 3], [4.0, 1.06, 3.0]), tick=11).keyframe
+
+
+def test_binary_delta_frame_round_trips():
+    cols = _columns([5, 6, 7], [1.0, 2.0, 3.0])
+    tracker = DeltaTracker()
+    tracker.update(cols, tick=1)
+    cols = _columns([5, 7, 8], [1.0, 3.5, 0.5])
+    delta = tracker.update(cols, tick=2)
+    data = encode_frame(cols, ["a"], ["blob"], tick=2, t=0.5, size=(10, 10, 4), delta=delta)
+    frame = decode_frame(data)
+    assert frame["type"] == "delta" and frame["base"] == 1 and frame["removed"] == [6]
+    assert [(e["id"], e["x"]) for e in frame["entities"]] == [(7, 3.5), (8, 0.5)]
+
+
+def test_static_world_streams_small_deltas():
+    service = SimulationService()
+    prog = compile_program("law idle priority 1\n  when false\n  do vx += 0.1\nend")
+    world = seed_world(40, 30, n=60, seed=3, backend=get_backend(False))
+    for ent in world.entities:
+        ent.vx = ent.vy = ent.vz = 0.0
+    service.kernel = Kernel(world, prog.consts, prog.laws)
+    for _ in range(20):  # let entities settle onto the terrain
+        service.last_frame, _ = service._step_sync()
+    service.deltas.reset()
+    service.last_frame = service._make_frame()
+    keyframe = service.frame_payload(since=-1)
+    assert keyframe["type"] == "keyframe" and len(keyframe["entities"]) == 60
+
+    world.entities[4].x += 1.0
+    service.last_frame, _ = service._step_sync()
+    delta = service.frame_payload(since=keyframe["tick"])
+    assert delta["type"] == "delta" and delta["base"] == keyframe["tick"]
+    assert [e["id"] for e in delta["entities"]] == [world.entities[4].id]
+    assert len(json.dumps(delta)) < len(json.dumps(keyframe)) / 10
+    # A client that missed a frame gets a keyframe instead.
+    assert service.frame_payload(since=keyframe["tick"] - 1)["type"] == "keyframe"
+    # Without `since` the payload keeps the untyped full-frame shape.
+    plain = service.frame_payload()
+    assert set(plain) == {"t", "w", "h", "entities"} and len(plain["entities"]) == 60
+
+
+def test_pack_field_bounds_quantization_error():
+    rng = np.random.default_rng(4)
+    values = rng.uniform(-2.0, 3.0, (22, 32)).astype(np.float32)
+    for bits in (8, 16):
+        packed = pack_field(values, bits)
+        assert packed["dtype"] == f"uint{bits}" and packed["shape"] == [22, 32]
+        assert np.abs(unpack_field(packed) - values).max() <= packed["scale"] / 2 + 1e-6
+    layers = np.array([[-1, 0, 5], [12, 300, 7]])
+    packed = pack_field(layers)
+    assert packed["dtype"] == "uint16" and np.array_equal(unpack_field(packed), layers)
+    assert np.array_equal(unpack_field(pack_field(np.full((3, 3), 4.5))), np.full((3, 3), 4.5))
+
+
+def test_compact_fields_are_small_and_skip_unchanged_maps():
+    service = SimulationService()
+    prog = compile_program("law idle priority 1\n  when false\n  do vx += 0.1\nend")
+    world = seed_world(320, 220, n=10, seed=1, backend=get_backend(False))
+    service.kernel = Kernel(world, prog.consts, prog.laws)
+    full = service.fields_payload(step=2)
+    compact = service.fields_payload(step=2, encoding="compact")
+    assert len(json.dumps(compact)) < len(json.dumps(full)) / 8
+    terrain = unpack_field(compact["terrain"])
+    assert np.abs(terrain - np.asarray(full["terrain"])).max() <= compact["terrain"]["scale"] / 2 + 1e-6
+    assert np.array_equal(unpack_field(compact["surface_height"]), np.asarray(full["surface_height"]))
+
+    world.water_field[5:9, 5:9] += 1.0
+    later = service.fields_payload(step=2, encoding="compact", since=compact["serial"])
+    assert {"water"} == {k for k in ("terrain", "water", "fertility", "climate", "surface_height", "water_top") if k in later}
+    assert later["versions"]["terrain"] == compact["versions"]["terrain"]
+    assert later["versions"]["water"] > compact["serial"]
+
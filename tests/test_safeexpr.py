@@ -0,0 +1,40 @@
+import pytest
+
+from engine.safeexpr import _SAFE_IMPL, compile_expr, eval_expr
+
+
+ENV = {"x": 2.5, "y": -1.0, "color": "red", "energy": 0.4, "W": 64, "true": True, "false": False}
+
+EXPRESSIONS = [
+    "x + y * 2",
+    "clamp(x, 0, 1) + lerp(0, 10, 0.25)",
+    "color == \"red\" and energy < 0.5",
+    "not (x > 1) or y < 0",
+    "max(x, y, W / 2) - abs(y) ** 2",
+    "0 < x < W",
+    "sqrt(x) + sin(y) + round(x)",
+    "true",
+]
+
+
+@pytest.mark.parametrize("src", EXPRESSIONS)
+def test_closure_matches_eval(src):
+    compiled = compile_expr(src)
+    assert compiled.fn is not None
+    reference = eval(compiled.code, {"__builtins__": {}}, dict(_SAFE_IMPL, **ENV))
+    assert eval_expr(compiled, ENV) == reference
+    assert eval_expr(compile_expr(src, closure=False), ENV) == reference
+
+
+def test_closure_exposes_slots_and_reports_missing_names():
+    compiled = compile_expr("max(x, energy) + W")
+    assert compiled.names == ("x", "energy", "W")
+    with pytest.raises(NameError):
+        eval_expr(compiled, {"x": 1.0})
+
+
+def test_validation_still_rejects_unsafe_code():
+    with pytest.raises(ValueError):
+        compile_expr("__import__('os')")
+    with pytest.raises(ValueError):
+        compile_expr("x.attr")
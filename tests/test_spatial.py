@@ -0,0 +1,78 @@
+import numpy as np
+
+from engine.compiler import compile_program
+from engine.spatial import DEFAULT_CELL_SIZE, CellList, auto_cell_size
+
+
+def test_cell_list_query_covers_every_entity_in_radius():
+    rng = np.random.default_rng(5)
+    n = 400
+    # Some entities sit outside the world and must still be found.
+    x = rng.uniform(-20, 140, n)
+    y = rng.uniform(-20, 100, n)
+    alive = rng.random(n) > 0.1
+    cells = CellList(120, 80, 9.0)
+    cells.build(x, y, alive)
+    assert len(cells.order) == int(alive.sum())
+    assert np.all(np.diff(cells.starts) >= 0)
+    for qx, qy, r in [(0.0, 0.0, 9.0), (60.5, 40.2, 14.0), (130.0, 95.0, 25.0), (-10.0, 50.0, 5.0)]:
+        got = set(cells.query(qx, qy, r).tolist())
+        want = set(np.flatnonzero(alive & ((x - qx) ** 2 + (y - qy) ** 2 <= r * r)).tolist())
+        assert want <= got
+        assert all(alive[i] for i in got)
+
+
+
+def test_cell_list_window_covers_every_entity_in_rectangle():
+    rng = np.random.default_rng(6)
+    x = rng.uniform(-10, 130, 300)
+    y = rng.uniform(-10, 90, 300)
+    cells = CellList(120, 80, 16.0)
+    cells.build(x, y, np.ones(300, dtype=bool))
+    for left, top, right, bottom in [(10.0, 5.0, 40.0, 20.0), (-30.0, -30.0, 5.0, 100.0), (100.0, 60.0, 200.0, 200.0)]:
+        got = set(cells.window(left, top, right, bottom).tolist())
+        want = set(np.flatnonzero((x >= left) & (x <= right) & (y >= top) & (y <= bottom)).tolist())
+        assert want <= got
+
+def test_cell_size_follows_largest_constant_radius():
+    def laws(body):
+        return compile_program(f"law a priority 1\n  when true\n  do {body}\nend\n").laws
+
+    assert auto_cell_size(laws("drag(0.1)")) is None
+    assert auto_cell_size(laws("collide(3, 0.8, 0.06); cohere(18, 0.1)")) == 18.0
+    assert auto_cell_size(laws("separate(energy * 10, 0.1)")) == DEFAULT_CELL_SIZE
+
+
+def test_verlet_list_reuses_pairs_until_entities_move():
+    from engine.backend import get_backend
+    from engine.factory import seed_world
+    from engine.kernel import Kernel
+
+    src = "\n".join(
+        [
+            "const W = 64",
+            "const H = 64",
+            "const SUBSTEPS = 2",
+            "law flock priority 1",
+            "  when true",
+            "  do cohere(8, 0.02); separate(8, 0.1, color != \"gray\"); clamp_speed(0.5)",
+            "end",
+        ]
+    )
+    kernels = []
+    for skin in (0, 3):
+        prog = compile_program(src + f"\nconst NEIGHBOR_SKIN = {skin}")
+        world = seed_world(64, 64, n=200, seed=2, backend=get_backend(False))
+        kernel = Kernel(world, prog.consts, prog.laws)
+        for _ in range(6):
+            kernel.tick()
+        kernels.append(kernel)
+    plain, cached = kernels
+    assert plain.metrics()["neighbor_rebuild_rate"] == 1.0
+    stats = cached.metrics()
+    assert stats["neighbor_checks"] == 12.0
+    assert 1.0 <= stats["neighbor_rebuilds"] < 12.0
+    for name in ("x", "y", "vx", "vy"):
+        np.testing.assert_allclose(
+            plain.world.entities.column(name), cached.world.entities.column(name), atol=1e-9
+        )
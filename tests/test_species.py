@@ -0,0 +1,24 @@
+from engine.factory import seed_world
+from engine.species import SpeciesRegistry
+
+
+def test_registry_resolves_per_color_code_and_grows():
+    reg = SpeciesRegistry()
+    colors = ["Settler", "reef_fish", "gray"]
+    kinds = [reg.kinds[c] for c in reg.kind_codes(colors)]
+    assert kinds == ["humanoid", "creature", "creature"]
+    assert reg.aquatic_codes(colors).tolist() == [False, True, False]
+    colors.append("obelisk")
+    assert reg.kinds[reg.kind_codes(colors)[3]] == "building"
+
+
+def test_profile_kind_registers_new_species():
+    world = seed_world(
+        16, 16, n=0, seed=1,
+        profiles=[{"color": "kelp_drifter", "count": 2, "kind": "plant"}, {"color": "gold", "count": 1}],
+    )
+    species = world.species
+    codes = species.kind_codes(world.entities.colors)
+    by_color = {c: species.kinds[codes[i]] for i, c in enumerate(world.entities.colors)}
+    assert by_color["kelp_drifter"] == "plant"
+    assert by_color["gold"] == "machine"
@@ -0,0 +1,238 @@
+import numpy as np
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+from engine.safeexpr import compile_expr
+from engine.vector import Unlowerable, lower_expr
+
+
+LOWERABLE_SRC = "\n".join(
+    [
+        "const W = 48",
+        "const H = 48",
+        "const G = 0.1",
+        "const SUBSTEPS = 2",
+        "law gravity priority 10",
+        "  when true",
+        "  do vy += G",
+        "end",
+        "law steer priority 9",
+        "  when color == \"red\" or color == \"blue\"",
+        "  do wander(0.05); drag(0.02); seek(W/2, H/2, 0.03)",
+        "  do energy -= 0.01 * abs(vx)",
+        "end",
+        "law calm priority 8",
+        "  when not (energy > 0.9) and x < W/2",
+        "  do vx *= 0.9; metabolize(0.02); trade(0.1)",
+        "end",
+        "law hard priority 7",
+        "  when 0.2 < seen < 0.99",
+        "  do hardness = max(hardness, 1.0) + clamp(vy, -1, 1); decay_unseen(0.01)",
+        "end",
+        "law walls priority 5",
+        "  when true",
+        "  do bounce(1, 0.8); wind(0.5); gust(0.1); avoid(0, 0, 0.01); clamp_speed(1.5)",
+        "end",
+    ]
+)
+
+
+def _run(src, engine, ticks=15, n=60):
+    prog = compile_program(src)
+    world = seed_world(48, 48, n=n, seed=4, backend=get_backend(False))
+    kernel = Kernel(world, prog.consts, prog.laws, engine=engine)
+    for _ in range(ticks):
+        kernel.tick()
+    return kernel
+
+
+def test_vector_engine_matches_scalar_for_lowered_laws():
+    scalar = _run(LOWERABLE_SRC, "scalar").world.entities
+    vector_kernel = _run(LOWERABLE_SRC, "vector")
+    vector = vector_kernel.world.entities
+    for plan in vector_kernel._vector.plan_summary():
+        assert plan["when"] == "vector"
+        assert all(mode == "vector" for _, mode in plan["actions"])
+    for name in ("x", "y", "vx", "vy", "energy", "hardness", "seen", "alive"):
+        np.testing.assert_allclose(
+            scalar.column(name).astype(float), vector.column(name).astype(float), atol=1e-9
+        )
+
+
+def test_unlowerable_constructs_fall_back_to_scalar():
+    src = "\n".join(
+        [
+            "law flock priority 1",
+            "  when color != \"gray\"",
+            "  do cohere(10, 0.05, rand() < 2); emit_sound(0.1)",
+            "end",
+        ]
+    )
+    kernel = _run(src, "vector", ticks=2, n=20)
+    plan = kernel._vector.plan_summary()[0]
+    assert plan["when"] == "vector"
+    assert plan["actions"] == [("cohere", "scalar"), ("emit_sound", "scalar")]
+    assert float(kernel.world.sound_field.sum()) > 0.0
+
+
+def test_lowering_rejects_value_context_boolops():
+    try:
+        lower_expr(compile_expr("energy and 2"), lambda s: 0)
+    except Unlowerable:
+        pass
+    else:
+        raise AssertionError("and over non-boolean operands must not lower")
+
+
+def test_vectorize_const_selects_engine():
+    prog = compile_program("const VECTORIZE = 1\nlaw a priority 1\n  when true\n  do vx += 0\nend\n")
+    world = seed_world(16, 16, n=4, seed=1, backend=get_backend(False))
+    kernel = Kernel(world, prog.consts, prog.laws)
+    assert kernel.cfg.engine == "vector"
+
+
+def test_neighbor_calls_fuse_and_match_scalar():
+    src = "\n".join(
+        [
+            "const W = 48",
+            "const H = 48",
+            "law flock priority 2",
+            "  when true",
+            "  do cohere(9, 0.05); separate(9, 0.1); repel(9, 0.3); collide(9, 0.8, 0.06)",
+            "end",
+            "law crowd priority 1",
+            "  when energy > 0.2",
+            "  do attract(14, 0.2 * energy); drag(0.02)",
+            "end",
+        ]
+    )
+    scalar = _run(src, "scalar", ticks=8, n=120).world.entities
+    vector_kernel = _run(src, "vector", ticks=8, n=120)
+    plan = vector_kernel._vector.plan_summary()
+    assert plan[0]["actions"] == [(name, "fused") for name in ("cohere", "separate", "repel", "collide")]
+    assert plan[1]["actions"] == [("attract", "fused"), ("drag", "vector")]
+    vector = vector_kernel.world.entities
+    for name in ("x", "y", "vx", "vy"):
+        np.testing.assert_allclose(scalar.column(name), vector.column(name), atol=1e-9)
+
+
+def test_selectors_vectorize_and_match_scalar():
+    src = "\n".join(
+        [
+            "const W = 48",
+            "const H = 48",
+            "law flock priority 2",
+            "  when true",
+            "  do cohere(9, 0.05, color == \"red\"); separate(9, 0.1, energy > 0.5 and color != \"gray\")",
+            "end",
+            "law herd priority 1",
+            "  when color == \"blue\"",
+            "  do attract(14, 0.2, not aquatic and mass > 1.2)",
+            "end",
+        ]
+    )
+    scalar_kernel = _run(src, "scalar", ticks=8, n=120)
+    selectors = sorted(scalar_kernel._selectors.values(), key=lambda s: s.expr.src)
+    assert [s.static for s in selectors] == [True, False, False]
+    vector_kernel = _run(src, "vector", ticks=8, n=120)
+    for plan in vector_kernel._vector.plan_summary():
+        assert all(mode == "fused" for _, mode in plan["actions"])
+    for name in ("x", "y", "vx", "vy"):
+        np.testing.assert_allclose(
+            scalar_kernel.world.entities.column(name), vector_kernel.world.entities.column(name), atol=1e-9
+        )
+
+
+
+def test_static_selector_sees_colors_set_in_the_same_substep():
+    src = "\n".join(
+        [
+            "const W = 48",
+            "const H = 48",
+            "law paint priority 2",
+            "  when energy > 0.8",
+            "  do color = \"red\"",
+            "end",
+            "law flock priority 1",
+            "  when true",
+            "  do cohere(12, 0.05, color == \"red\")",
+            "end",
+        ]
+    )
+
+    def run(compiled):
+        prog = compile_program(src)
+        world = seed_world(48, 48, n=80, seed=6, backend=get_backend(False))
+        kernel = Kernel(world, prog.consts, prog.laws, engine="scalar")
+        if not compiled:
+            kernel._selectors = {}  # per-pair _selector_ok
+        version = world.entities.static_version
+        kernel.tick()
+        return kernel, version
+
+    compiled, version = run(True)
+    assert compiled._selectors and compiled.world.entities.static_version > version
+    reference, _ = run(False)
+    for name in ("vx", "vy"):
+        np.testing.assert_allclose(
+            compiled.world.entities.column(name), reference.world.entities.column(name), atol=1e-12
+        )
+
+
+BATCHED_SRC = "\n".join(
+    [
+        "const FIELD_BATCH = 1",
+        "law graze priority 5",
+        "  when true",
+        "  do emit_food(0.02); emit_road(0.1); emit_sound(0.05); consume_food(0.3, 2.0); consume_water(0.1)",
+        "  do vx *= 0.5; vy *= 0.5",
+        "end",
+    ]
+)
+
+
+def test_batched_field_writes_match_between_engines():
+    scalar = _run(BATCHED_SRC, "scalar", ticks=6)
+    vector = _run(BATCHED_SRC, "vector", ticks=6)
+    assert all(mode == "vector" for _, mode in vector._vector.plan_summary()[0]["actions"])
+    for name in ("food_field", "road_field", "water_field"):
+        np.testing.assert_allclose(getattr(scalar.world, name), getattr(vector.world, name), atol=1e-6)
+    np.testing.assert_allclose(scalar.world.entities.column("energy"), vector.world.entities.column("energy"), atol=1e-9)
+    np.testing.assert_allclose(scalar.world.entities.column("sound"), vector.world.entities.column("sound"), atol=1e-9)
+
+
+FLOW_SRC = "\n".join(
+    [
+        "law settle priority 5",
+        "  when energy > 0",
+        "  do seek_home(0.05); follow_road(0.04); drag(0.1)",
+        "end",
+    ]
+)
+
+
+def _run_flow(consts, engine, ticks=6):
+    prog = compile_program(consts + "\n" + FLOW_SRC)
+    world = seed_world(48, 48, n=60, seed=4, backend=get_backend(False))
+    yy, xx = np.mgrid[0:48, 0:48]
+    world.home_field[...] = np.exp(-((xx - 30) ** 2 + (yy - 12) ** 2) / 80.0)
+    world.road_field[20:23, :] = 1.0
+    world.schedule.set_interval("home_field", 1000)
+    kernel = Kernel(world, prog.consts, prog.laws, engine=engine)
+    for _ in range(ticks):
+        kernel.tick()
+    return kernel
+
+
+def test_flow_seek_matches_per_entity_scan():
+    plain = _run_flow("const FLOW_FIELDS = 0", "scalar")
+    scalar = _run_flow("const FLOW_FIELDS = 1", "scalar")
+    vector = _run_flow("const FLOW_FIELDS = 1", "vector")
+    assert plain.flow is None and scalar.metrics()["flow_rebuilds"] == 12
+    assert all(mode == "vector" for _, mode in vector._vector.plan_summary()[0]["actions"])
+    for kernel in (scalar, vector):
+        for name in ("x", "y", "vx", "vy"):
+            np.testing.assert_allclose(plain.world.entities.column(name), kernel.world.entities.column(name), atol=1e-9)
+    assert _run_flow("const FLOW_FIELDS = 1\nconst FLOW_INTERVAL_HOME = 3", "scalar").metrics()["flow_rebuilds"] == 8
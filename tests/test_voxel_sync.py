@@ -17,3 +17,36 @@ def test_voxel_sync_respects_sea_level():
     assert world.voxel_field[0, 0, 0] == 1
     for z in range(1, sea_idx + 1):
         assert world.voxel_field[z, 0, 0] == 2
+
+
+def test_voxel_sync_rewrites_changed_columns_and_defers():
+    backend = get_backend(False)
+    world = World(w=4, h=4, d=8, dt=1.0, backend=backend)
+    world.sea_level = 0.0
+    world.terrain_field[:] = 0.5
+    world._sync_voxel_field()
+    assert world.voxel_field[3, 1, 1] == 1 and world.voxel_field[4, 1, 1] == 0
+
+    world.defer_voxels = True
+    world.water_field[:] = 1.0  # two water layers on top of every column
+    world.step_integrate()
+    assert world.voxel_field[4, 1, 1] == 0  # not synced yet
+    assert world._voxel_at(1, 1, 4) == 2  # collision already sees the water
+
+    vox = world.voxels()
+    assert [int(v) for v in vox[:, 1, 1]] == [1, 1, 1, 1, 2, 2, 0, 0]
+    assert vox[0, 0, 0] == 1
+
+
+def test_voxel_sync_leaves_unchanged_columns_alone():
+    world = World(w=5, h=4, d=8, dt=1.0, backend=get_backend(False))
+    world.sea_level = 0.0
+    world.terrain_field[:] = 0.25
+    world._sync_voxel_field()
+    world.voxel_field[-1] = 7  # marks every column; a rewrite clears it
+
+    world.terrain_field[2, 3] = 0.75
+    vox = world.voxels()
+    changed = vox[-1] != 7
+    assert changed.sum() == 1 and changed[2, 3]
+    assert [int(v) for v in vox[:, 2, 3]] == [1, 1, 1, 1, 1, 1, 0, 0]
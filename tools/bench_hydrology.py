@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from engine.backend import get_backend
+from engine.factory import seed_world
+
+
+def roll_flow(world) -> None:
+    """The roll-based water flow World used before engine.hydrology."""
+    t = world.terrain_field
+    w = world.water_field
+    neighbors = np.stack([np.roll(t, 1, 0), np.roll(t, -1, 0), np.roll(t, 1, 1), np.roll(t, -1, 1)], axis=0)
+    min_idx = np.argmin(neighbors, axis=0)
+    mask = np.min(neighbors, axis=0) < t
+    flow = w * 0.04
+    w[:] = w - flow * mask
+    w[:] = w + np.roll(flow * ((min_idx == 0) & mask), -1, 0)
+    w[:] = w + np.roll(flow * ((min_idx == 1) & mask), 1, 0)
+    w[:] = w + np.roll(flow * ((min_idx == 2) & mask), -1, 1)
+    w[:] = w + np.roll(flow * ((min_idx == 3) & mask), 1, 1)
+
+
+def bench(size: int, steps: int, mode: str) -> Dict[str, Any]:
+    world = seed_world(size, size, n=0, seed=1, backend=get_backend(False))
+    start_water = world.water_field.copy()
+    start_mass = float(start_water.sum(dtype=np.float64))
+
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        roll_flow(world)
+    roll_ms = (time.perf_counter() - t0) * 1000.0 / steps
+    roll_water = world.water_field.copy()
+
+    world.water_field[...] = start_water
+    world.hydrology.set_mode(mode)
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        world.hydrology.step(world)
+    routed_ms = (time.perf_counter() - t0) * 1000.0 / steps
+
+    return {
+        "size": size,
+        "mode": mode,
+        "roll_ms_per_step": round(roll_ms, 4),
+        "hydrology_ms_per_step": round(routed_ms, 4),
+        "speedup": round(roll_ms / max(routed_ms, 1e-9), 2),
+        "mass_drift_roll": float(roll_water.sum(dtype=np.float64)) - start_mass,
+        "mass_drift_hydrology": float(world.water_field.sum(dtype=np.float64)) - start_mass,
+        "max_diff_vs_roll": float(np.abs(world.water_field - roll_water).max()),
+        "stats": world.hydrology.report(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time engine.hydrology against the old roll-based water flow.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[128, 512, 1024])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--mode", choices=["steepest", "split"], default="steepest")
+    args = parser.parse_args()
+    results = [bench(size, args.steps, args.mode) for size in args.sizes]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
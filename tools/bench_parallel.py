@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from engine.backend import get_backend
+from engine.compiler import compile_program
+from engine.factory import seed_world
+from engine.kernel import Kernel
+
+SRC = """const W = {size}
+const H = {size}
+const MAX_SPEED = 1.5
+law flock priority 2
+  when true
+  do cohere(8, 0.02); separate(8, 0.1, color != "gray"); collide(3, 0.8, 0.06)
+end
+law eat priority 1
+  when energy < 1.5
+  do consume_food(0.05, 1.0); emit_road(0.02); wrap(0)
+end
+"""
+
+
+def run(size: int, n: int, ticks: int, engine: str, workers: int | None = None):
+    prog = compile_program(SRC.format(size=size))
+    world = seed_world(size, size, n=n, seed=3, backend=get_backend(False))
+    kernel = Kernel(world, prog.consts, prog.laws, engine=engine, workers=workers)
+    try:
+        kernel.tick()  # workers compile the program on their first substep
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            kernel.tick()
+        ms = (time.perf_counter() - t0) * 1000.0 / ticks
+    finally:
+        kernel.close()
+    return ms, world
+
+
+def bench(size: int, n: int, ticks: int, workers: list[int]) -> Dict[str, Any]:
+    scalar_ms, scalar = run(size, n, ticks, "scalar")
+    out: Dict[str, Any] = {"size": size, "entities": n, "scalar_ms_per_tick": round(scalar_ms, 2), "parallel": []}
+    for count in workers:
+        ms, world = run(size, n, ticks, "parallel", count)
+        out["parallel"].append({
+            "workers": count,
+            "ms_per_tick": round(ms, 2),
+            "speedup": round(scalar_ms / max(ms, 1e-9), 2),
+            "max_diff_x": float(np.abs(world.entities.column("x") - scalar.entities.column("x")).max()),
+            "max_diff_road": float(np.abs(world.road_field - scalar.road_field).max()),
+        })
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time the parallel law engine against the scalar one.")
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--entities", type=int, nargs="+", default=[1000, 4000])
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    results = [bench(args.size, n, args.ticks, args.workers) for n in args.entities]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())